@@ -0,0 +1,154 @@
+#!/usr/bin/env python
+# coding: utf-8
+"""Measure how much of a parent's wordnet forked workers end up copying, with and without freeze().
+
+    PYTHONPATH=lib python benchmarks/fork_rss.py --size 100000 --workers 4 --out bench.jsonl
+
+For each mode a fresh process gets a wordnet and forks workers that each run read-only
+queries over every synset followed by a full garbage collection:
+
+- plain: loads a synthetic WordNet 3.0 database (or the one in --wordnet).
+- frozen: loads it and calls freeze(). The memory of the graph it replaces is freed,
+  but mostly stays with the process.
+- restored: restores a frozen wordnet saved with save(), so the process never held
+  anything but the frozen graph.
+
+Every worker then reports its memory from /proc/self/smaps_rollup (Linux only).
+Private memory is what the worker has copied from the parent on writing to shared
+pages, plus what its queries allocate, and is what adds up with the number of workers.
+"""
+import argparse
+import gc
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'lib'))
+
+from run import Fixtures, git_commit
+from nlpkit.wordnet.wn30 import Wn30
+
+__author__ = "anders"
+
+MODES = ('plain', 'frozen', 'restored')
+
+
+def memory():
+    """Return the Rss, Pss and private memory of this process in MB."""
+    fields = {}
+    filename = '/proc/self/smaps_rollup' if os.path.exists('/proc/self/smaps_rollup') else '/proc/self/smaps'
+    with open(filename) as f:
+        for line in f:
+            parts = line.split()
+            if len(parts) == 3 and parts[2] == 'kB':
+                fields[parts[0][:-1]] = fields.get(parts[0][:-1], 0) + int(parts[1])
+    return {'rss': fields['Rss'] / 1024.0,
+            'pss': fields.get('Pss', 0) / 1024.0,
+            'private': (fields['Private_Clean'] + fields['Private_Dirty']) / 1024.0}
+
+
+def workload(wn):
+    for synset in wn.all_synsets():
+        synset.get('pos')
+        if synset.get('lex_units'):
+            synset.lemmas()
+        synset.related()
+    gc.collect()
+
+
+def run_workers(wn, workers):
+    pipes = []
+    for _ in range(workers):
+        read_fd, write_fd = os.pipe()
+        pid = os.fork()
+        if pid == 0:
+            os.close(read_fd)
+            started = time.time()
+            workload(wn)
+            result = dict(memory(), seconds=time.time() - started)
+            os.write(write_fd, json.dumps(result))
+            os._exit(0)
+        os.close(write_fd)
+        pipes.append((pid, read_fd))
+    results = []
+    for pid, read_fd in pipes:
+        with os.fdopen(read_fd) as f:
+            results.append(json.loads(f.read()))
+        os.waitpid(pid, 0)
+    return results
+
+
+def measure(args):
+    """Load, optionally freeze, fork the workers and print the measurements as JSON."""
+    started = time.time()
+    if args.mode == 'restored':
+        wn = Wn30.restore(args.pickle)
+    elif args.wordnet:
+        wn = Wn30.load(args.wordnet)
+    else:
+        fixtures = Fixtures(args.data_dir or tempfile.mkdtemp(prefix='nlpkit-bench-'), args.seed)
+        wn = fixtures.wn30(args.size)
+    loaded = time.time()
+    if args.mode == 'plain':
+        gc.collect()
+    else:
+        wn.freeze()
+    frozen = time.time()
+    if args.pickle and args.mode == 'frozen':
+        wn.save(args.pickle)
+    parent = memory()
+    workers = run_workers(wn, args.workers)
+    print json.dumps({
+        'mode': args.mode,
+        'load_seconds': loaded - started,
+        'freeze_seconds': frozen - loaded if args.mode != 'plain' else None,
+        'gc_tracked': len(gc.get_objects()),
+        'parent_rss': parent['rss'],
+        'worker_private': [w['private'] for w in workers],
+        'worker_seconds': [w['seconds'] for w in workers],
+    })
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='measure the memory forked workers copy from a loaded wordnet')
+    parser.add_argument('--size', type=int, default=10000, help='synsets of the synthetic wordnet')
+    parser.add_argument('--wordnet', help='WordNet 3.0 data path to load instead of synthetic data')
+    parser.add_argument('--workers', type=int, default=4)
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--data-dir', help='where to keep generated data (default: a temporary directory)')
+    parser.add_argument('--out', type=argparse.FileType('a'), default=sys.stdout,
+                        help='append JSON lines results to this file')
+    parser.add_argument('--mode', choices=MODES, help=argparse.SUPPRESS)
+    parser.add_argument('--pickle', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.mode:
+        measure(args)
+        sys.exit(0)
+
+    if not args.data_dir and not args.wordnet:
+        # All modes should load the same generated data
+        args.data_dir = tempfile.mkdtemp(prefix='nlpkit-bench-')
+    commit = git_commit()
+    # The frozen run saves the wordnet that the restored run restores
+    pickle = os.path.join(tempfile.mkdtemp(prefix='nlpkit-bench-'), 'frozen.pickle')
+    for mode in MODES:
+        # Each mode in a fresh process, so one does not leave garbage behind for the next
+        command = [sys.executable, os.path.abspath(__file__), '--mode', mode, '--size', str(args.size),
+                   '--workers', str(args.workers), '--seed', str(args.seed), '--pickle', pickle]
+        command += ['--wordnet', args.wordnet] if args.wordnet else ['--data-dir', args.data_dir]
+        result = json.loads(subprocess.check_output(command).splitlines()[-1])
+        private = result['worker_private']
+        record = dict(result, benchmark='fork_rss.' + mode, size=None if args.wordnet else args.size,
+                      workers=args.workers, worker_private_mean=sum(private) / len(private),
+                      commit=commit, python=platform.python_version(), timestamp=time.time())
+        args.out.write(json.dumps(record, sort_keys=True) + "\n")
+        args.out.flush()
+        print >>sys.stderr, "{:<10} parent rss {:8.1f} MB, private per worker {:8.1f} MB, gc tracked {}".format(
+            mode, result['parent_rss'], record['worker_private_mean'], result['gc_tracked'])
+    os.remove(pickle)
+    os.rmdir(os.path.dirname(pickle))
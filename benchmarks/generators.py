@@ -0,0 +1,204 @@
+# coding: utf-8
+"""Writers of synthetic input data in the native formats read by nlpkit.
+
+The real resources cannot be redistributed, so the benchmarks generate data of the
+same shape: a random hypernym forest with a sprinkling of other relations. Every
+generator is deterministic given its seed.
+"""
+import codecs
+import json
+import os
+import random
+
+__author__ = "anders"
+
+WN_POS = [('n', 'noun', 0.70), ('v', 'verb', 0.12), ('a', 'adj', 0.14), ('r', 'adv', 0.04)]
+WN_OTHER_POINTERS = ['+', '=', '!', '%p', '#p', ';c', '-c']
+SYLLABLES = ['ka', 'lo', 'mi', 'nu', 're', 'sa', 'ti', 'vo', 'ze', 'bra', 'ska', 'tor', 'lin']
+
+
+def _word(rng):
+    return "".join(rng.choice(SYLLABLES) for _ in range(rng.randint(2, 4)))
+
+
+def _vocabulary(rng, n_synsets):
+    # About half as many distinct words as synsets gives a realistic amount of polysemy
+    return [_word(rng) + (str(i) if i % 7 == 0 else '') for i in range(max(1, n_synsets / 2))]
+
+
+def _forest(rng, n):
+    """Return a parent index (or None for roots) for each of n nodes."""
+    parents = []
+    for i in range(n):
+        parents.append(None if i < max(1, n / 1000) else rng.randrange(i / 2, i))
+    return parents
+
+
+def write_wn30(path, n_synsets, seed=1):
+    """Write data.noun, data.verb, data.adj and data.adv with n_synsets synsets in total.
+
+    Synset offsets are the byte offsets of their lines, as in the real files.
+    """
+    rng = random.Random(seed)
+    vocabulary = _vocabulary(rng, n_synsets)
+    if not os.path.isdir(path):
+        os.makedirs(path)
+    header = "  1 This is a synthetic WordNet data file generated by nlpkit benchmarks.\n"
+
+    for pos, name, share in WN_POS:
+        n = max(1, int(n_synsets * share))
+        parents = _forest(rng, n)
+        children = [[] for _ in range(n)]
+        for i, parent in enumerate(parents):
+            if parent is not None:
+                children[parent].append(i)
+
+        # Lines are built with fixed width placeholders for offsets, so their lengths
+        # (and thereby the offsets) are known before the offsets are filled in.
+        templates = []
+        for i in range(n):
+            words = rng.sample(vocabulary, rng.randint(1, 3))
+            pointers = []
+            if parents[i] is not None:
+                pointers.append(('@', parents[i], '0000'))
+            pointers.extend(('~', child, '0000') for child in children[i])
+            if rng.random() < 0.2:
+                pointers.append((rng.choice(WN_OTHER_POINTERS), rng.randrange(n), '0101'))
+            words_field = " ".join("{} 0".format(w) for w in words)
+            frames = " 00" if pos == 'v' else ""
+            templates.append((words, pointers, "{{}} {:02d} {} {:02x} {} {:03d} {{}}{} | synthetic gloss for {}  \n".format(
+                rng.randrange(45), pos, len(words), words_field, len(pointers), frames, words[0])))
+
+        offsets = []
+        position = len(header)
+        for words, pointers, template in templates:
+            offsets.append(position)
+            pointers_field = " ".join("{} 00000000 {} {}".format(sym, pos, src_target)
+                                      for sym, target, src_target in pointers)
+            position += len(template.format("00000000", pointers_field + (" " if pointers else "")))
+
+        with open(os.path.join(path, "data." + name), 'w') as f:
+            f.write(header)
+            for i, (words, pointers, template) in enumerate(templates):
+                pointers_field = " ".join("{} {:08d} {} {}".format(sym, offsets[target], pos, src_target)
+                                          for sym, target, src_target in pointers)
+                f.write(template.format("{:08d}".format(offsets[i]), pointers_field + (" " if pointers else "")))
+
+
+def write_dannet(path, n_synsets, seed=1):
+    """Write the five DanNet CSV files with n_synsets synsets."""
+    rng = random.Random(seed)
+    vocabulary = _vocabulary(rng, n_synsets)
+    if not os.path.isdir(path):
+        os.makedirs(path)
+    parents = _forest(rng, n_synsets)
+
+    def rows(filename, rows):
+        with codecs.open(os.path.join(path, filename), 'w', encoding='iso8859-1') as f:
+            for row in rows:
+                f.write(u"@".join(row) + u"\n")
+
+    rows("synsets.csv", ((str(i), u"{{{}_1}}".format(vocabulary[i % len(vocabulary)]), u"synthetic gloss", u"Object")
+                         for i in range(n_synsets)))
+    rows("synset_attributes.csv", ((str(i), u"domain", u"synthetic") for i in range(0, n_synsets, 10)))
+    rows("words.csv", ((u"w{}".format(i), word, rng.choice([u"Noun", u"Verb", u"Adjective"]))
+                       for i, word in enumerate(vocabulary)))
+    rows("wordsenses.csv", ((u"d{}".format(i), u"w{}".format(rng.randrange(len(vocabulary))), str(i), u"")
+                            for i in range(n_synsets)))
+
+    def relations():
+        for i, parent in enumerate(parents):
+            if parent is not None:
+                yield (str(i), u"hyponymOf", u"has_hyperonym", str(parent), u"taxonomic", u"")
+            if rng.random() < 0.3:
+                yield (str(i), u"eqSynonymOf", u"eq_has_synonym", u"ENG20-{:08d}-n".format(rng.randrange(10 ** 7)), u"", u"")
+            if rng.random() < 0.1:
+                yield (str(i), u"partHolonymOf", u"has_holo_part", str(rng.randrange(n_synsets)), u"", u"")
+    rows("relations.csv", relations())
+
+
+def write_germanet(path, n_synsets, seed=1):
+    """Write GermaNet 5.3 style object files (adj, nomen, verben) and gn_relations.xml."""
+    rng = random.Random(seed)
+    vocabulary = _vocabulary(rng, n_synsets)
+    if not os.path.isdir(path):
+        os.makedirs(path)
+    categories = ['nomen'] * 7 + ['verben'] * 2 + ['adj']
+    by_category = dict((c, []) for c in set(categories))
+    for i in range(n_synsets):
+        by_category[categories[i % len(categories)]].append(i)
+
+    for category, ids in by_category.items():
+        with codecs.open(os.path.join(path, "{}.synthetic.xml".format(category)), 'w', encoding='utf-8') as f:
+            f.write(u'<?xml version="1.0" encoding="UTF-8"?>\n<synsets>\n')
+            for i in ids:
+                f.write(u'<synset id="s{}" category="{}">\n'.format(i, category))
+                for word in rng.sample(vocabulary, rng.randint(1, 3)):
+                    f.write(u'  <lexUnit id="l{}_{}"><orthForm>{}</orthForm></lexUnit>\n'.format(i, word, word))
+                f.write(u'</synset>\n')
+            f.write(u'</synsets>\n')
+
+    parents = _forest(rng, n_synsets)
+    with codecs.open(os.path.join(path, "gn_relations.xml"), 'w', encoding='utf-8') as f:
+        f.write(u'<?xml version="1.0" encoding="UTF-8"?>\n<relations>\n')
+        for i, parent in enumerate(parents):
+            if parent is not None:
+                f.write(u'<con_rel name="hyperonymy" from="s{}" to="s{}" dir="revert" inv="hyponymy"/>\n'.format(i, parent))
+            if rng.random() < 0.1:
+                f.write(u'<con_rel name="causation" from="s{}" to="s{}" dir="one"/>\n'.format(i, rng.randrange(n_synsets)))
+        f.write(u'</relations>\n')
+
+
+def write_ukb(dict_filename, rels_filename, n_synsets, seed=1):
+    """Write a UKB dictionary and relations file over n_synsets noun synsets."""
+    rng = random.Random(seed)
+    vocabulary = _vocabulary(rng, n_synsets)
+    for filename in (dict_filename, rels_filename):
+        if not os.path.isdir(os.path.dirname(filename)):
+            os.makedirs(os.path.dirname(filename))
+    synsets_by_word = {}
+    for i in range(n_synsets):
+        for word in rng.sample(vocabulary, rng.randint(1, 2)):
+            synsets_by_word.setdefault(word, []).append("{:08d}-n".format(i))
+    with open(dict_filename, 'w') as f:
+        for word in sorted(synsets_by_word):
+            f.write("{} {}\n".format(word, " ".join(synsets_by_word[word])))
+    with open(rels_filename, 'w') as f:
+        for i, parent in enumerate(_forest(rng, n_synsets)):
+            if parent is not None:
+                f.write("u:{:08d}-n v:{:08d}-n t:hypernym\n".format(i, parent))
+
+
+def results(n_results, seed=1, seeds_per_cell=1):
+    """Return a list of experiment result dicts as read by bin/result-table.py.
+
+    Each combination of 'model', 'dataset' and 'feature_set' is repeated once for each
+    of seeds_per_cell random seeds.
+    """
+    rng = random.Random(seed)
+    n_cells = max(1, n_results / seeds_per_cell)
+    n_models = max(1, int(round(n_cells ** (1 / 3.0))))
+    n_datasets = n_models
+    n_feature_sets = max(1, n_cells / (n_models * n_datasets))
+    out = []
+    for model in range(n_models):
+        for dataset in range(n_datasets):
+            for feature_set in range(n_feature_sets):
+                for run_seed in range(seeds_per_cell):
+                    out.append({'model': 'model_{}'.format(model),
+                                'dataset': 'dataset_{}'.format(dataset),
+                                'feature_set': 'features_{}'.format(feature_set),
+                                'seed': run_seed,
+                                'precision': rng.random(),
+                                'recall': rng.random()})
+    return out
+
+
+def write_results(filename, n_results, seed=1, seeds_per_cell=1, stream=False):
+    """Write results() to filename, as a JSON list or as a stream of concatenated objects."""
+    with open(filename, 'w') as f:
+        if stream:
+            for result in results(n_results, seed, seeds_per_cell):
+                f.write(json.dumps(result) + "\n")
+        else:
+            json.dump(results(n_results, seed, seeds_per_cell), f)
@@ -0,0 +1,229 @@
+#!/usr/bin/env python
+# coding: utf-8
+"""Time the wordnet loaders, common queries and the bin/ tools on synthetic data.
+
+    PYTHONPATH=lib python benchmarks/run.py --sizes 1000 10000 100000 --out bench.jsonl
+
+Each benchmark is run at every size and the fastest of --repeat runs is recorded. The
+results are appended to --out as one JSON object per line, tagged with the git commit,
+so runs from different commits can be compared to spot scaling regressions.
+"""
+import argparse
+import gc
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'lib'))
+
+import generators
+from nlpkit.wordnet.wn30 import Wn30Loader, Wn30
+from nlpkit.wordnet.dannet import DannetLoader
+from nlpkit.wordnet.germanet import GermanetV53
+from nlpkit.wordnet.ukb import UkbLoader, Ukb
+from nlpkit.results import ResultTable
+
+__author__ = "anders"
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+BENCHMARKS = []
+
+
+def benchmark(name):
+    """Register a benchmark. It is called with the size and a Fixtures object and must
+    return a function that performs the timed work."""
+    def register(f):
+        BENCHMARKS.append((name, f))
+        return f
+    return register
+
+
+class Fixtures(object):
+    """Generates synthetic data once per size and caches loaded wordnets."""
+    def __init__(self, directory, seed):
+        self.directory = directory
+        self.seed = seed
+        self._cache = {}
+        if not os.path.isdir(directory):
+            os.makedirs(directory)
+        # The loaders resolve their paths through paths.data_path, which needs a data dir
+        os.environ['NLPKIT_DATA'] = directory
+
+    def path(self, kind, size):
+        path = os.path.join(self.directory, "{}-{}".format(kind, size))
+        if not os.path.exists(path):
+            if kind == 'wn30':
+                generators.write_wn30(path, size, self.seed)
+            elif kind == 'dannet':
+                generators.write_dannet(path, size, self.seed)
+            elif kind == 'germanet':
+                generators.write_germanet(path, size, self.seed)
+            elif kind == 'ukb':
+                generators.write_ukb(os.path.join(path, 'dict.txt'), os.path.join(path, 'rels.txt'), size, self.seed)
+            elif kind == 'results':
+                os.makedirs(path)
+                generators.write_results(os.path.join(path, 'results.json'), size, self.seed)
+                generators.write_results(os.path.join(path, 'results.stream'), size, self.seed, stream=True)
+        return path
+
+    def wn30(self, size):
+        if ('wn30', size) not in self._cache:
+            self._cache['wn30', size] = Wn30Loader(Wn30(), self.path('wn30', size)).load()
+        return self._cache['wn30', size]
+
+
+def _sample(seq, n, seed):
+    rng = random.Random(seed)
+    return [rng.choice(seq) for _ in range(n)]
+
+
+@benchmark('load.wn30')
+def bench_load_wn30(size, fixtures):
+    path = fixtures.path('wn30', size)
+    return lambda: Wn30Loader(Wn30(), path).load()
+
+
+@benchmark('load.dannet')
+def bench_load_dannet(size, fixtures):
+    path = fixtures.path('dannet', size)
+    return lambda: DannetLoader(path).load()
+
+
+@benchmark('load.germanet')
+def bench_load_germanet(size, fixtures):
+    path = fixtures.path('germanet', size)
+    return lambda: GermanetV53(path)
+
+
+@benchmark('load.ukb')
+def bench_load_ukb(size, fixtures):
+    path = fixtures.path('ukb', size)
+    return lambda: UkbLoader(Ukb(), os.path.join(path, 'dict.txt'), os.path.join(path, 'rels.txt')).load()
+
+
+@benchmark('query.hypernym_paths')
+def bench_hypernym_paths(size, fixtures):
+    wn = fixtures.wn30(size)
+    synsets = [wn[n] for n in _sample(wn.G.nodes(), 1000, fixtures.seed)]
+    return lambda: [s.hypernym_paths() for s in synsets]
+
+
+@benchmark('query.lazy_hypernym_paths')
+def bench_lazy_hypernym_paths(size, fixtures):
+    path = fixtures.path('wn30', size)
+    synset_ids = _sample(fixtures.wn30(size).G.nodes(), 1000, fixtures.seed)
+
+    def run():
+        wn = Wn30.load(path, lazy=True)
+        return [wn[synset_id].hypernym_paths() for synset_id in synset_ids]
+    return run
+
+
+@benchmark('query.frozen_hypernym_paths')
+def bench_frozen_hypernym_paths(size, fixtures):
+    wn = Wn30Loader(Wn30(), fixtures.path('wn30', size)).load().freeze()
+    synsets = [wn[n] for n in _sample(wn.G.nodes(), 1000, fixtures.seed)]
+    return lambda: [s.hypernym_paths() for s in synsets]
+
+
+@benchmark('query.synsets')
+def bench_synsets(size, fixtures):
+    wn = fixtures.wn30(size)
+    lemmas = _sample(wn._synset_map.keys(), 10000, fixtures.seed)
+    return lambda: [wn.synsets(lemma) for lemma in lemmas]
+
+
+@benchmark('query.lemmatize')
+def bench_lemmatize(size, fixtures):
+    wn = fixtures.wn30(size)
+    # Inflected forms of the lemmas, as they would occur in running text
+    suffixes = ['', 's', 'es', 'ed', 'ing', 'er', 'est']
+    tokens = [lemma + suffix for lemma, suffix in zip(_sample(wn._synset_map.keys(), 100000, fixtures.seed),
+                                                      _sample(suffixes, 100000, fixtures.seed + 1))]
+
+    def run():
+        wn.lemmatizer(refresh=True)
+        return wn.lemmatize(tokens)
+    return run
+
+
+@benchmark('query.result_table')
+def bench_result_table_aggregate(size, fixtures):
+    results = generators.results(size, fixtures.seed, seeds_per_cell=10)
+    return lambda: ResultTable(results, ['feature_set'], ['model', 'dataset'],
+                               aggregates=['mean', 'std', 'count', 'min', 'max'])
+
+
+def _script(name, *args):
+    command = [sys.executable, os.path.join(ROOT, 'bin', name)] + list(args)
+    env = dict(os.environ, PYTHONPATH=os.pathsep.join([os.path.join(ROOT, 'lib')] + sys.path))
+    def run():
+        with open(os.devnull, 'w') as devnull:
+            subprocess.check_call(command, stdout=devnull, env=env)
+    return run
+
+
+@benchmark('bin.result_table')
+def bench_result_table(size, fixtures):
+    path = os.path.join(fixtures.path('results', size), 'results.json')
+    return _script('result-table.py', path, '--rows', 'model', 'dataset', '--columns', 'feature_set')
+
+
+@benchmark('bin.json_to_list')
+def bench_json_to_list(size, fixtures):
+    return _script('json-to-list.py', os.path.join(fixtures.path('results', size), 'results.stream'))
+
+
+@benchmark('bin.json_merge_lists')
+def bench_json_merge_lists(size, fixtures):
+    path = os.path.join(fixtures.path('results', size), 'results.json')
+    return _script('json-merge-lists.py', path, path)
+
+
+def git_commit():
+    try:
+        with open(os.devnull, 'w') as devnull:
+            return subprocess.check_output(['git', 'rev-parse', 'HEAD'], cwd=ROOT, stderr=devnull).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def time_best(f, repeat):
+    best = None
+    for _ in range(repeat):
+        gc.collect()
+        started = time.time()
+        f()
+        elapsed = time.time() - started
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='run the nlpkit benchmarks on synthetic data')
+    parser.add_argument('--sizes', nargs='+', type=int, default=[1000, 10000])
+    parser.add_argument('--only', nargs='*', help='run only benchmarks whose name starts with one of these')
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--data-dir', help='where to keep generated data (default: a temporary directory)')
+    parser.add_argument('--out', type=argparse.FileType('a'), default=sys.stdout,
+                        help='append JSON lines results to this file')
+    args = parser.parse_args()
+
+    fixtures = Fixtures(args.data_dir or tempfile.mkdtemp(prefix='nlpkit-bench-'), args.seed)
+    commit = git_commit()
+    for size in args.sizes:
+        for name, setup in BENCHMARKS:
+            if args.only and not any(name.startswith(prefix) for prefix in args.only):
+                continue
+            seconds = time_best(setup(size, fixtures), args.repeat)
+            record = {'benchmark': name, 'size': size, 'seconds': seconds, 'repeat': args.repeat,
+                      'commit': commit, 'python': platform.python_version(), 'timestamp': time.time()}
+            args.out.write(json.dumps(record, sort_keys=True) + "\n")
+            args.out.flush()
+            print >>sys.stderr, "{:<24} {:>8} {:10.4f}s".format(name, size, seconds)
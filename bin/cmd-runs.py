@@ -0,0 +1,50 @@
+#!/usr/bin/env python
+import argparse
+import csv
+import json
+import sys
+import time
+from datetime import datetime
+
+from nlpkit.cmd import open_sink, GROUP_FIELDS, TIME_FIELDS
+from nlpkit.cmdstats import summaries, regressions, SUMMARY_FIELDS, REGRESSION_FIELDS
+
+parser = argparse.ArgumentParser(description='report on the runs recorded by CmdRun')
+parser.add_argument('report', choices=['summary', 'regressions'])
+parser.add_argument('--sink', help='mongo, a mongodb:// URI, a .jsonl file or an SQLite file '
+                                   '(default $NLPKIT_CMD_RUNS or mongo)')
+parser.add_argument('--by', choices=sorted(GROUP_FIELDS), default='argv', help='group runs by this field')
+parser.add_argument('--metric', choices=TIME_FIELDS, default='wall_time')
+parser.add_argument('--command', help='only runs of this command (script name)')
+parser.add_argument('--since', help='only runs started on or after this date (YYYY-MM-DD)')
+parser.add_argument('--window', type=int, default=30, help='number of earlier runs in the baseline')
+parser.add_argument('--threshold', type=float, default=4.0,
+                    help='flag runs this many scaled MADs above the baseline')
+parser.add_argument('--min-increase', type=float, default=0.25,
+                    help='flag only runs at least this fraction slower than the baseline')
+parser.add_argument('--format', choices=['text', 'csv', 'json'], default='text')
+args = parser.parse_args()
+
+since = time.mktime(datetime.strptime(args.since, '%Y-%m-%d').timetuple()) if args.since else None
+sink = open_sink(args.sink)
+if args.report == 'summary':
+    rows = summaries(sink, args.by, args.metric, args.command, since)
+    fields = SUMMARY_FIELDS
+else:
+    rows = regressions(sink, args.by, args.metric, args.command, since, window=args.window,
+                       threshold=args.threshold, min_increase=args.min_increase)
+    fields = REGRESSION_FIELDS
+
+if args.format == 'json':
+    json.dump(rows, sys.stdout, indent=2, sort_keys=True)
+    print
+elif args.format == 'csv':
+    writer = csv.DictWriter(sys.stdout, fields)
+    writer.writeheader()
+    for row in rows:
+        writer.writerow(dict((k, v.encode('utf-8') if isinstance(v, unicode) else v) for k, v in row.iteritems()))
+else:
+    for row in rows:
+        print row['group']
+        print "\t" + "  ".join("{}={}".format(k, "%.3f" % row[k] if isinstance(row[k], float) else row[k])
+                               for k in fields[1:])
@@ -0,0 +1,21 @@
+#!/usr/bin/env python
+import argparse
+import sys
+
+from nlpkit.resultstore import ResultStore
+
+parser = argparse.ArgumentParser(description='add JSON results to an indexed result store')
+parser.add_argument('store', help='the store (an SQLite file, created if missing)')
+parser.add_argument('files', nargs='*', help='files with a JSON list or a stream of JSON results')
+parser.add_argument('--index', nargs='*', action='append', default=[], metavar='KEY',
+                    help='create an index on these keys. May be given more than once')
+args = parser.parse_args()
+
+store = ResultStore(args.store)
+for filename in args.files:
+    n = store.append_file(filename)
+    print >>sys.stderr, "{}: {} new results".format(filename, n)
+for keys in args.index:
+    if not store.ensure_index(keys):
+        print >>sys.stderr, "no index on {}, as some of the keys are in no result yet".format(", ".join(keys))
+print >>sys.stderr, "{} results with keys {}".format(len(store), ", ".join(store.keys()))
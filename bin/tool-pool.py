@@ -0,0 +1,56 @@
+#!/usr/bin/env python
+import argparse
+import sys
+
+from nlpkit.cmd import CmdRun, open_sink
+from nlpkit.pipeline import ToolPool
+
+parser = argparse.ArgumentParser(description='run a line oriented command line tool over input files '
+                                             'with a pool of long-lived processes')
+parser.add_argument('command', nargs=argparse.REMAINDER, help='the tool and its arguments')
+parser.add_argument('--input', nargs='*', default=[], help='input files (default: stdin)')
+parser.add_argument('--out', help='output file (default: stdout)')
+parser.add_argument('--processes', type=int, default=4)
+parser.add_argument('--batch-size', type=int, default=1000, help='input lines per batch')
+parser.add_argument('--queue-size', type=int, help='batches read ahead of the tools (default: 2 per process)')
+parser.add_argument('--max-in-flight', type=int, help='batches read but not yet written (default: 4 per process)')
+parser.add_argument('--delimiter', help='line written after each batch and passed through by the tool. '
+                                        'Without it the tool must write one line per input line')
+parser.add_argument('--retries', type=int, default=2, help='times a batch is retried after the tool crashes')
+parser.add_argument('--sink', help='where to record the run: mongo, a mongodb:// URI, a .jsonl file or an '
+                                   'SQLite file (default: $NLPKIT_CMD_RUNS or mongo)')
+parser.add_argument('--stats', action='store_true', help='print the stats of the workers to stderr')
+args = parser.parse_args()
+if args.command[:1] == ['--']:
+    args.command = args.command[1:]
+if not args.command:
+    parser.error("no command given")
+
+run = CmdRun(args, open_sink(args.sink))
+
+
+def input_lines():
+    if not args.input:
+        for line in sys.stdin:
+            yield line
+    for filename in args.input:
+        with open(filename) as f:
+            for line in f:
+                yield line
+
+out = open(args.out, 'w') if args.out else sys.stdout
+with ToolPool(args.command, args.processes, args.batch_size, args.queue_size, args.max_in_flight,
+              args.delimiter, args.retries) as pool:
+    for output in pool.imap_batches(input_lines()):
+        if output:
+            out.write("\n".join(output) + "\n")
+out.flush()
+stats = pool.stats()
+run.annotate(pipeline=stats)
+
+if args.stats:
+    print >>sys.stderr, "{} batches in {:.2f}s".format(sum(w['batches'] for w in stats['workers']), stats['wall_time'])
+    for w in stats['workers']:
+        print >>sys.stderr, ("worker {worker}: {batches} batches, {lines_in} lines, {lines_per_second:.0f} lines/s, "
+                             "latency median {latency_median:.4f}s p95 {latency_p95:.4f}s max {latency_max:.4f}s, "
+                             "{restarts} restarts".format(**w))
@@ -0,0 +1,20 @@
+#!/usr/bin/env python
+import argparse
+import json
+import sys
+
+from nlpkit.wordnet.delta import diff
+from nlpkit.wordnet.wn30 import Wn30
+from nlpkit.wordnet.dannet import Dannet
+
+parser = argparse.ArgumentParser(description='write the delta between two versions of a wordnet')
+parser.add_argument('wordnet', choices=('wn30', 'dannet'))
+parser.add_argument('old', help='data path of the old version')
+parser.add_argument('new', help='data path of the new version')
+parser.add_argument('out', help='delta file to write (gzipped JSON)')
+args = parser.parse_args()
+
+cls = Wn30 if args.wordnet == 'wn30' else Dannet
+delta = diff(cls.load(args.old), cls.load(args.new))
+delta.save(args.out)
+print >>sys.stderr, json.dumps(delta.summary(), sort_keys=True)
@@ -0,0 +1,79 @@
+#!/usr/bin/env python
+import argparse
+import json
+import random
+import threading
+import time
+
+from nlpkit.wordnet.server import WordnetClient
+
+parser = argparse.ArgumentParser(description='measure throughput and latency of a wordnet server')
+parser.add_argument('--socket', help='Unix socket of the server')
+parser.add_argument('--port', type=int, help='localhost TCP port of the server')
+parser.add_argument('--clients', type=int, default=8, help='number of concurrent client threads')
+parser.add_argument('--duration', type=float, default=10.0, help='seconds to run')
+parser.add_argument('--methods', nargs='*', default=['synset', 'related', 'hypernym_paths', 'shortest_path'],
+                    help='query types to mix')
+parser.add_argument('--sample', type=int, default=1000, help='number of synset ids to draw queries from')
+parser.add_argument('--seed', type=int, default=1)
+parser.add_argument('--json', action='store_true', help='print the report as JSON')
+args = parser.parse_args()
+
+if (args.socket is None) == (args.port is None):
+    parser.error('give exactly one of --socket and --port')
+
+def connect():
+    return WordnetClient(socket_path=args.socket, port=args.port)
+
+ids = connect().call('sample', args.sample, args.seed)
+latencies = []
+errors = [0]
+stop_at = time.time() + args.duration
+
+def make_query(rng):
+    method = rng.choice(args.methods)
+    if method == 'shortest_path':
+        return method, (rng.choice(ids), rng.choice(ids), None, 'both', 10000)
+    return method, (rng.choice(ids),)
+
+def run_client(seed):
+    client = connect()
+    rng = random.Random(seed)
+    own_latencies = []
+    while time.time() < stop_at:
+        method, params = make_query(rng)
+        started = time.time()
+        try:
+            client.call(method, *params)
+        except StandardError:
+            errors[0] += 1
+        own_latencies.append(time.time() - started)
+    client.close()
+    latencies.extend(own_latencies)
+
+started = time.time()
+threads = [threading.Thread(target=run_client, args=(args.seed + i,)) for i in range(args.clients)]
+for t in threads:
+    t.start()
+for t in threads:
+    t.join()
+elapsed = time.time() - started
+
+latencies.sort()
+def percentile(p):
+    return latencies[min(len(latencies) - 1, int(p * len(latencies)))] * 1000 if latencies else None
+
+report = {
+    'clients': args.clients,
+    'queries': len(latencies),
+    'errors': errors[0],
+    'seconds': elapsed,
+    'queries_per_second': len(latencies) / elapsed,
+    'p50_ms': percentile(0.50),
+    'p99_ms': percentile(0.99),
+}
+if args.json:
+    print json.dumps(report)
+else:
+    for key in ['clients', 'queries', 'errors', 'seconds', 'queries_per_second', 'p50_ms', 'p99_ms']:
+        print "{:<20} {}".format(key, report[key])
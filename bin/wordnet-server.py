@@ -0,0 +1,42 @@
+#!/usr/bin/env python
+import argparse
+import os
+import sys
+
+from nlpkit.wordnet.server import make_server
+from nlpkit.wordnet.wn30 import Wn30
+from nlpkit.wordnet.ukb import Ukb
+from nlpkit.wordnet.dannet import Dannet
+
+parser = argparse.ArgumentParser(description='load a wordnet once and answer queries from local processes')
+parser.add_argument('wordnet', choices=('wn30', 'dannet', 'ukb'))
+parser.add_argument('paths', nargs='+', help='data path of the wordnet (ukb takes a dict and a rels file)')
+parser.add_argument('--socket', help='listen on this Unix socket')
+parser.add_argument('--port', type=int, help='listen on this localhost TCP port')
+parser.add_argument('--workers', type=int, default=4, help='size of the worker thread pool')
+parser.add_argument('--batch-size', type=int, default=64, help='maximum number of requests in a batch')
+parser.add_argument('--batch-window', type=float, default=0.002, help='seconds to wait for a batch to fill')
+args = parser.parse_args()
+
+if (args.socket is None) == (args.port is None):
+    parser.error('give exactly one of --socket and --port')
+
+if args.wordnet == 'wn30':
+    wn = Wn30.load(*args.paths)
+elif args.wordnet == 'dannet':
+    wn = Dannet.load(*args.paths)
+else:
+    wn = Ukb.load(*args.paths)
+
+if args.socket and os.path.exists(args.socket):
+    os.unlink(args.socket)
+server = make_server(wn, socket_path=args.socket, port=args.port, workers=args.workers,
+                     max_batch=args.batch_size, window=args.batch_window)
+print >>sys.stderr, "Serving {} on {}".format(args.wordnet, args.socket or "127.0.0.1:{}".format(args.port))
+try:
+    server.serve_forever()
+except KeyboardInterrupt:
+    pass
+finally:
+    if args.socket:
+        os.unlink(args.socket)
@@ -0,0 +1,45 @@
+#!/usr/bin/env python
+import argparse
+import sys
+import time
+
+from nlpkit.wordnet.subset import extract_subset
+from nlpkit.wordnet.wn30 import Wn30
+from nlpkit.wordnet.ukb import Ukb, UkbWriter
+from nlpkit.wordnet.dannet import Dannet
+
+parser = argparse.ArgumentParser(description='extract the closure of seed synsets over some relations from a wordnet')
+parser.add_argument('wordnet', choices=('wn30', 'dannet', 'ukb'))
+parser.add_argument('paths', nargs='+', help='data path of the wordnet (ukb takes a dict and a rels file)')
+parser.add_argument('--out', nargs='+', required=True,
+                    help='output directory (or dict and rels file for --format ukb)')
+parser.add_argument('--synsets', nargs='*', default=[], help='seed synset ids')
+parser.add_argument('--lemmas', nargs='*', default=[], help='seed lemmas')
+parser.add_argument('--pos', help='only use seed synsets of the lemmas with this part of speech')
+parser.add_argument('--types', nargs='*', help='relation types to follow (default: all)')
+parser.add_argument('--direction', choices=('out', 'in', 'both'), default='out')
+parser.add_argument('--format', choices=('native', 'ukb'), default='native')
+args = parser.parse_args()
+
+started = time.time()
+if args.wordnet == 'wn30':
+    wn = Wn30.load(*args.paths)
+elif args.wordnet == 'dannet':
+    wn = Dannet.load(*args.paths)
+else:
+    wn = Ukb.load(*args.paths)
+loaded = time.time()
+
+subset = extract_subset(wn, args.synsets, args.lemmas, args.types, args.direction, args.pos)
+extracted = time.time()
+
+if args.format == 'ukb' or args.wordnet == 'ukb':
+    if len(args.out) != 2:
+        parser.error('--out takes a dict file and a rels file for the ukb format')
+    UkbWriter(subset, *args.out).write()
+else:
+    subset.write(args.out[0])
+
+print >>sys.stderr, "Kept {} of {} synsets. Load {:.1f}s, extract {:.1f}s, write {:.1f}s".format(
+    subset.G.number_of_nodes(), wn.G.number_of_nodes(),
+    loaded - started, extracted - loaded, time.time() - extracted)
@@ -0,0 +1,59 @@
+#!/usr/bin/env python
+import argparse
+import sys
+import time
+
+from nlpkit.wordnet.export import to_csr, save_csr
+from nlpkit.wordnet.walks import RandomWalker, WalkWriter, generate_walks
+from nlpkit.wordnet.wn30 import Wn30
+from nlpkit.wordnet.ukb import Ukb
+from nlpkit.wordnet.dannet import Dannet
+
+
+def type_weight(value):
+    type, _, weight = value.rpartition('=')
+    if not type:
+        raise argparse.ArgumentTypeError("expected TYPE=WEIGHT, got {}".format(value))
+    return type, float(weight)
+
+
+parser = argparse.ArgumentParser(description='write random walks over a wordnet, e.g. for training graph embeddings')
+parser.add_argument('wordnet', choices=('wn30', 'dannet', 'ukb'))
+parser.add_argument('paths', nargs='+', help='data path of the wordnet (ukb takes a dict and a rels file)')
+parser.add_argument('--out', required=True, help='file to write the walks to')
+parser.add_argument('--format', choices=('text', 'binary'), default='text',
+                    help='text: a line of synset ids per walk. binary: int32 node indices, see --csr')
+parser.add_argument('--csr', help='also save the adjacency matrix and the synset ids as a .npz file')
+parser.add_argument('--types', nargs='*', help='relation types to walk along (default: all)')
+parser.add_argument('--weights', nargs='*', type=type_weight, default=[], metavar='TYPE=WEIGHT',
+                    help='edge weights of relation types (default 1)')
+parser.add_argument('--direction', choices=('out', 'in', 'both'), default='out')
+parser.add_argument('--walk-length', type=int, default=40)
+parser.add_argument('--num-walks', type=int, default=10, help='walks started from each synset')
+parser.add_argument('-p', type=float, default=1.0, help='node2vec return parameter')
+parser.add_argument('-q', type=float, default=1.0, help='node2vec in-out parameter')
+parser.add_argument('--seed', type=int, default=0)
+parser.add_argument('--processes', type=int, help='number of worker processes (default: one per cpu)')
+args = parser.parse_args()
+
+started = time.time()
+if args.wordnet == 'wn30':
+    wn = Wn30.load(*args.paths)
+elif args.wordnet == 'dannet':
+    wn = Dannet.load(*args.paths)
+else:
+    wn = Ukb.load(*args.paths)
+loaded = time.time()
+
+matrix, ids = to_csr(wn, args.types, dict(args.weights), args.direction)
+if args.csr:
+    save_csr(args.csr, matrix, ids)
+exported = time.time()
+
+walker = RandomWalker(matrix, args.walk_length, args.p, args.q)
+with WalkWriter(args.out, args.format, ids, args.walk_length) as out:
+    for walks in generate_walks(walker, args.num_walks, args.seed, args.processes):
+        out.write(walks)
+
+print >>sys.stderr, "{} walks over {} synsets and {} edges. Load {:.1f}s, export {:.1f}s, walk {:.1f}s".format(
+    out.walks_written, matrix.shape[0], matrix.nnz, loaded - started, exported - loaded, time.time() - exported)
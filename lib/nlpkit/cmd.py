@@ -2,35 +2,167 @@ import argparse
 import atexit
 import json
 import os
+import sqlite3
 import sys
+import time
 import pymongo
 from nlpkit import new_id
 
+# The fields runs can be grouped by. args is grouped by its JSON form, kept in args_key.
+GROUP_FIELDS = {'command': 'command', 'argv': 'argv', 'args': 'args_key'}
+TIME_FIELDS = ('wall_time', 'utime', 'stime', 'cutime', 'cstime')
+
+
+def open_sink(spec=None):
+    """Return the sink named by spec, or by the NLPKIT_CMD_RUNS environment variable.
+
+    'mongo' or a mongodb:// URI is the nlpkit.cmd_runs collection (the default), a
+    file ending in .jsonl a JSON lines file, and any other file an SQLite database.
+    """
+    spec = spec or os.environ.get('NLPKIT_CMD_RUNS', 'mongo')
+    if spec == 'mongo' or spec.startswith('mongodb://'):
+        return MongoSink(None if spec == 'mongo' else spec)
+    elif spec.endswith('.jsonl'):
+        return JsonlSink(spec)
+    else:
+        return SqliteSink(spec)
+
+
+class MongoSink(object):
+    def __init__(self, host=None):
+        self._collection = pymongo.Connection(host).nlpkit.cmd_runs
+
+    def insert(self, record):
+        self._collection.insert(record)
+
+    def ensure_indexes(self):
+        for field in GROUP_FIELDS.values():
+            self._collection.ensure_index([(field, pymongo.ASCENDING), ('started', pymongo.ASCENDING)])
+
+    def runs(self, by, fields, command=None, since=None):
+        """Yield runs with the given fields, ordered by the group field and start time."""
+        self.ensure_indexes()
+        spec = {}
+        if command:
+            spec['command'] = command
+        if since:
+            spec['started'] = {'$gte': since}
+        fields = list(set(fields) | set([GROUP_FIELDS[by], 'started']))
+        cursor = self._collection.find(spec, fields).sort([(GROUP_FIELDS[by], pymongo.ASCENDING),
+                                                           ('started', pymongo.ASCENDING)])
+        for record in cursor:
+            record['_id'] = str(record['_id'])
+            yield record
+
+
+class SqliteSink(object):
+    COLUMNS = ('_id', 'command', 'argv', 'args_key', 'started', 'pid') + TIME_FIELDS
+
+    def __init__(self, filename):
+        self._conn = sqlite3.connect(filename)
+        with self._conn:
+            self._conn.execute("CREATE TABLE IF NOT EXISTS cmd_runs (_id TEXT PRIMARY KEY, command TEXT, "
+                               "argv TEXT, args_key TEXT, started REAL, pid INTEGER, wall_time REAL, utime REAL, "
+                               "stime REAL, cutime REAL, cstime REAL, record TEXT)")
+
+    def insert(self, record):
+        values = [str(record['_id'])] + [record.get(c) for c in self.COLUMNS[1:]]
+        values.append(json.dumps(dict(record, _id=str(record['_id'])), sort_keys=True))
+        with self._conn:
+            self._conn.execute("INSERT INTO cmd_runs ({}, record) VALUES ({})".format(
+                ", ".join(self.COLUMNS), ", ".join("?" * (len(self.COLUMNS) + 1))), values)
+
+    def ensure_indexes(self):
+        with self._conn:
+            for field in GROUP_FIELDS.values():
+                self._conn.execute("CREATE INDEX IF NOT EXISTS cmd_runs_{0} ON cmd_runs ({0}, started)".format(field))
+
+    def runs(self, by, fields, command=None, since=None):
+        self.ensure_indexes()
+        columns = [c for c in self.COLUMNS if c in fields or c in (GROUP_FIELDS[by], 'started')]
+        conditions, params = [], []
+        if command:
+            conditions.append("command = ?")
+            params.append(command)
+        if since:
+            conditions.append("started >= ?")
+            params.append(since)
+        sql = "SELECT {} FROM cmd_runs{} ORDER BY {}, started".format(
+            ", ".join(columns), " WHERE " + " AND ".join(conditions) if conditions else "", GROUP_FIELDS[by])
+        for row in self._conn.execute(sql, params):
+            yield dict(zip(columns, row))
+
+
+class JsonlSink(object):
+    def __init__(self, filename):
+        self.filename = filename
+
+    def insert(self, record):
+        # Each line goes out in a single write to a file opened with O_APPEND, so the lines
+        # of processes that finish at the same time do not get mixed up
+        line = json.dumps(dict(record, _id=str(record['_id'])), sort_keys=True) + "\n"
+        fd = os.open(self.filename, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+        try:
+            os.write(fd, line)
+        finally:
+            os.close(fd)
+
+    def ensure_indexes(self):
+        pass
+
+    def runs(self, by, fields, command=None, since=None):
+        """The file has no indexes, so all runs are read and sorted in memory."""
+        keep = set(fields) | set([GROUP_FIELDS[by], 'started'])
+        runs = []
+        if os.path.exists(self.filename):
+            with open(self.filename) as f:
+                for line in f:
+                    record = json.loads(line)
+                    if command and record.get('command') != command:
+                        continue
+                    if since and (record.get('started') or 0) < since:
+                        continue
+                    runs.append(dict((k, v) for k, v in record.iteritems() if k in keep))
+        runs.sort(key=lambda r: (r.get(GROUP_FIELDS[by]), r.get('started')))
+        return iter(runs)
+
+
 class CmdRun(object):
-    def __init__(self, args):
+    def __init__(self, args, sink=None):
         self.id = new_id()
         self.args = args
+        self.sink = sink
+        self.started = time.time()
+        self.annotations = {}
         atexit.register(self.save_stats)
 
+    def annotate(self, **fields):
+        """Add fields to the record of the run, e.g. statistics of the work it did."""
+        self.annotations.update(fields)
+
     def save_stats(self):
-        conn = pymongo.Connection()
-        db = conn.nlpkit
-        db.cmd_runs.insert(self.stringify(self.stats()))
+        sink = self.sink if self.sink is not None else open_sink()
+        sink.insert(self.stringify(self.stats()))
 
     def stats(self):
         times = os.times()
-        return {
+        args = vars(self.args)
+        return dict(self.annotations, **{
             '_id': pymongo.objectid.ObjectId(self.id),
             'utime': times[0],
             'stime': times[1],
             'cutime': times[2],
             'cstime': times[3],
             'elapsed_time': times[4],
-            'args': vars(self.args),
+            'started': self.started,
+            'wall_time': time.time() - self.started,
+            'args': args,
+            'args_key': json.dumps(self.stringify(args), sort_keys=True),
             'env': dict(os.environ),
             'pid': os.getpid(),
+            'command': os.path.basename(sys.argv[0]),
             'argv': " ".join(sys.argv)
-        }
+        })
 
     def stringify(self, obj):
         if isinstance(obj, dict):
@@ -0,0 +1,108 @@
+# coding: utf-8
+"""Time distributions and regressions of the runs recorded by CmdRun.
+
+Runs are grouped by command name, full command line (argv) or parsed arguments (args),
+and the sinks return them ordered by group and start time, so each group is read as
+one consecutive stretch and never more than one group is held in memory.
+
+A run is flagged as a regression when its time is well above the rolling baseline of
+the runs of the same group before it. The baseline is the median of the previous
+window runs, and their spread the median absolute deviation (MAD), which a single
+slow run does not inflate the way it would a standard deviation.
+"""
+from datetime import datetime
+from itertools import groupby
+
+import numpy as np
+from numpy.lib.stride_tricks import as_strided
+
+from nlpkit.cmd import GROUP_FIELDS
+
+__author__ = "anders"
+
+SUMMARY_FIELDS = ('group', 'count', 'mean', 'std', 'min', 'p50', 'p90', 'p99', 'max', 'first', 'last')
+REGRESSION_FIELDS = ('group', 'id', 'started', 'value', 'baseline', 'mad', 'score')
+
+# Scales the MAD to the standard deviation for normally distributed times
+MAD_SCALE = 1.4826
+
+
+def _timestamp(t):
+    return datetime.fromtimestamp(t).isoformat() if t is not None else None
+
+
+def grouped_runs(sink, by='argv', metric='wall_time', command=None, since=None):
+    """Yield (group, start times, ids, values) for each group of runs that have metric.
+
+    Runs recorded before CmdRun kept wall times (or start times) are skipped.
+    """
+    field = GROUP_FIELDS[by]
+    runs = sink.runs(by, ['_id', metric], command=command, since=since)
+    for group, group_runs in groupby(runs, lambda r: r.get(field)):
+        started, ids, values = [], [], []
+        for run in group_runs:
+            if run.get(metric) is None or run.get('started') is None:
+                continue
+            started.append(run['started'])
+            ids.append(run['_id'])
+            values.append(run[metric])
+        if values:
+            yield group, np.array(started), ids, np.array(values, dtype=float)
+
+
+def summarize(group, started, values):
+    p50, p90, p99 = np.percentile(values, [50, 90, 99])
+    return {'group': group, 'count': len(values), 'mean': values.mean(), 'std': values.std(),
+            'min': values.min(), 'p50': p50, 'p90': p90, 'p99': p99, 'max': values.max(),
+            'first': _timestamp(started.min()), 'last': _timestamp(started.max())}
+
+
+def rolling_baseline(values, window=30, min_history=5):
+    """Return the median and MAD of the up to window values before each value.
+
+    Both are NaN where fewer than min_history values come before.
+    """
+    n = len(values)
+    median, mad = np.empty(n), np.empty(n)
+    median.fill(np.nan)
+    mad.fill(np.nan)
+    # The first values have a shorter history than the window
+    for i in range(min_history, min(window, n)):
+        median[i] = np.median(values[:i])
+        mad[i] = np.median(np.abs(values[:i] - median[i]))
+    if n > window:
+        # One row per full window: row k holds values[k:k+window], the history of value k+window
+        stride = values.strides[0]
+        windows = as_strided(values, shape=(n - window, window), strides=(stride, stride))
+        median[window:] = np.median(windows, axis=1)
+        mad[window:] = np.median(np.abs(windows - median[window:, np.newaxis]), axis=1)
+    return median, mad
+
+
+def find_regressions(group, started, ids, values, window=30, threshold=4.0, min_increase=0.25, min_history=5):
+    """Return the runs of a group whose value exceeds the rolling baseline by threshold
+    scaled MADs and by at least min_increase (a fraction of the baseline).
+
+    The relative bound keeps runs with near constant times from being flagged for
+    differences that are only noise.
+    """
+    median, mad = rolling_baseline(values, window, min_history)
+    spread = np.maximum(mad * MAD_SCALE, 1e-9)
+    with np.errstate(invalid='ignore'):
+        score = (values - median) / spread
+        flagged = (score > threshold) & (values > median * (1 + min_increase))
+    return [{'group': group, 'id': ids[i], 'started': _timestamp(started[i]), 'value': values[i],
+             'baseline': median[i], 'mad': mad[i], 'score': score[i]}
+            for i in np.flatnonzero(flagged)]
+
+
+def summaries(sink, by='argv', metric='wall_time', command=None, since=None):
+    return [summarize(group, started, values)
+            for group, started, ids, values in grouped_runs(sink, by, metric, command, since)]
+
+
+def regressions(sink, by='argv', metric='wall_time', command=None, since=None, **kwargs):
+    found = []
+    for group, started, ids, values in grouped_runs(sink, by, metric, command, since):
+        found.extend(find_regressions(group, started, ids, values, **kwargs))
+    return found
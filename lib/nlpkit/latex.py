@@ -0,0 +1,118 @@
+# coding: utf-8
+"""Rendering of LaTeX tables to PDF.
+
+pdflatex is slow to start, so PdfRenderer keeps every PDF it produces in a cache keyed
+on the hash of the LaTeX source and only runs pdflatex for sources it has not seen.
+Each run happens in its own temporary directory, so concurrent renderings never
+overwrite each other's output. Many tables can be rendered at once, either as pages of
+one document (wrap_many) or by a pool of concurrent pdflatex runs (render_many).
+"""
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+from hashlib import sha1
+from multiprocessing.pool import ThreadPool
+
+__author__ = "anders"
+
+PREAMBLE = r"""\setlength\PreviewBorder{10mm}
+\usepackage{graphicx}
+\usepackage{amssymb}
+\usepackage{booktabs}
+\usepackage{multirow}
+"""
+
+STANDALONE_TEMPLATE = r"""\documentclass{standalone}
+%s
+\begin{document}
+%s
+\end{document}"""
+
+# With the multi option, standalone puts each nlpkittable environment on a page of its own
+MULTI_TEMPLATE = r"""\documentclass[multi=nlpkittable]{standalone}
+%s\newenvironment{nlpkittable}{}{}
+
+\begin{document}
+%s
+\end{document}"""
+
+
+class LatexError(StandardError):
+    def __init__(self, message, log):
+        StandardError.__init__(self, message)
+        self.log = log
+
+
+def wrap(body):
+    """Wrap a table in a standalone LaTeX document."""
+    return STANDALONE_TEMPLATE % (PREAMBLE, body)
+
+
+def wrap_many(bodies):
+    """Wrap several tables in one standalone LaTeX document, one table per page."""
+    pages = "\n\n".join("\\begin{nlpkittable}\n%s\n\\end{nlpkittable}" % body for body in bodies)
+    return MULTI_TEMPLATE % (PREAMBLE, pages)
+
+
+def default_cache_dir():
+    return os.path.join(os.environ.get('XDG_CACHE_HOME', os.path.expanduser('~/.cache')), 'nlpkit', 'pdf')
+
+
+class PdfRenderer(object):
+    def __init__(self, cache_dir=None, command='pdflatex', processes=4):
+        self.cache_dir = cache_dir or default_cache_dir()
+        self.command = command
+        self.processes = processes
+        if not os.path.isdir(self.cache_dir):
+            os.makedirs(self.cache_dir)
+
+    def cache_path(self, source):
+        key = sha1(self.command + "\0" + source).hexdigest()
+        return os.path.join(self.cache_dir, key + ".pdf")
+
+    def render(self, source):
+        """Return the path of the PDF made from a complete LaTeX document.
+
+        Raises LatexError with the pdflatex log if the document does not compile.
+        """
+        pdf_path = self.cache_path(source)
+        if os.path.exists(pdf_path):
+            return pdf_path
+
+        # The job directory is inside the cache directory, so the finished PDF can be
+        # moved into place atomically
+        job_dir = tempfile.mkdtemp(prefix='job-', dir=self.cache_dir)
+        try:
+            with open(os.path.join(job_dir, 'table.tex'), 'w') as f:
+                f.write(source)
+            proc = subprocess.Popen([self.command, '-interaction=nonstopmode', '-halt-on-error', 'table.tex'],
+                                    cwd=job_dir, stdin=subprocess.PIPE, stdout=subprocess.PIPE,
+                                    stderr=subprocess.STDOUT)
+            log, _ = proc.communicate()
+            if proc.returncode != 0:
+                raise LatexError("PDF file creation failed", log)
+            os.rename(os.path.join(job_dir, 'table.pdf'), pdf_path)
+        finally:
+            shutil.rmtree(job_dir, ignore_errors=True)
+        return pdf_path
+
+    def render_many(self, sources):
+        """Render several documents with a pool of concurrent pdflatex runs.
+
+        Returns their PDF paths in the order given. Identical sources are rendered once.
+        """
+        distinct = list(set(sources))
+        pool = ThreadPool(min(self.processes, len(distinct)) or 1)
+        try:
+            paths = dict(zip(distinct, pool.map(self.render, distinct)))
+        finally:
+            pool.close()
+        return [paths[source] for source in sources]
+
+
+def open_pdf(path):
+    """Open a PDF file in the desktop's viewer."""
+    opener = 'open' if sys.platform == 'darwin' else 'xdg-open'
+    subprocess.Popen([opener, path])
@@ -0,0 +1,306 @@
+# coding: utf-8
+"""Running line oriented command line tools over large inputs with a pool of long-lived processes.
+
+    >>> with ToolPool(['sed', '-u', 's/colour/color/g'], processes=4, batch_size=500) as pool:
+    ...     for line in pool.imap(open('corpus.txt')):
+    ...         print line
+
+The input lines are cut into batches, and each batch is written to the stdin of one
+of the tool processes and its output read back from the tool's stdout. The output
+lines are yielded in the order of the input, whichever process finished first.
+
+The tools are started once and kept running, so they must read records from stdin
+and write their output for a record before waiting for the next one (i.e. not
+buffer their output; use sed -u, python -u and so on). The end of a batch's output
+is found in one of two ways:
+
+- by default the tool writes exactly one output line per input line, as cat, sed
+  and most taggers with one token per line do.
+- with a delimiter, a line with the delimiter is written after each batch, and the
+  tool is expected to pass it through unchanged. The output of the batch is all the
+  lines up to the delimiter, however many there are.
+
+Backpressure: the input is read through a bounded queue of batches, and at most
+max_in_flight batches are read before their output has been yielded, so neither a
+slow consumer nor one slow batch makes the pool buffer the whole input.
+
+A tool process that exits or closes its stdout in the middle of a batch is
+restarted, and the batch is given to the new process. A batch that has crashed
+the tool more than retries times is an error.
+"""
+import subprocess
+import threading
+import time
+from Queue import Queue
+
+import numpy as np
+
+__author__ = "anders"
+
+
+class ToolError(Exception):
+    pass
+
+
+class _Worker(object):
+    """One tool process, and the stats of the batches it has run."""
+    def __init__(self, number, command, env=None, cwd=None):
+        self.number = number
+        self.command = command
+        self.env = env
+        self.cwd = cwd
+        self.process = None
+        self.batches = 0
+        self.lines_in = 0
+        self.lines_out = 0
+        self.busy_time = 0.0
+        self.latencies = []
+        self.restarts = 0
+        self.crashes = 0
+        self.start()
+
+    def start(self):
+        # Buffered pipes; unbuffered ones make readline() read a byte at a time
+        self.process = subprocess.Popen(self.command, stdin=subprocess.PIPE, stdout=subprocess.PIPE,
+                                        bufsize=-1, env=self.env, cwd=self.cwd, close_fds=True)
+
+    def restart(self):
+        self.kill()
+        self.start()
+        self.restarts += 1
+
+    def kill(self):
+        if self.process.poll() is None:
+            self.process.kill()
+        self.process.wait()
+
+    def close(self):
+        try:
+            self.process.stdin.close()
+        except IOError:
+            pass
+        self.process.wait()
+
+    def _write(self, lines, delimiter):
+        # Runs in a thread of its own, so that a tool filling its stdout pipe while the
+        # batch is still being written does not dead lock with the reader
+        try:
+            stdin = self.process.stdin
+            stdin.writelines(lines)
+            if delimiter is not None:
+                stdin.write(delimiter + "\n")
+            stdin.flush()
+        except IOError:
+            # The tool has exited; the reader sees the end of its output
+            pass
+
+    def run(self, lines, delimiter=None):
+        """Return the output lines of a batch of input lines, or None if the tool crashed."""
+        started = time.time()
+        writer = threading.Thread(target=self._write, args=(lines, delimiter))
+        writer.daemon = True
+        writer.start()
+        stdout = self.process.stdout
+        output = []
+        if delimiter is None:
+            for _ in xrange(len(lines)):
+                line = stdout.readline()
+                if not line:
+                    break
+                output.append(line.rstrip("\n"))
+            complete = len(output) == len(lines)
+        else:
+            complete = False
+            while True:
+                line = stdout.readline()
+                if not line:
+                    break
+                line = line.rstrip("\n")
+                if line == delimiter:
+                    complete = True
+                    break
+                output.append(line)
+        writer.join()
+        if not complete:
+            self.crashes += 1
+            return None
+        elapsed = time.time() - started
+        self.batches += 1
+        self.lines_in += len(lines)
+        self.lines_out += len(output)
+        self.busy_time += elapsed
+        self.latencies.append(elapsed)
+        return output
+
+    def stats(self):
+        latencies = np.array(self.latencies or [0.0])
+        return {
+            'worker': self.number,
+            'pid': self.process.pid,
+            'batches': self.batches,
+            'lines_in': self.lines_in,
+            'lines_out': self.lines_out,
+            'busy_time': self.busy_time,
+            'lines_per_second': self.lines_in / self.busy_time if self.busy_time else 0.0,
+            'latency_mean': float(latencies.mean()),
+            'latency_median': float(np.median(latencies)),
+            'latency_p95': float(np.percentile(latencies, 95)),
+            'latency_max': float(latencies.max()),
+            'crashes': self.crashes,
+            'restarts': self.restarts,
+        }
+
+
+class ToolPool(object):
+    """A pool of processes running the same command line tool.
+
+    command is an argument list for subprocess.Popen. batch_size is the number of
+    input lines per batch, queue_size the number of batches read ahead of the
+    workers, and max_in_flight the number of batches read from the input but not
+    yet yielded (at least processes).
+    """
+    def __init__(self, command, processes=4, batch_size=1000, queue_size=None, max_in_flight=None,
+                 delimiter=None, retries=2, env=None, cwd=None):
+        self.command = command
+        self.processes = processes
+        self.batch_size = batch_size
+        self.queue_size = queue_size or 2 * processes
+        self.max_in_flight = max(max_in_flight or 4 * processes, processes)
+        self.delimiter = delimiter
+        self.retries = retries
+        self.started = time.time()
+        self.wall_time = None
+        self.workers = [_Worker(i, command, env, cwd) for i in range(processes)]
+
+    def _batches(self, lines):
+        batch = []
+        for line in lines:
+            if not line.endswith("\n"):
+                line += "\n"
+            batch.append(line)
+            if len(batch) == self.batch_size:
+                yield batch
+                batch = []
+        if batch:
+            yield batch
+
+    def _feed(self, lines, tasks, in_flight, failed):
+        try:
+            for i, batch in enumerate(self._batches(lines)):
+                in_flight.acquire()
+                if failed.is_set():
+                    break
+                tasks.put((i, batch))
+        except Exception as e:
+            failed.set()
+            tasks.put(('error', e))
+        for _ in self.workers:
+            tasks.put(None)
+
+    def _work(self, worker, tasks, results, failed):
+        try:
+            while True:
+                task = tasks.get()
+                if task is None:
+                    break
+                if task[0] == 'error':
+                    results.put(task)
+                    continue
+                i, batch = task
+                if failed.is_set():
+                    continue
+                output = None
+                for attempt in range(self.retries + 1):
+                    output = worker.run(batch, self.delimiter)
+                    if output is not None or failed.is_set():
+                        break
+                    worker.restart()
+                if failed.is_set():
+                    continue
+                elif output is None:
+                    failed.set()
+                    results.put(('error', ToolError("batch {} crashed {} {} times".format(
+                        i, " ".join(self.command), self.retries + 1))))
+                else:
+                    results.put((i, output))
+        except Exception as e:
+            # E.g. the tool cannot be restarted because its executable is gone
+            failed.set()
+            results.put(('error', e))
+        finally:
+            results.put(('done', worker.number))
+
+    def imap_batches(self, lines):
+        """Yield the list of output lines of each batch of input lines, in order."""
+        tasks = Queue(self.queue_size)
+        results = Queue()
+        in_flight = threading.Semaphore(self.max_in_flight)
+        failed = threading.Event()
+        threads = [threading.Thread(target=self._feed, args=(lines, tasks, in_flight, failed))]
+        threads += [threading.Thread(target=self._work, args=(worker, tasks, results, failed))
+                    for worker in self.workers]
+        for thread in threads:
+            thread.daemon = True
+            thread.start()
+
+        pending = {}
+        next_batch = 0
+        running = len(self.workers)
+        error = None
+        try:
+            while running:
+                key, value = results.get()
+                if key == 'done':
+                    running -= 1
+                elif key == 'error':
+                    error = error or value
+                    failed.set()
+                    # Let the feeder run to the end of the input
+                    in_flight.release()
+                else:
+                    pending[key] = value
+                    while next_batch in pending and error is None:
+                        yield pending.pop(next_batch)
+                        next_batch += 1
+                        in_flight.release()
+        finally:
+            if running:
+                # The consumer stopped early; unblock the threads and stop the tools
+                failed.set()
+                for _ in range(self.max_in_flight):
+                    in_flight.release()
+                for worker in self.workers:
+                    worker.kill()
+        if error is not None:
+            raise error
+        self.wall_time = time.time() - self.started
+
+    def imap(self, lines):
+        """Yield the output lines of the input lines, in order."""
+        for output in self.imap_batches(lines):
+            for line in output:
+                yield line
+
+    def close(self):
+        for worker in self.workers:
+            worker.close()
+        if self.wall_time is None:
+            self.wall_time = time.time() - self.started
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def stats(self):
+        """Return the pool's settings and the throughput and latencies of each worker."""
+        return {
+            'command': " ".join(self.command),
+            'processes': self.processes,
+            'batch_size': self.batch_size,
+            'queue_size': self.queue_size,
+            'max_in_flight': self.max_in_flight,
+            'wall_time': self.wall_time,
+            'workers': [worker.stats() for worker in self.workers],
+        }
@@ -0,0 +1,367 @@
+# coding: utf-8
+"""Tables of experiment results, as produced by bin/result-table.py.
+
+Results are dicts of configuration keys and metrics, read from files holding either a
+JSON list or a stream of concatenated JSON objects. ResultTable lays them out with
+the distinct values of some keys as rows and of others as columns. It works on
+columnar numpy arrays: the row and column keys are factorized to integer codes, and
+when several results (e.g. runs with different seeds) fall in one cell they are
+aggregated with vectorized group-bys.
+"""
+from itertools import groupby, chain
+from json import JSONDecoder
+from multiprocessing import Pool
+import re
+import sys
+
+import numpy as np
+
+AGGREGATES = ('mean', 'std', 'count', 'min', 'max')
+
+
+def iter_json_objects(contents):
+    """Yield the objects of a string holding one or more concatenated JSON values."""
+    decoder = JSONDecoder()
+    next_obj_pat = re.compile(r"\S")
+    m = next_obj_pat.search(contents)
+    while m:
+        obj, stop = decoder.raw_decode(contents, m.start())
+        yield obj
+        m = next_obj_pat.search(contents, stop)
+
+
+def read_results(filename):
+    """Return the list of results in a file with a JSON list or a stream of JSON objects.
+
+    The filename '-' reads standard input.
+    """
+    if filename == '-':
+        contents = sys.stdin.read()
+    else:
+        with open(filename) as f:
+            contents = f.read()
+    results = []
+    for obj in iter_json_objects(contents):
+        if isinstance(obj, list):
+            results.extend(obj)
+        else:
+            results.append(obj)
+    return results
+
+
+def result_columns(results, keys):
+    """Return a dict of numpy arrays holding the values of keys in the list of results.
+
+    Results that miss one of the keys, or have a null value for it, are left out, as
+    ResultStore.columns does.
+    """
+    results = [result for result in results if all(result.get(key) is not None for key in keys)]
+    return dict((key, np.array([result[key] for result in results], dtype=object)) for key in keys)
+
+
+def _read_columns(args):
+    filename, keys = args
+    return result_columns(read_results(filename), keys)
+
+
+def load_columns(filenames, keys, processes=None):
+    """Read the values of keys from many result files, in parallel worker processes.
+
+    Only the requested columns are sent back from the workers, as numpy arrays.
+    """
+    jobs = [(filename, keys) for filename in filenames]
+    # Standard input can only be read in this process
+    parts = [_read_columns(job) if job[0] == '-' else None for job in jobs]
+    positions = [i for i, part in enumerate(parts) if part is None]
+    if len(positions) == 1 or processes == 1:
+        read = map(_read_columns, [jobs[i] for i in positions])
+    elif positions:
+        pool = Pool(processes)
+        try:
+            read = pool.map(_read_columns, [jobs[i] for i in positions])
+        finally:
+            pool.close()
+    else:
+        read = []
+    for i, part in zip(positions, read):
+        parts[i] = part
+    return dict((key, np.concatenate([part[key] for part in parts])) for key in keys)
+
+
+class ConstraintList(object):
+    pass
+
+class Constraint(object):
+    def __init__(self, keys, values):
+        self.keys = keys
+        self.values = values
+
+    def __repr__(self):
+        constrained = ', '.join('{}={}'.format(k,v) for k,v in zip(self.keys, self.values)) or 'nothing'
+        return '<{} constrains {}>'.format(self.__class__.__name__, constrained)
+
+    def __key(self):
+        return tuple(chain.from_iterable([self.keys, self.values]))
+
+    def allows(self, result):
+        return all(result[k] == v for k, v in zip(self.keys, self.values))
+
+    def allows_count(self, results):
+        return len(filter(None, (self.allows(result) for result in results)))
+
+    def __hash__(self):
+        return hash(self.__key())
+
+    def __eq__(self, other):
+        return self.__key() == other.__key()
+
+
+
+class ResultTable(object):
+    """Results laid out by the values of row_names and column_names.
+
+    results is either a list of result dicts or a dict of columns (arrays of equal
+    length) keyed by name. Each cell holds the chosen metric of the results that fall in
+    it. Without aggregates a cell may hold at most one result; otherwise table holds the
+    first of the aggregates (see AGGREGATES) and tables all of them, keyed by name.
+    Empty cells are NaN.
+    """
+    def __init__(self, results, column_names, row_names, metric='precision', aggregates=None):
+        self.column_names = list(column_names or [])
+        self.row_names = list(row_names or [])
+        self.metric = metric
+        self.aggregates = list(aggregates or [])
+        for aggregate in self.aggregates:
+            if aggregate not in AGGREGATES:
+                raise ValueError("Unknown aggregate {}".format(aggregate))
+        if isinstance(results, dict):
+            self.data = results
+        else:
+            self.data = result_columns(results, set(self.column_names) | set(self.row_names) | set([metric]))
+        self.values = np.asarray(self.data[metric], dtype=float)
+        self.rows, row_codes = self._constraints(self.row_names)
+        self.columns, column_codes = self._constraints(self.column_names)
+        self.cells = row_codes * len(self.columns) + column_codes
+        self.tables = self._build_tables()
+        self.table = self.tables[self.aggregates[0] if self.aggregates else 'value']
+
+    def _constraints(self, keys):
+        """Return the constraints of the distinct combinations of values of keys, and the
+        integer code of each result's combination."""
+        n = len(self.values)
+        if not keys:
+            return [Constraint(keys, ())], np.zeros(n, dtype=np.int64)
+        uniques, codes = zip(*[np.unique(self.data[key], return_inverse=True) for key in keys])
+        combined = np.ravel_multi_index(codes, [len(u) for u in uniques]) if n else np.zeros(0, dtype=np.int64)
+        present, combined_codes = np.unique(combined, return_inverse=True)
+        value_codes = np.unravel_index(present, [len(u) for u in uniques])
+        constraints = [Constraint(keys, tuple(u[c[i]] for u, c in zip(uniques, value_codes)))
+                       for i in range(len(present))]
+        return constraints, combined_codes
+
+    def _build_tables(self):
+        shape = (len(self.rows), len(self.columns))
+        size = shape[0] * shape[1]
+        counts = np.bincount(self.cells, minlength=size)
+        empty = counts == 0
+        tables = {'count': counts.reshape(shape)}
+
+        if not self.aggregates:
+            if (counts > 1).any():
+                self._raise_underconstrained(np.flatnonzero(counts > 1)[0], shape)
+            table = np.empty(size)
+            table.fill(np.nan)
+            table[self.cells] = self.values
+            tables['value'] = table.reshape(shape)
+            return tables
+
+        with np.errstate(invalid='ignore', divide='ignore'):
+            mean = np.bincount(self.cells, self.values, minlength=size) / counts
+            deviations = self.values - mean[self.cells]
+            std = np.sqrt(np.bincount(self.cells, deviations ** 2, minlength=size) / counts)
+        tables['mean'] = mean.reshape(shape)
+        tables['std'] = std.reshape(shape)
+
+        # Sorting by cell and then value puts each cell's minimum first and maximum last
+        order = np.lexsort((self.values, self.cells))
+        sorted_cells, sorted_values = self.cells[order], self.values[order]
+        present = ~empty
+        starts = np.searchsorted(sorted_cells, np.arange(size), side='left')
+        ends = np.searchsorted(sorted_cells, np.arange(size), side='right')
+        minimum, maximum = np.empty(size), np.empty(size)
+        minimum.fill(np.nan)
+        maximum.fill(np.nan)
+        minimum[present] = sorted_values[starts[present]]
+        maximum[present] = sorted_values[ends[present] - 1]
+        tables['min'] = minimum.reshape(shape)
+        tables['max'] = maximum.reshape(shape)
+        return tables
+
+    def _raise_underconstrained(self, cell, shape):
+        i, j = divmod(cell, shape[1])
+        row, column = self.rows[i], self.columns[j]
+        matches = np.flatnonzero(self.cells == cell)
+        msg = "Cell {},{} is underconstrained. ".format(i, j)
+        msg += "Row constraint {} and column constraint {} fit {} results\n"\
+            .format(row, column, len(matches))
+        for k, index in enumerate(matches):
+            result = dict((key, column_values[index]) for key, column_values in self.data.items())
+            msg += "\t{}: {}\n".format(k+1, result)
+        raise StandardError(msg)
+
+    def constraint_spans(self, constraints, dim):
+        i = 0
+        for k, group in groupby(constraints, lambda c: c.values[dim]):
+            col_group = list(group)
+            yield (i, i + len(col_group)), col_group[0].values[dim]
+            i += len(col_group)
+
+
+class LatexTableRow(object):
+    def __init__(self):
+        self._cells = []
+
+    def _add_cell(self, name, span, dir, prepend, bf):
+        name = name.replace("_", r"\_")
+        if bf:
+            name = "\\bf{%s}" % name
+
+        if span > 1 and dir == 'col':
+            cell_def = "\\multicolumn{%d}{c}{%s}" % (span, name)
+        elif span > 1 and dir == 'row':
+            cell_def = "\\multirow{%d}{*}{%s}" % (span, name)
+        else:
+            cell_def = name
+
+        if prepend:
+            self._cells = [cell_def] + self._cells
+        else:
+            self._cells.append(cell_def)
+
+    def append_cell(self, name, span=1, dir='col', bf=False):
+        return self._add_cell(name, span, dir, prepend=False, bf=bf)
+
+    def prepend_cell(self, name, span=1, dir='col', bf=False):
+        return self._add_cell(name, span, dir, prepend=True, bf=bf)
+
+    def build(self):
+        return ' & '.join(self._cells) + r" \\"
+
+class LatexTableFormatter(object):
+    def __init__(self, result_table):
+        self._rt = result_table
+
+    def build(self):
+        lines = []
+        lines.extend(self._header())
+        lines.extend(self._body())
+        lines.extend(self._footer())
+        return "\n".join(lines)
+
+    def _header(self):
+        prepend_width = len(self._rt.row_names)
+        inner_width = self._rt.table.shape[1]
+        lines = []
+        lines.append("\\begin{tabular}{%s%s}" % ("l"*prepend_width, "c"*inner_width))
+        lines.append("\\toprule")
+
+        for i, column_name in enumerate(self._rt.column_names):
+            midrules = []
+            row = LatexTableRow()
+            row.append_cell('', span=prepend_width)
+            if i == 0:
+                row.append_cell(self._format_legend(column_name), inner_width, bf=True)
+                midrules.append("\\cmidrule(lr){%i-%i}" % (prepend_width+1, prepend_width+inner_width))
+            else:
+                distinct_values = set(constr.values[i-1] for constr in self._rt.columns)
+                width = inner_width / len(distinct_values)
+                for j in range(len(distinct_values)):
+                    row.append_cell(self._format_legend(column_name), width, bf=True)
+                    midrules.append("\\cmidrule(lr){%i-%i}" % (1+prepend_width+j*width,
+                                                          prepend_width+(j+1)*width ))
+            lines.append(row.build())
+            lines.extend(midrules)
+
+            row = LatexTableRow()
+
+            row.append_cell('', span=prepend_width)
+            for span, name in self._rt.constraint_spans(self._rt.columns, i):
+                row.append_cell(self._format_legend(name), span[1] - span[0])
+            lines.append(row.build())
+            lines.extend(midrules)
+
+
+#        lines.append("\\cmidrule(lr){%i-%i}" % (prepend_width+1, prepend_width+inner_width))
+
+        # Build type legend
+        row = LatexTableRow()
+        row.append_cell('', span=prepend_width)
+        for i in range(inner_width):
+            row.append_cell("\\%")
+
+        lines.append(row.build())
+        lines.append("\\midrule")
+
+        # Build row name legend
+        row = LatexTableRow()
+        for row_name in self._rt.row_names:
+            row.append_cell(self._format_legend(row_name), bf=True)
+        row.append_cell('', span=inner_width)
+        lines.append(row.build())
+
+        return lines
+
+
+    def _body(self):
+        lines = []
+        # The spans beginning at each row, for each row dimension
+        span_starts = [dict((span[0], (span, val)) for span, val in self._rt.constraint_spans(self._rt.rows, dim))
+                       for dim in range(len(self._rt.row_names))]
+        # Iterate over table rows
+        for i in range(self._rt.table.shape[0]):
+            row = LatexTableRow()
+            midrule_above = False
+
+            # Determine if a span begins at this row
+            for dim in range(len(self._rt.row_names)):
+                found = span_starts[dim].get(i, False)
+                if found and i > 0 and (found[0][1]-found[0][0]) > 1:
+                    midrule_above = True
+                if found:
+                    span, val = found
+                    row.append_cell(self._format_legend(val), span=span[1]-span[0], dir='row')
+                else:
+                    row.append_cell('')
+
+            for j in range(self._rt.table.shape[1]):
+                row.append_cell(self._format_cell(i, j))
+            if midrule_above:
+                lines.append("\\midrule")
+            lines.append(row.build())
+        return lines
+
+
+    def _footer(self):
+        return ["\\bottomrule", "\\end{tabular}"]
+
+    def _format_cell(self, i, j):
+        aggregates = self._rt.aggregates or ['value']
+        parts = []
+        for k, aggregate in enumerate(aggregates):
+            value = self._format_value(self._rt.tables[aggregate][i,j], aggregate)
+            if aggregate == 'std' and k > 0 and aggregates[k-1] == 'mean':
+                parts[-1] += " $\\pm$ " + value
+            else:
+                parts.append(value)
+        return " / ".join(parts)
+
+    def _format_value(self, value, aggregate='value'):
+        if aggregate == 'count':
+            return "%d" % value
+        if np.isnan(value):
+            return ""
+        return "%.02f" % (value*100)
+
+    def _format_legend(self, name):
+        name = name.replace("_", " ")
+        return name[0:1].upper() + name[1:]
@@ -0,0 +1,200 @@
+# coding: utf-8
+"""An indexed SQLite store of experiment results.
+
+Parsing a big results file for every table is slow when many tables are made from
+the same sweep. A ResultStore ingests the results once, with one column per result
+key, and answers queries for just the columns a table needs:
+
+    >>> store = ResultStore('sweep.db')
+    >>> store.append_file('results.json')      # only reads what was added since last time
+    >>> store.ensure_index(['model', 'dataset'])
+    >>> ResultTable(store.columns(['model', 'dataset', 'precision']), ['dataset'], ['model'])
+
+Scalar values are stored as they are; lists and dicts are stored as JSON text.
+"""
+import json
+import os
+import re
+import sqlite3
+from hashlib import sha1
+from json import JSONDecoder
+
+import numpy as np
+
+__author__ = "anders"
+
+
+def _quote(name):
+    return '"{}"'.format(name.replace('"', '""'))
+
+
+def _storable(value):
+    if isinstance(value, (list, dict)):
+        return json.dumps(value, sort_keys=True)
+    return value
+
+
+def _complete_objects(contents):
+    """Return the JSON values at the start of contents and the number of characters they take up.
+
+    Parsing stops at the first value that cannot be decoded, which is usually one still
+    being written.
+    """
+    decoder = JSONDecoder()
+    next_obj_pat = re.compile(r"\S")
+    objects, consumed = [], 0
+    m = next_obj_pat.search(contents)
+    while m:
+        try:
+            obj, stop = decoder.raw_decode(contents, m.start())
+        except ValueError:
+            break
+        objects.append(obj)
+        consumed = stop
+        m = next_obj_pat.search(contents, stop)
+    return objects, consumed
+
+
+def _prefix_digest(path, size):
+    """Return a sha1 object updated with the first size bytes of a file."""
+    digest = sha1()
+    with open(path, 'rb') as f:
+        while size > 0:
+            block = f.read(min(size, 1 << 20))
+            if not block:
+                break
+            digest.update(block)
+            size -= len(block)
+    return digest
+
+
+class ResultStore(object):
+    def __init__(self, filename):
+        self.filename = filename
+        self._conn = sqlite3.connect(filename)
+        with self._conn:
+            self._conn.execute("CREATE TABLE IF NOT EXISTS results (_id INTEGER PRIMARY KEY, _source TEXT)")
+            self._conn.execute("CREATE TABLE IF NOT EXISTS sources "
+                               "(path TEXT PRIMARY KEY, offset INTEGER, mtime REAL, digest TEXT)")
+            if 'digest' not in [row[1] for row in self._conn.execute("PRAGMA table_info(sources)")]:
+                # Stores made before digests were kept read their files again from the start
+                self._conn.execute("ALTER TABLE sources ADD COLUMN digest TEXT")
+        self._keys = self._read_keys()
+
+    def _read_keys(self):
+        return [row[1] for row in self._conn.execute("PRAGMA table_info(results)")
+                if not row[1].startswith('_')]
+
+    def keys(self):
+        return list(self._keys)
+
+    def __len__(self):
+        return self._conn.execute("SELECT COUNT(*) FROM results").fetchone()[0]
+
+    def close(self):
+        self._conn.close()
+
+    def _ensure_keys(self, keys):
+        for key in keys:
+            if key not in self._keys:
+                if key.startswith('_'):
+                    raise ValueError("Result keys starting with '_' are reserved: {}".format(key))
+                self._conn.execute("ALTER TABLE results ADD COLUMN {}".format(_quote(key)))
+                self._keys.append(key)
+
+    def append(self, results, source=None):
+        """Add a sequence of result dicts. Returns the number of results added."""
+        return self._append(results, source)
+
+    def _append(self, results, source):
+        n = 0
+        by_keys = {}
+        for result in results:
+            by_keys.setdefault(tuple(sorted(result)), []).append(result)
+            n += 1
+        with self._conn:
+            for keys, group in by_keys.iteritems():
+                self._ensure_keys(keys)
+                sql = "INSERT INTO results (_source, {}) VALUES (?, {})".format(
+                    ", ".join(_quote(k) for k in keys), ", ".join("?" * len(keys)))
+                self._conn.executemany(sql, ([source] + [_storable(result[k]) for k in keys] for result in group))
+        return n
+
+    def append_file(self, filename):
+        """Add the results in a file that have not been added before. Returns their number.
+
+        The store remembers how far into each file it has read, so a stream of concatenated
+        JSON objects that has been appended to is only read from where it left off. A
+        file whose contents up to there have changed since (it has been rewritten, not
+        appended to) is read again from the start, after its old results are removed.
+        """
+        path = os.path.abspath(filename)
+        row = self._conn.execute("SELECT offset, mtime, digest FROM sources WHERE path = ?", (path,)).fetchone()
+        offset, mtime, digest = row if row else (0, None, None)
+        size, current_mtime = os.path.getsize(path), os.path.getmtime(path)
+        if offset and size == offset and current_mtime == mtime:
+            return 0
+        read_digest = sha1()
+        if offset:
+            # Appending changes the mtime as well, so only the digest of what has been read tells
+            read_digest = _prefix_digest(path, offset) if size >= offset else None
+            if read_digest is None or read_digest.hexdigest() != digest:
+                with self._conn:
+                    self._conn.execute("DELETE FROM results WHERE _source = ?", (path,))
+                offset, read_digest = 0, sha1()
+
+        with open(path) as f:
+            f.seek(offset)
+            contents = f.read()
+        objects, consumed = _complete_objects(contents)
+        if not objects and contents.strip():
+            raise ValueError("Cannot read new results from {} at offset {}. A JSON list that has been "
+                             "rewritten must be added to a fresh store.".format(path, offset))
+        results = []
+        for obj in objects:
+            results.extend(obj if isinstance(obj, list) else [obj])
+        read_digest.update(contents[:consumed])
+
+        n = self._append(results, path)
+        with self._conn:
+            self._conn.execute("INSERT OR REPLACE INTO sources (path, offset, mtime, digest) VALUES (?, ?, ?, ?)",
+                               (path, offset + consumed, current_mtime, read_digest.hexdigest()))
+        return n
+
+    def _known_keys(self, keys):
+        """Return whether all keys have a column, checking again for columns added by other connections."""
+        if not all(key in self._keys for key in keys):
+            self._keys = self._read_keys()
+        return all(key in self._keys for key in keys)
+
+    def ensure_index(self, keys):
+        """Create an index on the given keys, unless there is one already. Returns whether there is one.
+
+        No index is made while a key is in no result, since columns are only added with results.
+        """
+        if not self._known_keys(keys):
+            return False
+        name = "idx_" + sha1("\0".join(keys).encode('utf-8')).hexdigest()[:16]
+        with self._conn:
+            self._conn.execute("CREATE INDEX IF NOT EXISTS {} ON results ({})".format(
+                name, ", ".join(_quote(k) for k in keys)))
+        return True
+
+    def columns(self, keys, where=None):
+        """Return a dict of numpy arrays with the values of keys, for use with ResultTable.
+
+        Only results that have all of the keys, with values that are not null, are
+        included, as with results.result_columns; a key that no result has gives empty
+        columns. where optionally maps keys to the values they must have. The columns
+        have no type, so values only match values of the same type: 10 matches 10 and
+        10.0, but not '10'.
+        """
+        where = where or {}
+        if not self._known_keys(list(keys) + list(where)):
+            return dict((key, np.array([], dtype=object)) for key in keys)
+        conditions = ["{} IS NOT NULL".format(_quote(k)) for k in keys]
+        conditions.extend("{} = ?".format(_quote(k)) for k in where)
+        sql = "SELECT {} FROM results WHERE {}".format(", ".join(_quote(k) for k in keys), " AND ".join(conditions))
+        rows = self._conn.execute(sql, [_storable(v) for v in where.values()]).fetchall()
+        columns = zip(*rows) if rows else [()] * len(keys)
+        return dict((key, np.array(column, dtype=object)) for key, column in zip(keys, columns))
@@ -1,28 +1,49 @@
 # coding: utf-8
-from itertools import count
 import codecs
-from nlpkit.wordnet import generic
+import os
+from nlpkit.wordnet import universal
+from nlpkit.wordnet.ili import InterlingualIndex
 from nlpkit.paths import data_path
 
-class DannetSynset(generic.Synset):
+class DannetSynset(universal.Synset):
     def label(self):
         return self['label']
 
-class DannetLex(generic.LexUnit):
+    def wn_synset_ids(self, types=None, version=None):
+        """Return the ids of the Princeton WordNet synsets this synset is linked to.
+
+        Ids are returned as they are linked, in every version unless one is given, and no
+        mapping between the versions is done. DanNet links to WordNet 2.0, with ids like
+        'ENG20-03574555-n' that are not Wn30 ids; only links to WordNet 3.0
+        (version='30') give ids like '03574555-n'.
+        """
+        return [wn_id for wn_id, _ in self._wordnet.ili.links(self.id, types, version)]
+
+class DannetLex(universal.LexUnit):
     def label(self):
         return self['word']
 
     def lemma(self):
         return self['word']
 
-class Dannet(generic.Wordnet):
+class Dannet(universal.Wordnet):
     Synset = DannetSynset
     LexUnit = DannetLex
+    _hypernym_name = u'has_hyperonym'
+    _hyponym_name = u'has_hyponym'
+
+    def __init__(self):
+        super(Dannet, self).__init__()
+        self.ili = InterlingualIndex()
 
     @classmethod
     def load(cls, path):
         return DannetLoader(path).load()
 
+    def write(self, path):
+        """Write the wordnet to the directory path in the DanNet CSV format."""
+        DannetWriter(self, path).write()
+
 class DannetLoader(object):
     REVERSE_RELATIONS = {
        u'has_holonym': u'has_meronym',
@@ -44,8 +65,8 @@ class DannetLoader(object):
     def __init__(self, dannet_path):
         self.dannet_path = data_path(dannet_path)
         self.dannet = Dannet()
+        self._G = self.dannet.G
         self._words = {}
-        self._wordsense_ids = count()
 
     def load(self):
         self._load_synsets()
@@ -75,7 +96,8 @@ class DannetLoader(object):
         #  ontological_type: Ontological type of the synset, e.g. 'Comestible'
         #         or 'Vehicle+Object+Artifact'.
         def _load_synset(row):
-            self.dannet.S.add_node(row['id'], row)
+            row.update({'pos': '', 'lex_units': {}})
+            self.dannet.add_synset(row['id'], row)
         self._load_rows("synsets.csv", "id label gloss ontological_type", _load_synset)
 
     def _load_synset_attributes(self):
@@ -83,7 +105,7 @@ class DannetLoader(object):
         # name:         Name of attribute. Currently one of 'domain' and 'connotation'
         # value:        Attribute value
         def _load_synset_attribute(row):
-            self.dannet.S.node[row['synset_id']][row['name']] = row['value']
+            self._G.node[row['synset_id']][row['name']] = row['value']
         self._load_rows("synset_attributes.csv", "synset_id name value", _load_synset_attribute)
 
     def _load_words(self):
@@ -107,17 +129,25 @@ class DannetLoader(object):
         #             or 'slang'.
         #             In general, if a value is present for a word sense in
         #             this column, it may be regarded as non-standard use.
+        #
+        # The file has no word sense ids, so a word sense is keyed by its word id in the
+        # synset, which is stable between versions. The rare word that has several
+        # senses in a synset is told apart by the DDO id.
         def _load_wordsenses(row):
-            wordsense_id = self._wordsense_ids.next()
             word = self._words[row['word_id']]['form']
             pos = self._words[row['word_id']]['pos']
 
             lex_unit_data = {'word': word,
                              'pos': self.POS_MAP.get(pos) }
             lex_unit_data.update(row)
-            self.dannet.L.add_node(wordsense_id, lex_unit_data)
+            synset_data = self._G.node[row['synset_id']]
+            wordsense_id = row['word_id']
+            if wordsense_id in synset_data['lex_units']:
+                wordsense_id = u'{}/{}'.format(row['word_id'], row['ddo_id'])
+            synset_data['lex_units'][wordsense_id] = lex_unit_data
+            if not synset_data['pos'] and lex_unit_data['pos']:
+                self.dannet.set_synset_pos(row['synset_id'], lex_unit_data['pos'])
             self.dannet.add_synset_lookup(word, row['synset_id'])
-            self.dannet.L.add_edge(row['synset_id'], wordsense_id, type='synset')
         self._load_rows("wordsenses.csv", "ddo_id word_id synset_id register", _load_wordsenses)
 
     def _load_relations(self):
@@ -137,24 +167,81 @@ class DannetLoader(object):
         #             particular synset, a text comment will state from which
         #             synset the relation stems.
         def _load_relation(row):
-            # Link to Princeton Wordnet. Could possibly be imported as an empty node
+            # Link to Princeton Wordnet. Kept in the interlingual index rather than the graph
             if row['value'].startswith("ENG"):
+                self.dannet.ili.add(row['synset_id'], row['value'], row['name2'])
                 return
-            edge_attr = dict((k,v) for k,v in row.items() if k in ['inheritance_comment', 'taxonomic'])
+            edge_attr = dict((k,v) for k,v in row.items() if k in ['name', 'inheritance_comment', 'taxonomic'])
+            # Reverse relations have no name, and are written back with an empty one
+            if not edge_attr.get('name'):
+                edge_attr.pop('name', None)
             edge_attr['type'] = row['name2']
             self._add_edge_unless_dup(row['synset_id'], row['value'], edge_attr)
             if row['name2'] in self.REVERSE_RELATIONS:
                 reverse_edge_attr = dict(edge_attr)
                 reverse_edge_attr['type'] = self.REVERSE_RELATIONS[row['name2']]
+                reverse_edge_attr.pop('name', None)
                 self._add_edge_unless_dup(row['value'], row['synset_id'], reverse_edge_attr)
         self._load_rows("relations.csv", "synset_id name name2 value taxonomic inheritance_comment", _load_relation)
 
     def _add_edge_unless_dup(self, src_n, target_n, edge_attr):
         # Avoid the duplicate edges that are seemingly present in the input data
-        if src_n in self.dannet.S.edge and target_n in self.dannet.S.edge[src_n]:
-            if any(e['type'] == edge_attr['type'] for e in self.dannet.S.edge[src_n][target_n].values()):
+        if src_n in self._G.edge and target_n in self._G.edge[src_n]:
+            if any(e['type'] == edge_attr['type'] for e in self._G.edge[src_n][target_n].values()):
                 return
-        self.dannet.S.add_edge(src_n, target_n, attr_dict=edge_attr)
+        # Targets may be dummies (dummies.csv), which have no synset of their own
+        for n in (src_n, target_n):
+            if n not in self._G:
+                self.dannet.add_synset(n, {'id': n, 'label': n, 'pos': '', 'lex_units': {}, 'dummy': True})
+        self.dannet.add_relation(src_n, target_n, edge_attr)
+
+class DannetWriter(object):
+    """Writes a Dannet in the format read by DannetLoader.
+
+    Relations that the loader adds in reverse (REVERSE_RELATIONS) are written as well;
+    the loader recognizes them as duplicates when the files are read back. They are
+    written after the relations read from the files, which have a name, so that those
+    are read back first and the reverse relations made from them again.
+    """
+    POS_NAMES = dict((v, k) for k, v in DannetLoader.POS_MAP.items())
+
+    def __init__(self, dannet, path):
+        self._dannet = dannet
+        self._G = dannet.G
+        self._path = path
+
+    def write(self):
+        if not os.path.isdir(self._path):
+            os.makedirs(self._path)
+        synsets = [(n, data) for n, data in sorted(self._G.nodes_iter(data=True))
+                   if not data.get('dummy')]
+        self._write_rows("synsets.csv", "id label gloss ontological_type",
+                         (dict(data, id=n) for n, data in synsets))
+        self._write_rows("synset_attributes.csv", "synset_id name value",
+                         ({'synset_id': n, 'name': name, 'value': data[name]}
+                          for n, data in synsets
+                          for name in ('domain', 'connotation') if name in data))
+
+        lex_units = [lex_unit for n, data in synsets
+                     for _, lex_unit in sorted(data['lex_units'].items())]
+        words = dict((lu['word_id'], {'id': lu['word_id'], 'form': lu['word'], 'pos': self.POS_NAMES.get(lu['pos'], '')})
+                     for lu in lex_units)
+        self._write_rows("words.csv", "id form pos", (words[k] for k in sorted(words)))
+        self._write_rows("wordsenses.csv", "ddo_id word_id synset_id register", lex_units)
+
+        relations = [dict(data, synset_id=src_n, name2=data['type'], value=target_n)
+                     for src_n, target_n, data in self._G.edges_iter(data=True)]
+        relations.sort(key=lambda relation: 'name' not in relation)
+        relations.extend({'synset_id': local_id, 'name2': type, 'value': value}
+                         for local_id, value, type in self._dannet.ili.link_values())
+        self._write_rows("relations.csv", "synset_id name name2 value taxonomic inheritance_comment", relations)
+
+    def _write_rows(self, filename, header_line, rows):
+        header = header_line.split()
+        path = os.path.join(self._path, filename)
+        with codecs.open(path, 'w', encoding="iso8859-1") as f:
+            for row in rows:
+                f.write(u"@".join(row.get(k) or u'' for k in header) + u"\n")
 
 if __name__ == '__main__':
     path = data_path('wordnets/dannet/1.4')
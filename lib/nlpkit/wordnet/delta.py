@@ -0,0 +1,193 @@
+# coding: utf-8
+"""Differences between two versions of a wordnet.
+
+    >>> delta = diff(Dannet.load('wordnets/dannet/1.3'), Dannet.load('wordnets/dannet/1.4'))
+    >>> delta.save('dannet-1.3-1.4.delta.gz')
+    ...
+    >>> Delta.load('dannet-1.3-1.4.delta.gz').apply(running_dannet)
+
+A delta records added, removed and changed synsets, lex units, relations and lemma
+lookups (plus interlingual links for wordnets that have them). Applying it to the old
+version modifies that wordnet in place so that it equals the new one. This relies on
+the synset ids being stable between the versions, as they are for DanNet and within
+a WordNet release series.
+
+Relations have no identity of their own, so a changed relation shows up as one removed
+and one added relation.
+"""
+import gzip
+import json
+from collections import Counter
+
+from nlpkit.wordnet.frozen import thaw
+
+__author__ = "anders"
+
+FORMAT_VERSION = 1
+
+
+def _synset_fields(data):
+    return dict((k, v) for k, v in data.iteritems() if k != 'lex_units')
+
+
+def _relation_key(data):
+    return tuple(sorted(data.iteritems()))
+
+
+def _relations(G, synset_id):
+    """Return a Counter of the (target, data key) pairs of the relations out of synset_id."""
+    if synset_id not in G:
+        return Counter()
+    return Counter((target_id, _relation_key(data))
+                   for target_id, edges in G[synset_id].iteritems()
+                   for data in edges.itervalues())
+
+
+class Delta(object):
+    def __init__(self):
+        self.added_synsets = {}       # synset id -> data without lex units
+        self.removed_synsets = []
+        self.changed_synsets = {}     # synset id -> new data without lex units
+        self.added_lex_units = []     # (synset id, lex unit id, data)
+        self.removed_lex_units = []   # (synset id, lex unit id)
+        self.changed_lex_units = []   # (synset id, lex unit id, new data)
+        self.added_relations = []     # (src id, target id, data)
+        self.removed_relations = []   # (src id, target id, data)
+        self.added_lookups = []       # (word form, synset id)
+        self.removed_lookups = []
+        self.added_links = []         # (local id, link value, type)
+        self.removed_links = []
+
+    def __len__(self):
+        return sum(len(v) for v in self.__dict__.itervalues())
+
+    def summary(self):
+        return dict((k, len(v)) for k, v in self.__dict__.iteritems())
+
+    def apply(self, wordnet):
+        """Apply the delta to wordnet in place."""
+        for src_id, target_id, data in self.removed_relations:
+            key = _relation_key(data)
+            for edge_key, edge_data in wordnet.G[src_id][target_id].items():
+                if _relation_key(edge_data) == key:
+                    wordnet.remove_relation(src_id, target_id, edge_key)
+                    break
+        for synset_id in self.removed_synsets:
+            wordnet.remove_synset(synset_id)
+
+        for synset_id, data in self.added_synsets.iteritems():
+            wordnet.add_synset(synset_id, dict(data, lex_units={}))
+        for synset_id, data in self.changed_synsets.iteritems():
+            node = wordnet.G.node[synset_id]
+            old_pos = node.get('pos', '')
+            lex_units = node['lex_units']
+            node.clear()
+            node.update(data)
+            node['lex_units'] = lex_units
+            node['pos'] = old_pos
+            wordnet.set_synset_pos(synset_id, data.get('pos', ''), old_pos)
+
+        for synset_id, lex_id in self.removed_lex_units:
+            del wordnet.G.node[synset_id]['lex_units'][lex_id]
+        for synset_id, lex_id, data in self.added_lex_units + self.changed_lex_units:
+            wordnet.G.node[synset_id]['lex_units'][lex_id] = dict(data)
+
+        for src_id, target_id, data in self.added_relations:
+            wordnet.add_relation(src_id, target_id, dict(data))
+
+        for word_form, synset_id in self.removed_lookups:
+            wordnet.remove_synset_lookup(word_form, synset_id)
+        for word_form, synset_id in self.added_lookups:
+            wordnet.add_synset_lookup(word_form, synset_id)
+
+        if self.added_links or self.removed_links:
+            for link in self.removed_links:
+                wordnet.ili.remove(*link)
+            for link in self.added_links:
+                wordnet.ili.add(*link)
+
+        # The lex units were changed directly, which the mutators do not know about
+        wordnet.invalidate_caches()
+        return wordnet
+
+    def save(self, filename):
+        """Write the delta as gzipped JSON."""
+        state = dict(self.__dict__, format=FORMAT_VERSION)
+        f = gzip.open(filename, 'wb')
+        try:
+            json.dump(state, f, separators=(',', ':'))
+        finally:
+            f.close()
+
+    @classmethod
+    def load(cls, filename):
+        f = gzip.open(filename, 'rb')
+        try:
+            state = json.load(f)
+        finally:
+            f.close()
+        if state.pop('format') != FORMAT_VERSION:
+            raise ValueError("{} is not a delta of format version {}".format(filename, FORMAT_VERSION))
+        delta = cls()
+        for name, value in state.iteritems():
+            setattr(delta, name, value)
+        # JSON turns the tuples into lists and the integer lex unit ids into strings
+        # where they were dict keys; lex unit ids only occur in lists, so they survive.
+        for name in ('added_lex_units', 'removed_lex_units', 'changed_lex_units', 'added_relations',
+                     'removed_relations', 'added_lookups', 'removed_lookups', 'added_links', 'removed_links'):
+            setattr(delta, name, [tuple(item) for item in getattr(delta, name)])
+        return delta
+
+
+def diff(old, new):
+    """Return the Delta that turns the wordnet old into the wordnet new."""
+    delta = Delta()
+    old_G, new_G = old.G, new.G
+
+    # Either version may be frozen, and the delta is saved as JSON, so the data is
+    # compared and recorded as plain dicts and lists
+    for synset_id, new_data in new_G.nodes_iter(data=True):
+        new_data = thaw(new_data)
+        if synset_id not in old_G:
+            delta.added_synsets[synset_id] = _synset_fields(new_data)
+            old_lex_units = {}
+        else:
+            old_data = thaw(old_G.node[synset_id])
+            if _synset_fields(old_data) != _synset_fields(new_data):
+                delta.changed_synsets[synset_id] = _synset_fields(new_data)
+            old_lex_units = old_data.get('lex_units', {})
+        new_lex_units = new_data.get('lex_units', {})
+        for lex_id, data in new_lex_units.iteritems():
+            if lex_id not in old_lex_units:
+                delta.added_lex_units.append((synset_id, lex_id, data))
+            elif old_lex_units[lex_id] != data:
+                delta.changed_lex_units.append((synset_id, lex_id, data))
+        delta.removed_lex_units.extend((synset_id, lex_id) for lex_id in old_lex_units
+                                       if lex_id not in new_lex_units)
+
+    delta.removed_synsets = [synset_id for synset_id in old_G.nodes_iter() if synset_id not in new_G]
+    removed = set(delta.removed_synsets)
+
+    for synset_id in set(old_G.nodes_iter()) | set(new_G.nodes_iter()):
+        old_relations, new_relations = _relations(old_G, synset_id), _relations(new_G, synset_id)
+        if old_relations == new_relations:
+            continue
+        for (target_id, key), n in (new_relations - old_relations).iteritems():
+            delta.added_relations.extend([(synset_id, target_id, dict(key))] * n)
+        if synset_id not in removed:
+            for (target_id, key), n in (old_relations - new_relations).iteritems():
+                if target_id not in removed:
+                    delta.removed_relations.extend([(synset_id, target_id, dict(key))] * n)
+
+    for word_form, synset_ids in new._synset_map.iteritems():
+        old_ids = old._synset_map.get(word_form, ())
+        delta.added_lookups.extend((word_form, synset_id) for synset_id in synset_ids if synset_id not in old_ids)
+    for word_form, synset_ids in old._synset_map.iteritems():
+        new_ids = new._synset_map.get(word_form, ())
+        delta.removed_lookups.extend((word_form, synset_id) for synset_id in synset_ids if synset_id not in new_ids)
+
+    if hasattr(old, 'ili') and hasattr(new, 'ili'):
+        old_links, new_links = set(old.ili.link_values()), set(new.ili.link_values())
+        delta.added_links = sorted(new_links - old_links)
+        delta.removed_links = sorted(old_links - new_links)
+    return delta
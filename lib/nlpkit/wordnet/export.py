@@ -0,0 +1,75 @@
+# coding: utf-8
+"""Export of wordnet graphs to SciPy sparse matrices.
+
+    >>> matrix, ids = to_csr(wn, types=['@', '~', '+'], weights={'+': 0.5})
+    >>> matrix[ids.index('02084071-n')].indices      # the neighbours of dog
+
+Row and column i of the matrix is the synset ids[i]. The ids are sorted, as in
+traversal.GraphIndex, so the mapping is the same for every export of the same
+resource. Parallel edges (several relation types between the same two synsets) are
+summed into one entry.
+"""
+import numpy as np
+
+from nlpkit.wordnet.traversal import OUT, IN, BOTH
+
+__author__ = "anders"
+
+
+def to_csr(wordnet, types=None, weights=None, direction=OUT, index=None, dtype=np.float32):
+    """Return the adjacency matrix of a wordnet as a scipy.sparse.csr_matrix, and its ids.
+
+    types restricts the export to some relation types, and weights maps relation
+    types to edge weights (the default weight is 1). With direction=IN the edges are
+    reversed, and with BOTH every edge is exported in both directions. The wordnet's
+    traversal index is used unless another GraphIndex is given.
+    """
+    from scipy.sparse import coo_matrix
+
+    if direction not in (OUT, IN, BOTH):
+        raise ValueError("direction must be one of '{}', '{}' or '{}'".format(OUT, IN, BOTH))
+    if index is None:
+        index = wordnet.traversal().index
+    weights = weights or {}
+    n = len(index)
+
+    rows, cols, values = [], [], []
+    for t in (types if types is not None else index.types()):
+        adjacency = index.adjacency([t], OUT)
+        if not adjacency:
+            continue
+        src = np.fromiter((src_i for src_i, targets in adjacency[0].iteritems() for _ in targets), dtype=np.int32)
+        target = np.fromiter((target_i for targets in adjacency[0].itervalues() for target_i in targets),
+                             dtype=np.int32)
+        rows.append(src)
+        cols.append(target)
+        values.append(np.empty(len(src), dtype=dtype))
+        values[-1].fill(weights.get(t, 1))
+
+    if rows:
+        rows, cols, values = np.concatenate(rows), np.concatenate(cols), np.concatenate(values)
+    else:
+        rows, cols, values = np.zeros(0, np.int32), np.zeros(0, np.int32), np.zeros(0, dtype)
+    if direction == IN:
+        rows, cols = cols, rows
+    elif direction == BOTH:
+        rows, cols, values = np.concatenate([rows, cols]), np.concatenate([cols, rows]), np.concatenate([values, values])
+
+    matrix = coo_matrix((values, (rows, cols)), shape=(n, n)).tocsr()
+    matrix.sum_duplicates()
+    matrix.sort_indices()
+    return matrix, list(index.ids)
+
+
+def save_csr(filename, matrix, ids):
+    """Save a matrix and its ids to a .npz file."""
+    np.savez(filename, data=matrix.data, indices=matrix.indices, indptr=matrix.indptr,
+             shape=np.array(matrix.shape), ids=np.array(ids))
+
+
+def load_csr(filename):
+    """Load a matrix and its ids saved with save_csr."""
+    from scipy.sparse import csr_matrix
+    f = np.load(filename)
+    matrix = csr_matrix((f['data'], f['indices'], f['indptr']), shape=tuple(f['shape']))
+    return matrix, list(f['ids'])
@@ -0,0 +1,421 @@
+# coding: utf-8
+"""A compact, read-only copy of a wordnet graph, made by Wordnet.freeze().
+
+A networkx MultiDiGraph keeps a dict per node, three nested dicts per edge and a
+copy of each per direction. FrozenGraph instead keeps
+
+- the node ids in a sorted tuple, and their positions in one dict,
+- the node data as tuples of values, with the keys of all dicts with the same keys
+  kept once,
+- the edges in CSR form: an array of row offsets and an array of target positions,
+  with the edge keys and edge data in two flat tuples,
+
+with strings interned and equal values stored once (e.g. the {'type': '@'} of every
+hypernym edge). Apart from the position dict, the structure is made of tuples of
+strings and numbers, which the garbage collector stops tracking after its first full
+collection, and of arrays, which it never tracks.
+
+Reading works as on a MultiDiGraph:
+
+    >>> G.node['02084071-n']['lex_units'][1]['lemma']
+    'dog'
+    >>> G['02084071-n']['02083346-n'][0]['type']
+    '@'
+
+but the mappings returned are views that are built on access and cannot be
+changed. Mutating methods raise FrozenError. The edges of a node are iterated in the
+order of their targets' ids, rather than in the arbitrary order of networkx's dicts.
+Data that leaves the process, e.g. as JSON, should go through thaw() first.
+"""
+import gc
+from array import array
+from bisect import bisect_left, bisect_right
+from collections import Mapping
+
+__author__ = "anders"
+
+
+class FrozenError(TypeError):
+    """Raised on attempts to change a frozen wordnet."""
+    pass
+
+
+class _Freezer(object):
+    """Turns nested dicts, lists and sets into the tuples of a FrozenGraph.
+
+    A dict becomes a (keys, values) tuple, where keys is the shared tuple of the
+    sorted keys of all dicts with the same keys. Lists become tuples, and sets
+    frozensets. Equal values are stored once.
+    """
+    def __init__(self):
+        self.shapes = {}
+        self._values = {}
+
+    def _shared(self, value):
+        # Values are shared by equality and the exact types of their items, so 1 and True
+        # (and tuples holding them) are not confused
+        key = (type(value), tuple((type(v), id(v) if isinstance(v, (tuple, frozenset)) else v) for v in value))
+        try:
+            return self._values.setdefault(key, value)
+        except TypeError:
+            # Holds something unhashable
+            return value
+
+    def freeze(self, value):
+        if type(value) is str:
+            return intern(value)
+        elif type(value) is unicode:
+            return self._values.setdefault((unicode, value), value)
+        elif isinstance(value, dict):
+            return self._freeze_dict(value)
+        elif isinstance(value, (list, tuple)):
+            return self._shared(tuple(self.freeze(v) for v in value))
+        elif isinstance(value, (set, frozenset)):
+            return self._shared(frozenset(self.freeze(v) for v in value))
+        return value
+
+    def _freeze_dict(self, value):
+        if not value:
+            return EMPTY
+        # The keys are distinct, so sorting the items never compares the values
+        items = sorted((self.freeze(k), v) for k, v in value.iteritems())
+        keys = tuple(k for k, _ in items)
+        keys = self.shapes.setdefault(keys, keys)
+        try:
+            # Dicts of hashable values, like the data of most edges, are frozen once
+            cache_key = (id(keys), tuple((type(v), v) for _, v in items))
+            frozen = self._values.get(cache_key)
+        except TypeError:
+            cache_key = frozen = None
+        if frozen is None:
+            frozen = (keys, tuple(self.freeze(v) for _, v in items))
+            if cache_key is not None:
+                self._values[cache_key] = frozen
+        return frozen
+
+
+class FrozenMapping(Mapping):
+    """A read-only view of a frozen dict."""
+    def __init__(self, graph, positions, item):
+        self._graph = graph
+        self._positions = positions
+        self._item = item
+
+    def __getitem__(self, key):
+        value = self._item[1][self._positions[key]]
+        return self._graph._thaw(value) if type(value) is tuple else value
+
+    def __contains__(self, key):
+        return key in self._positions
+
+    def __iter__(self):
+        return iter(self._item[0])
+
+    def __len__(self):
+        return len(self._item[0])
+
+    def keys(self):
+        return list(self._item[0])
+
+    def __setitem__(self, key, value):
+        raise FrozenError("the graph is frozen")
+
+    __delitem__ = __setitem__
+
+    def __repr__(self):
+        return repr(dict(self.iteritems()))
+
+
+# The frozen empty dict. () is a singleton, so it cannot serve as the keys of empty dicts.
+EMPTY = FrozenMapping(None, {}, ((), ()))
+
+
+class _NodeView(Mapping):
+    """G.node: the node data by node id."""
+    def __init__(self, graph):
+        self._graph = graph
+
+    def __getitem__(self, n):
+        graph = self._graph
+        return graph._thaw(graph._nodes[graph._index[n]])
+
+    def __contains__(self, n):
+        return n in self._graph._index
+
+    def __iter__(self):
+        return iter(self._graph._ids)
+
+    def __len__(self):
+        return len(self._graph._ids)
+
+
+class _AdjacencyView(Mapping):
+    """G.adj, G.edge and G.succ: the AtlasViews of the nodes by node id."""
+    def __init__(self, graph):
+        self._graph = graph
+
+    def __getitem__(self, n):
+        return self._graph[n]
+
+    def __contains__(self, n):
+        return n in self._graph._index
+
+    def __iter__(self):
+        return iter(self._graph._ids)
+
+    def __len__(self):
+        return len(self._graph._ids)
+
+
+class _AtlasView(Mapping):
+    """G[n]: the edges out of a node, as {target id: {key: edge data}}."""
+    def __init__(self, graph, i):
+        self._graph = graph
+        self._start, self._end = graph._indptr[i], graph._indptr[i + 1]
+
+    def _runs(self):
+        """Yield (target position, start, end) of the runs of edges to the same target."""
+        targets = self._graph._targets
+        j, end = self._start, self._end
+        while j < end:
+            target_i = targets[j]
+            run_end = j + 1
+            while run_end < end and targets[run_end] == target_i:
+                run_end += 1
+            yield target_i, j, run_end
+            j = run_end
+
+    def __getitem__(self, target):
+        graph = self._graph
+        target_i = graph._index[target]
+        # A node's edges are sorted by target, so the edges to target are one run
+        start = bisect_left(graph._targets, target_i, self._start, self._end)
+        end = bisect_right(graph._targets, target_i, start, self._end)
+        if start == end:
+            raise KeyError(target)
+        return _EdgesView(graph, start, end)
+
+    def __iter__(self):
+        ids = self._graph._ids
+        return (ids[target_i] for target_i, _, _ in self._runs())
+
+    def __len__(self):
+        return sum(1 for _ in self._runs())
+
+    def items(self):
+        ids, graph = self._graph._ids, self._graph
+        return [(ids[target_i], _EdgesView(graph, start, end)) for target_i, start, end in self._runs()]
+
+    def iteritems(self):
+        return iter(self.items())
+
+
+class _EdgesView(Mapping):
+    """G[src][target]: the data of the edges from src to target, by edge key."""
+    def __init__(self, graph, start, end):
+        self._graph = graph
+        self._start, self._end = start, end
+
+    def __getitem__(self, key):
+        keys = self._graph._keys
+        for j in xrange(self._start, self._end):
+            if keys[j] == key:
+                value = self._graph._data[j]
+                return self._graph._thaw(value) if type(value) is tuple else value
+        raise KeyError(key)
+
+    def __iter__(self):
+        return iter(self._graph._keys[self._start:self._end])
+
+    def keys(self):
+        return list(self._graph._keys[self._start:self._end])
+
+    def items(self):
+        keys, data, thaw = self._graph._keys, self._graph._data, self._graph._thaw
+        return [(keys[j], thaw(data[j])) for j in xrange(self._start, self._end)]
+
+    def iteritems(self):
+        return iter(self.items())
+
+    def __len__(self):
+        return self._end - self._start
+
+
+class FrozenGraph(object):
+    """A read-only copy of a networkx MultiDiGraph, with the parts of its API that read it."""
+    def __init__(self, G):
+        freezer = _Freezer()
+        self._ids = tuple(sorted(freezer.freeze(n) for n in G.nodes_iter()))
+        self._index = dict((n, i) for i, n in enumerate(self._ids))
+        self._nodes = tuple(freezer.freeze(G.node[n]) for n in self._ids)
+
+        index = self._index
+        indptr, targets, keys, data = array('l', [0]), array('l'), [], []
+        for n in self._ids:
+            edges = sorted((index[target], key, edge_data)
+                           for target, keyed in G[n].iteritems() for key, edge_data in keyed.iteritems())
+            for target_i, key, edge_data in edges:
+                targets.append(target_i)
+                keys.append(freezer.freeze(key))
+                data.append(freezer.freeze(edge_data))
+            indptr.append(len(targets))
+        self._indptr, self._targets = indptr, targets
+        self._keys, self._data = tuple(keys), tuple(data)
+        self._set_shapes(freezer.shapes.values())
+        self._set_views()
+
+    def _set_views(self):
+        self.node = _NodeView(self)
+        self.adj = self.edge = self.succ = _AdjacencyView(self)
+
+    def _set_shapes(self, shapes):
+        self._shape_list = tuple(shapes)
+        # Keyed by identity, so that only tuples made by the freezer are taken for dicts
+        self._shapes = dict((id(keys), dict((k, i) for i, k in enumerate(keys))) for keys in self._shape_list)
+
+    def __getstate__(self):
+        state = dict(self.__dict__)
+        for name in ('_shapes', 'node', 'adj', 'edge', 'succ'):
+            del state[name]
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        # Pickling keeps the sharing of the key tuples, but not their ids
+        self._set_shapes(self._shape_list)
+        self._set_views()
+
+    def _thaw(self, value):
+        if type(value) is not tuple:
+            return value
+        if len(value) == 2:
+            positions = self._shapes.get(id(value[0]))
+            if positions is not None:
+                return FrozenMapping(self, positions, value)
+        if any(type(v) is tuple for v in value):
+            return tuple(self._thaw(v) for v in value)
+        return value
+
+    def __getitem__(self, n):
+        return _AtlasView(self, self._index[n])
+
+    def __contains__(self, n):
+        try:
+            return n in self._index
+        except TypeError:
+            return False
+
+    def __iter__(self):
+        return iter(self._ids)
+
+    def __len__(self):
+        return len(self._ids)
+
+    def is_directed(self):
+        return True
+
+    def is_multigraph(self):
+        return True
+
+    def has_node(self, n):
+        return n in self
+
+    def nodes_iter(self, data=False):
+        if data:
+            return ((n, self._thaw(d)) for n, d in zip(self._ids, self._nodes))
+        return iter(self._ids)
+
+    def nodes(self, data=False):
+        return list(self.nodes_iter(data))
+
+    def number_of_nodes(self):
+        return len(self._ids)
+
+    def order(self):
+        return len(self._ids)
+
+    def number_of_edges(self, u=None, v=None):
+        if u is None:
+            return len(self._targets)
+        return len(self[u][v]) if self.has_edge(u, v) else 0
+
+    def size(self):
+        return len(self._targets)
+
+    def has_edge(self, u, v, key=None):
+        try:
+            edges = self[u][v]
+        except KeyError:
+            return False
+        return key is None or key in edges
+
+    def successors_iter(self, n):
+        return iter(self[n])
+
+    def successors(self, n):
+        return list(self[n])
+
+    neighbors_iter, neighbors = successors_iter, successors
+
+    def out_degree(self, n):
+        i = self._index[n]
+        return self._indptr[i + 1] - self._indptr[i]
+
+    def edges_iter(self, nbunch=None, data=False, keys=False):
+        ids, targets, indptr = self._ids, self._targets, self._indptr
+        rows = xrange(len(ids)) if nbunch is None else [self._index[n] for n in nbunch if n in self._index]
+        for i in rows:
+            for j in xrange(indptr[i], indptr[i + 1]):
+                edge = (ids[i], ids[targets[j]])
+                if keys:
+                    edge += (self._keys[j],)
+                if data:
+                    edge += (self._thaw(self._data[j]),)
+                yield edge
+
+    def edges(self, nbunch=None, data=False, keys=False):
+        return list(self.edges_iter(nbunch, data, keys))
+
+    out_edges_iter, out_edges = edges_iter, edges
+
+    def _frozen(self, *args, **kwargs):
+        raise FrozenError("the graph is frozen")
+
+    add_node = add_nodes_from = remove_node = remove_nodes_from = _frozen
+    add_edge = add_edges_from = remove_edge = remove_edges_from = clear = _frozen
+
+
+def thaw(value):
+    """Return a copy of frozen (or plain) data as plain dicts, lists and sets.
+
+    The views of a FrozenGraph are not dicts, so json and the like cannot handle
+    them, and the lists of the original data are tuples in them.
+    """
+    if isinstance(value, Mapping):
+        return dict((k, thaw(v)) for k, v in value.iteritems())
+    elif isinstance(value, (list, tuple)):
+        return [thaw(v) for v in value]
+    elif isinstance(value, (set, frozenset)):
+        return set(thaw(v) for v in value)
+    return value
+
+
+def freeze_gc():
+    """Keep the garbage collector from touching the objects allocated so far.
+
+    Meant to be called after loading and freezing a wordnet, and before forking
+    workers. Full collections first untrack the tuples and dicts that hold only
+    strings, numbers and untracked tuples. On Pythons with gc.freeze() the rest are
+    then moved to the permanent generation, which collections never visit; Python 2
+    has no gc.freeze(), so there the untracking is all there is to it.
+    """
+    # A collection untracks a tuple only once its items are untracked, so nested tuples
+    # take a collection per level
+    tracked = None
+    for _ in range(10):
+        gc.collect()
+        if len(gc.get_objects()) == tracked:
+            break
+        tracked = len(gc.get_objects())
+    if hasattr(gc, 'freeze'):
+        gc.freeze()
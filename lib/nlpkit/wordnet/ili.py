@@ -0,0 +1,111 @@
+# coding: utf-8
+"""Links between the synsets of two wordnets.
+
+DanNet links its synsets to Princeton WordNet synsets through relations whose target
+is an id like 'ENG20-03574555-n'. InterlingualIndex keeps those links in both
+directions.
+
+The offsets belong to the Princeton version named in the link ('ENG20' is WordNet
+2.0), and the offsets of one version are not those of another. Only links to
+WordNet 3.0 ('ENG30-...') have their targets in the '<offset>-<pos>' form of Wn30
+synset ids; the targets of all other links keep their version, as in
+'ENG20-03574555-n', so that they are never taken for Wn30 ids. There is no mapping
+between the versions here. The version of every link is recorded; restrict lookups
+with the version argument when a resource mixes versions.
+"""
+import re
+
+__author__ = "anders"
+
+
+class InterlingualIndex(object):
+    LINK_RE = re.compile(r"^ENG(\d*)-(\d+)-(\w)$")
+    WN30 = '30'
+
+    def __init__(self):
+        self._forward = {}
+        self._backward = {}
+        # Relation types and versions are few, so links refer to them by position
+        self._types = []
+        self._versions = []
+
+    def __len__(self):
+        return sum(len(links) for links in self._forward.itervalues())
+
+    def _code(self, values, value):
+        try:
+            return values.index(value)
+        except ValueError:
+            values.append(value)
+            return len(values) - 1
+
+    def _parse(self, link_value):
+        """Return the version and the foreign id of a link value."""
+        m = self.LINK_RE.match(link_value)
+        if not m:
+            return '', link_value
+        elif m.group(1) == self.WN30:
+            return self.WN30, "{}-{}".format(m.group(2), m.group(3))
+        return m.group(1), link_value
+
+    def add(self, local_id, link_value, type):
+        """Add a link from local_id to a target like 'ENG20-03574555-n'."""
+        version, foreign_id = self._parse(link_value)
+        type_code = self._code(self._types, type)
+        version_code = self._code(self._versions, version)
+        self._forward.setdefault(local_id, []).append((foreign_id, type_code, version_code))
+        self._backward.setdefault(foreign_id, []).append((local_id, type_code, version_code))
+
+    def remove(self, local_id, link_value, type):
+        """Remove a link added with add(). Does nothing if there is no such link."""
+        version, foreign_id = self._parse(link_value)
+        if type not in self._types or version not in self._versions:
+            return
+        link = (self._types.index(type), self._versions.index(version))
+        for index, from_id, to_id in ((self._forward, local_id, foreign_id), (self._backward, foreign_id, local_id)):
+            links = index.get(from_id, [])
+            if (to_id,) + link in links:
+                links.remove((to_id,) + link)
+            if not links:
+                index.pop(from_id, None)
+
+    def link_values(self):
+        """Yield (local id, link value, relation type) for every link, with the values as given to add()."""
+        for local_id, links in self._forward.iteritems():
+            for foreign_id, t, v in links:
+                if self._versions[v] == self.WN30:
+                    yield local_id, "ENG{}-{}".format(self.WN30, foreign_id), self._types[t]
+                else:
+                    yield local_id, foreign_id, self._types[t]
+
+    def types(self):
+        return list(self._types)
+
+    def versions(self):
+        return list(self._versions)
+
+    def _select(self, index, synset_id, types, version):
+        links = index.get(synset_id, ())
+        if types is None and version is None:
+            return [(other_id, self._types[t]) for other_id, t, _ in links]
+        return [(other_id, self._types[t]) for other_id, t, v in links
+                if (types is None or self._types[t] in types)
+                if (version is None or self._versions[v] == version)]
+
+    def links(self, local_id, types=None, version=None):
+        """Return (foreign id, relation type) tuples for a local synset id."""
+        return self._select(self._forward, local_id, types, version)
+
+    def reverse_links(self, foreign_id, types=None, version=None):
+        """Return (local id, relation type) tuples for a foreign synset id."""
+        return self._select(self._backward, foreign_id, types, version)
+
+    def translate(self, local_ids, types=None, version=None):
+        """Return, for each local synset id, the list of foreign ids it links to."""
+        return [[foreign_id for foreign_id, _ in self.links(local_id, types, version)]
+                for local_id in local_ids]
+
+    def translate_back(self, foreign_ids, types=None, version=None):
+        """Return, for each foreign synset id, the list of local ids linking to it."""
+        return [[local_id for local_id, _ in self.reverse_links(foreign_id, types, version)]
+                for foreign_id in foreign_ids]
@@ -0,0 +1,202 @@
+# coding: utf-8
+"""WordNet's morphological processor (morphy), as implemented by NLTK.
+
+An inflected form is first looked up in the exception lists (the *.exc files), and
+otherwise reduced by the detachment rules of its part of speech until a candidate is
+found among the lemmas of the wordnet:
+
+    >>> wn = Wn30.load('wordnets/wn30')
+    >>> wn.morphy('churches', 'n')
+    'church'
+    >>> wn.lemmatize(['dogs', 'were', 'happier'])
+    ['dog', 'be', 'happy']
+
+The results are those of nltk.corpus.wordnet.morphy (see tests/test_morphy.py). Forms
+are memoized in a bounded LRU cache, and lemmatize() analyses each distinct form of a
+token stream only once.
+"""
+import os.path
+import threading
+
+__author__ = "anders"
+
+POS_LIST = ['n', 'v', 'a', 'r']
+
+SUBSTITUTIONS = {
+    'n': [('s', ''), ('ses', 's'), ('ves', 'f'), ('xes', 'x'), ('zes', 'z'), ('ches', 'ch'),
+          ('shes', 'sh'), ('men', 'man'), ('ies', 'y')],
+    'v': [('s', ''), ('ies', 'y'), ('es', 'e'), ('es', ''), ('ed', 'e'), ('ed', ''), ('ing', 'e'), ('ing', '')],
+    'a': [('er', ''), ('est', ''), ('er', 'e'), ('est', 'e')],
+    'r': [],
+}
+SUBSTITUTIONS['s'] = SUBSTITUTIONS['a']
+
+EXCEPTION_FILES = {'n': 'noun.exc', 'v': 'verb.exc', 'a': 'adj.exc', 'r': 'adv.exc'}
+
+
+def load_exceptions(path):
+    """Return {pos: {inflected form: [base forms]}} read from the *.exc files in path."""
+    exceptions = dict((pos, {}) for pos in POS_LIST)
+    for pos, filename in EXCEPTION_FILES.items():
+        filename = os.path.join(path, filename)
+        if not os.path.exists(filename):
+            continue
+        with open(filename) as f:
+            for line in f:
+                fields = line.split()
+                if len(fields) > 1:
+                    exceptions[pos][fields[0]] = fields[1:]
+    return exceptions
+
+
+class LRUCache(object):
+    """A dict bounded to size items, which drops the least recently used item first.
+
+    The items are kept in a circular doubly linked list of [prev, next, key, value]
+    links, most recently used last, so a hit only relinks one item. Both get and put
+    relink items, so they take a lock, and a cache can be shared between threads.
+    """
+    def __init__(self, size):
+        self.size = size
+        self._links = {}
+        self._root = []
+        self._root[:] = [self._root, self._root, None, None]
+        self._lock = threading.Lock()
+        self.hits = self.misses = 0
+
+    def _move_to_end(self, link):
+        prev, next = link[0], link[1]
+        prev[1], next[0] = next, prev
+        root = self._root
+        last = root[0]
+        last[1] = root[0] = link
+        link[0], link[1] = last, root
+
+    def get(self, key, default=None):
+        with self._lock:
+            link = self._links.get(key)
+            if link is None:
+                self.misses += 1
+                return default
+            self.hits += 1
+            self._move_to_end(link)
+            return link[3]
+
+    def put(self, key, value):
+        with self._lock:
+            link = self._links.get(key)
+            if link is not None:
+                link[3] = value
+                self._move_to_end(link)
+                return
+            root = self._root
+            last = root[0]
+            last[1] = root[0] = self._links[key] = [last, root, key, value]
+            if len(self._links) > self.size:
+                oldest = root[1]
+                root[1], oldest[1][0] = oldest[1], root
+                del self._links[oldest[2]]
+
+    def __len__(self):
+        return len(self._links)
+
+
+def lemma_sets(lemma_pos):
+    """Return {pos: set of lemmas} from a map of lemmas to the parts of speech they occur with.
+
+    Satellite adjectives are adjectives to morphy, as they are in index.adj.
+    """
+    lemmas = dict((pos, set()) for pos in POS_LIST)
+    for lemma, pos_set in lemma_pos.iteritems():
+        for pos in pos_set:
+            lemmas['a' if pos == 's' else pos].add(lemma)
+    return lemmas
+
+
+class Morphy(object):
+    """Lemmatizer over the lemmas of each part of speech.
+
+    lemmas maps each of n, v, a and r to a container of lemmas, e.g. the sets made by
+    lemma_sets() or anything else that supports the in operator.
+    """
+    _MISSING = object()
+
+    def __init__(self, lemmas, exceptions=None, cache_size=100000):
+        self._lemmas = dict(lemmas)
+        self._lemmas['s'] = self._lemmas['a']
+        self._exceptions = dict(exceptions or {})
+        for pos in POS_LIST:
+            self._exceptions.setdefault(pos, {})
+        self._exceptions['s'] = self._exceptions['a']
+        self.cache = LRUCache(cache_size)
+        self._analyses_cache = LRUCache(cache_size)
+
+    def copy(self):
+        """Return a Morphy over the same lemmas and exceptions, but with caches of its own,
+        e.g. for another thread."""
+        return Morphy(self._lemmas, self._exceptions, self.cache.size)
+
+    def analyses(self, form, pos, check_exceptions=True):
+        """Return all base forms of form with the given part of speech, best first."""
+        lemmas = self._lemmas[pos]
+        substitutions = SUBSTITUTIONS[pos]
+
+        def apply_rules(forms):
+            return [f[:-len(old)] + new for f in forms for old, new in substitutions if f.endswith(old)]
+
+        def filter_forms(forms):
+            result, seen = [], set()
+            for f in forms:
+                if f in lemmas and f not in seen:
+                    result.append(f)
+                    seen.add(f)
+            return result
+
+        exceptions = self._exceptions[pos]
+        if check_exceptions and form in exceptions:
+            return filter_forms([form] + exceptions[form])
+
+        forms = apply_rules([form])
+        results = filter_forms([form] + forms)
+        if results:
+            return results
+        while forms:
+            forms = apply_rules(forms)
+            results = filter_forms(forms)
+            if results:
+                return results
+        return []
+
+    def cached_analyses(self, form, pos):
+        """Like analyses(), but memoized. The list returned must not be modified."""
+        key = (form, pos)
+        result = self._analyses_cache.get(key)
+        if result is None:
+            result = self.analyses(form, pos)
+            self._analyses_cache.put(key, result)
+        return result
+
+    def morphy(self, form, pos=None):
+        """Return the first base form of form, trying all parts of speech in turn if pos is None."""
+        key = (form, pos)
+        result = self.cache.get(key, self._MISSING)
+        if result is self._MISSING:
+            result = None
+            for p in ([pos] if pos else POS_LIST):
+                found = self.analyses(form, p)
+                if found:
+                    result = found[0]
+                    break
+            self.cache.put(key, result)
+        return result
+
+    def lemmatize(self, forms, pos=None):
+        """Return the morphy() base forms of a sequence of forms, analysing each distinct form once."""
+        distinct = {}
+        result = []
+        for form in forms:
+            lemma = distinct.get(form, self._MISSING)
+            if lemma is self._MISSING:
+                lemma = distinct[form] = self.morphy(form, pos)
+            result.append(lemma)
+        return result
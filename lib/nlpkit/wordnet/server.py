@@ -0,0 +1,417 @@
+# coding: utf-8
+"""Serve a loaded wordnet to other local processes.
+
+Loading a wordnet takes long and the graph is big, so instead of each worker
+process holding its own copy, one server process loads it and answers queries
+over a Unix socket or a localhost TCP port.
+
+The protocol is newline-delimited JSON. A request is
+
+    {"id": 17, "method": "synsets", "params": ["dog", "n"]}
+
+and is answered, not necessarily in order, by
+
+    {"id": 17, "result": ["02084071-n", ...]}       or
+    {"id": 17, "error": "KeyError: ..."}
+
+Requests from all connections go through a single queue. They are taken off in
+batches and each batch is run as one task on a pool of worker threads, so that
+for instance many shortest path queries from the same source are answered with
+a single search.
+"""
+import SocketServer
+import json
+import random
+import socket
+import threading
+import time
+from collections import defaultdict
+from multiprocessing.pool import ThreadPool
+from Queue import Queue, Empty
+
+from nlpkit.wordnet.frozen import thaw
+from nlpkit.wordnet.traversal import Traversal, TraversalLimit
+
+__author__ = "anders"
+
+
+class WordnetService(object):
+    """The query methods exposed by the server. All results are plain JSON data."""
+    METHODS = ['synsets', 'synset', 'lemmas', 'related', 'relations', 'hypernyms', 'hyponyms',
+               'hypernym_paths', 'neighborhood', 'shortest_path', 'path_similarity',
+               'relation_counts', 'sample']
+
+    def __init__(self, wordnet):
+        self._wordnet = wordnet
+        # Index the graph before the first request comes in
+        wordnet.traversal()
+        self._local = threading.local()
+
+    def _traversal(self):
+        # Traversals keep per-search state, so every worker thread gets its own. The
+        # wordnet indexes its graph again after it has changed, and then the thread's
+        # traversal is replaced by one over the new index.
+        index = self._wordnet.traversal().index
+        traversal = getattr(self._local, 'traversal', None)
+        if traversal is None or traversal.index is not index:
+            traversal = self._local.traversal = Traversal(self._wordnet, index)
+        return traversal
+
+    def _synset(self, synset_id):
+        synset = self._wordnet[synset_id]
+        if synset is None:
+            raise KeyError("Unknown synset id {}".format(synset_id))
+        return synset
+
+    def synsets(self, lemma, pos=None):
+        synsets = self._wordnet.synsets(lemma, pos)
+        return None if synsets is None else [s.id for s in synsets]
+
+    def synset(self, synset_id):
+        synset = self._wordnet[synset_id]
+        return None if synset is None else thaw(synset.data)
+
+    def lemmas(self, synset_id):
+        return self._synset(synset_id).lemmas()
+
+    def related(self, synset_id, type=None, lex_rel=True):
+        return [s.id for s in self._synset(synset_id).related(type, lex_rel)]
+
+    def relations(self, synset_id, type=None, lex_rel=True):
+        return [dict(thaw(r.data), target=r.target_synset().id)
+                for r in self._synset(synset_id).relations(type, lex_rel)]
+
+    def hypernyms(self, synset_id):
+        return [s.id for s in self._synset(synset_id).hypernyms()]
+
+    def hyponyms(self, synset_id):
+        return [s.id for s in self._synset(synset_id).hyponyms()]
+
+    def hypernym_paths(self, synset_id):
+        return [[s.id for s in path] for path in self._synset(synset_id).hypernym_paths()]
+
+    def neighborhood(self, synset_id, k, types=None, direction='out', max_visits=None):
+        return self._traversal().neighborhood(synset_id, k, types, direction, max_visits)
+
+    def shortest_path(self, src_id, target_id, types=None, direction='out', max_visits=None):
+        try:
+            return self._traversal().shortest_path(src_id, target_id, types, direction, max_visits)
+        except TraversalLimit:
+            return None
+
+    def shortest_paths(self, pairs, types=None, direction='out', max_visits=None):
+        return self._traversal().shortest_paths(pairs, types, direction, max_visits)
+
+    def path_similarity(self, src_id, target_id, types=None, max_visits=None):
+        """Path similarity in the style of WordNet::Similarity, 1 / (1 + shortest path length).
+
+        The path is searched in both directions along the given relation types.
+        """
+        path = self.shortest_path(src_id, target_id, types, 'both', max_visits)
+        return None if path is None else 1.0 / len(path)
+
+    def relation_counts(self):
+        return self._wordnet.relation_counts()
+
+    def sample(self, n, seed=None):
+        """Return n synset ids drawn at random. Useful for generating test load."""
+        ids = self._traversal().index.ids
+        rng = random.Random(seed)
+        return [ids[rng.randrange(len(ids))] for _ in xrange(n)]
+
+    def call(self, method, params):
+        if method not in self.METHODS:
+            raise ValueError("Unknown method {}".format(method))
+        return getattr(self, method)(*params)
+
+    def call_batch(self, requests):
+        """Answer a list of (method, params) tuples, returning (result, error) tuples.
+
+        shortest_path and path_similarity requests with the same search options are
+        answered together through Traversal.shortest_paths.
+        """
+        answers = [None] * len(requests)
+        path_groups = defaultdict(list)
+        for i, (method, params) in enumerate(requests):
+            # Everything about a request happens in its own try, so that a bad request
+            # only fails itself
+            try:
+                group = _path_group(method, params)
+                if group is None:
+                    answers[i] = (self.call(method, params), None)
+                else:
+                    path_groups[group].append(i)
+            except Exception as e:
+                answers[i] = (None, _error(e))
+
+        for (types, direction, max_visits), positions in path_groups.iteritems():
+            pairs = [tuple(requests[i][1][:2]) for i in positions]
+            try:
+                paths = self.shortest_paths(pairs, types and list(types), direction, max_visits)
+            except Exception:
+                # Answer the requests of the group one by one, so the error goes only to
+                # the request that caused it
+                for i in positions:
+                    try:
+                        answers[i] = (self.call(*requests[i]), None)
+                    except Exception as e:
+                        answers[i] = (None, _error(e))
+                continue
+            for i, path in zip(positions, paths):
+                if requests[i][0] == 'path_similarity':
+                    answers[i] = (None if path is None else 1.0 / len(path), None)
+                else:
+                    answers[i] = (path, None)
+        return answers
+
+
+def _error(e):
+    return "{}: {}".format(e.__class__.__name__, e)
+
+
+def _path_group(method, params):
+    """Return the search options that a shortest path request is grouped by, or None for other requests.
+
+    Raises TypeError if the request cannot be grouped, e.g. for a list where an id should be.
+    """
+    if method == 'shortest_path' and 2 <= len(params) <= 5:
+        _, _, types, direction, max_visits = _pad(params, 5)
+        group = (_freeze(types), direction or 'out', max_visits)
+    elif method == 'path_similarity' and 2 <= len(params) <= 4:
+        _, _, types, max_visits = _pad(params, 4)
+        group = (_freeze(types), 'both', max_visits)
+    else:
+        return None
+    hash(group + tuple(params[:2]))
+    return group
+
+
+def _pad(params, n):
+    return list(params) + [None] * (n - len(params))
+
+
+def _freeze(value):
+    return tuple(value) if isinstance(value, list) else value
+
+
+class Batcher(object):
+    """Collects requests from a queue into batches and runs each batch on a thread pool.
+
+    A batch is closed when it holds max_batch requests or when window seconds have
+    passed since its first request arrived.
+    """
+    def __init__(self, service, workers=4, max_batch=64, window=0.002):
+        self._service = service
+        self._queue = Queue()
+        self._pool = ThreadPool(workers)
+        self._max_batch = max_batch
+        self._window = window
+        self._thread = threading.Thread(target=self._run)
+        self._thread.daemon = True
+        self._thread.start()
+
+    def submit(self, method, params, callback):
+        self._queue.put((method, params, callback))
+
+    def _run(self):
+        while True:
+            batch = [self._queue.get()]
+            deadline = time.time() + self._window
+            while len(batch) < self._max_batch:
+                timeout = deadline - time.time()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(self._queue.get(timeout=timeout))
+                except Empty:
+                    break
+            self._pool.apply_async(self._run_batch, (batch,))
+
+    def _run_batch(self, batch):
+        # Exceptions in here would be swallowed by the pool, leaving clients without replies
+        try:
+            answers = self._service.call_batch([(method, params) for method, params, _ in batch])
+        except Exception as e:
+            answers = [(None, _error(e))] * len(batch)
+        for (_, _, callback), (result, error) in zip(batch, answers):
+            try:
+                callback(result, error)
+            except Exception as e:
+                callback(None, _error(e))
+
+    def close(self):
+        self._pool.close()
+
+
+class _RequestHandler(SocketServer.StreamRequestHandler):
+    def handle(self):
+        write_lock = threading.Lock()
+
+        def reply(request_id):
+            def callback(result, error):
+                response = {'id': request_id}
+                if error is None:
+                    response['result'] = result
+                else:
+                    response['error'] = error
+                try:
+                    line = json.dumps(response)
+                except (TypeError, ValueError) as e:
+                    line = json.dumps({'id': request_id, 'error': _error(e)})
+                with write_lock:
+                    try:
+                        self.wfile.write(line + "\n")
+                        self.wfile.flush()
+                    except socket.error:
+                        pass
+            return callback
+
+        for line in iter(self.rfile.readline, ''):
+            # The error for a malformed request goes to its id, if it has one, so that
+            # the client waiting for it gets an answer
+            request_id = None
+            try:
+                request = json.loads(line)
+                if not isinstance(request, dict):
+                    raise ValueError("not a JSON object")
+                request_id = request.get('id')
+                params = request.get('params', [])
+                if not isinstance(params, list):
+                    raise ValueError("params is not a list")
+                self.server.batcher.submit(request['method'], params, reply(request_id))
+            except (ValueError, KeyError) as e:
+                reply(request_id)(None, "Malformed request: {}".format(e))
+
+
+class UnixWordnetServer(SocketServer.ThreadingMixIn, SocketServer.UnixStreamServer):
+    daemon_threads = True
+
+
+class TcpWordnetServer(SocketServer.ThreadingMixIn, SocketServer.TCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+
+def make_server(wordnet, socket_path=None, port=None, host='127.0.0.1', workers=4, max_batch=64, window=0.002):
+    """Return a server for the wordnet listening on socket_path, or on host:port if no path is given.
+
+    Call serve_forever() on the result to start answering requests.
+    """
+    if socket_path is not None:
+        server = UnixWordnetServer(socket_path, _RequestHandler)
+    elif port is not None:
+        server = TcpWordnetServer((host, port), _RequestHandler)
+    else:
+        raise ValueError("Either socket_path or port must be given")
+    server.batcher = Batcher(WordnetService(wordnet), workers, max_batch, window)
+    return server
+
+
+# Seconds a client waits for a reply before giving up
+DEFAULT_TIMEOUT = 60
+
+
+class PendingReply(object):
+    """The eventual answer to a request sent with WordnetClient.call_async."""
+    def __init__(self):
+        self._event = threading.Event()
+        self._result = None
+        self._error = None
+
+    def _set(self, result, error):
+        self._result, self._error = result, error
+        self._event.set()
+
+    def done(self):
+        return self._event.is_set()
+
+    def result(self, timeout=DEFAULT_TIMEOUT):
+        if not self._event.wait(timeout):
+            raise RuntimeError("No reply from wordnet server within {} seconds".format(timeout))
+        if self._error is not None:
+            raise StandardError(self._error)
+        return self._result
+
+
+class WordnetClient(object):
+    """Client for a wordnet server, with methods named after the Wordnet and Synset read API.
+
+    Synsets are represented by their ids. The client is safe to share between threads:
+    requests are pipelined over one connection and a reader thread hands each reply to
+    the request it belongs to. call_async returns immediately with a PendingReply.
+    call raises RuntimeError if there is no reply within timeout seconds (None waits
+    for ever).
+    """
+    def __init__(self, socket_path=None, port=None, host='127.0.0.1', timeout=DEFAULT_TIMEOUT):
+        self.timeout = timeout
+        if socket_path is not None:
+            self._sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            self._sock.connect(socket_path)
+        else:
+            self._sock = socket.create_connection((host, port))
+        self._rfile = self._sock.makefile('rb')
+        self._send_lock = threading.Lock()
+        self._pending = {}
+        self._ids = iter(xrange(1, 2**62))
+        self._reader = threading.Thread(target=self._read_replies)
+        self._reader.daemon = True
+        self._reader.start()
+
+    def _read_replies(self):
+        for line in iter(self._rfile.readline, ''):
+            response = json.loads(line)
+            pending = self._pending.pop(response.get('id'), None)
+            if pending is not None:
+                pending._set(response.get('result'), response.get('error'))
+        for pending in self._pending.values():
+            pending._set(None, "Connection to wordnet server closed")
+
+    def call_async(self, method, *params):
+        pending = PendingReply()
+        with self._send_lock:
+            request_id = next(self._ids)
+            self._pending[request_id] = pending
+            self._sock.sendall(json.dumps({'id': request_id, 'method': method, 'params': params}) + "\n")
+        return pending
+
+    def call(self, method, *params):
+        return self.call_async(method, *params).result(self.timeout)
+
+    def close(self):
+        self._sock.close()
+
+    def synsets(self, lemma, pos=None):
+        return self.call('synsets', lemma, pos)
+
+    def __getitem__(self, synset_id):
+        return self.call('synset', synset_id)
+
+    def lemmas(self, synset_id):
+        return self.call('lemmas', synset_id)
+
+    def related(self, synset_id, type=None, lex_rel=True):
+        return self.call('related', synset_id, type, lex_rel)
+
+    def relations(self, synset_id, type=None, lex_rel=True):
+        return self.call('relations', synset_id, type, lex_rel)
+
+    def hypernyms(self, synset_id):
+        return self.call('hypernyms', synset_id)
+
+    def hyponyms(self, synset_id):
+        return self.call('hyponyms', synset_id)
+
+    def hypernym_paths(self, synset_id):
+        return self.call('hypernym_paths', synset_id)
+
+    def neighborhood(self, synset_id, k, types=None, direction='out', max_visits=None):
+        return self.call('neighborhood', synset_id, k, types, direction, max_visits)
+
+    def shortest_path(self, src_id, target_id, types=None, direction='out', max_visits=None):
+        return self.call('shortest_path', src_id, target_id, types, direction, max_visits)
+
+    def path_similarity(self, src_id, target_id, types=None, max_visits=None):
+        return self.call('path_similarity', src_id, target_id, types, max_visits)
+
+    def relation_counts(self):
+        return self.call('relation_counts')
@@ -0,0 +1,141 @@
+# coding: utf-8
+"""Graph statistics that are kept up to date while a wordnet is built.
+
+Counting relation types or degrees by scanning the graph is O(E) or worse. Instead
+Wordnet.add_synset, Wordnet.add_relation and their remove_* counterparts report every change to a GraphStats
+instance, which makes the counts available at no cost. Summaries that need the whole
+graph anyway (degree distributions, connected components) are computed on demand
+with numpy and scipy.
+"""
+from collections import Counter
+
+__author__ = "anders"
+
+
+class GraphStats(object):
+    def __init__(self):
+        self.synsets_by_pos = Counter()
+        self.relations_by_type = Counter()
+        self.out_degree = Counter()
+        self.in_degree = Counter()
+        self.out_degree_histogram = Counter()
+        self.in_degree_histogram = Counter()
+
+    def synset_added(self, pos):
+        self.synsets_by_pos[pos] += 1
+        self.out_degree_histogram[0] += 1
+        self.in_degree_histogram[0] += 1
+
+    def synset_removed(self, synset_id, pos):
+        # Relations must have been removed first, so the degrees are back at zero
+        self.synsets_by_pos[pos] -= 1
+        self.out_degree_histogram[0] -= 1
+        self.in_degree_histogram[0] -= 1
+        self.out_degree.pop(synset_id, None)
+        self.in_degree.pop(synset_id, None)
+
+    def pos_changed(self, old_pos, new_pos):
+        self.synsets_by_pos[old_pos] -= 1
+        self.synsets_by_pos[new_pos] += 1
+
+    def relation_added(self, src_n, target_n, type):
+        self.relations_by_type[type] += 1
+        self._bump(self.out_degree, self.out_degree_histogram, src_n, 1)
+        self._bump(self.in_degree, self.in_degree_histogram, target_n, 1)
+
+    def relation_removed(self, src_n, target_n, type):
+        self.relations_by_type[type] -= 1
+        self._bump(self.out_degree, self.out_degree_histogram, src_n, -1)
+        self._bump(self.in_degree, self.in_degree_histogram, target_n, -1)
+
+    def _bump(self, degree, histogram, n, delta):
+        old = degree[n]
+        degree[n] = old + delta
+        histogram[old] -= 1
+        histogram[old + delta] += 1
+
+    def report(self):
+        return {
+            'synsets': sum(self.synsets_by_pos.values()),
+            'relations': sum(self.relations_by_type.values()),
+            'synsets_by_pos': _positive(self.synsets_by_pos),
+            'relations_by_type': _positive(self.relations_by_type),
+            'out_degree_histogram': _positive(self.out_degree_histogram),
+            'in_degree_histogram': _positive(self.in_degree_histogram),
+        }
+
+    @classmethod
+    def from_graph(cls, G):
+        """Count everything in G from scratch."""
+        stats = cls()
+        for n, data in G.nodes_iter(data=True):
+            stats.synset_added(data.get('pos', ''))
+        for src_n, target_n, data in G.edges_iter(data=True):
+            stats.relation_added(src_n, target_n, data['type'])
+        return stats
+
+
+def _positive(counter):
+    return dict((k, v) for k, v in counter.iteritems() if v > 0)
+
+
+def degree_distribution(histogram):
+    """Summarize a degree histogram ({degree: number of synsets}) with numpy."""
+    import numpy as np
+    degrees = np.array(sorted(histogram), dtype=np.int64)
+    counts = np.array([histogram[d] for d in degrees], dtype=np.int64)
+    if not counts.sum():
+        return {'synsets': 0}
+    cumulative = np.cumsum(counts)
+    def percentile(p):
+        return int(degrees[np.searchsorted(cumulative, p * cumulative[-1])])
+    return {
+        'synsets': int(cumulative[-1]),
+        'mean': float((degrees * counts).sum()) / cumulative[-1],
+        'max': int(degrees[-1]),
+        'median': percentile(0.5),
+        'p90': percentile(0.9),
+        'p99': percentile(0.99),
+        'zero_degree': int(histogram.get(0, 0)),
+    }
+
+
+def component_summary(index):
+    """Summarize the weakly connected components of a traversal.GraphIndex.
+
+    Uses scipy.sparse.csgraph when scipy is available and breadth-first search otherwise.
+    """
+    import numpy as np
+    n = len(index)
+    try:
+        from scipy.sparse import coo_matrix
+        from scipy.sparse.csgraph import connected_components
+        edges = list(index.edges())
+        rows = np.array([e[0] for e in edges], dtype=np.int32)
+        cols = np.array([e[1] for e in edges], dtype=np.int32)
+        graph = coo_matrix((np.ones(len(edges), dtype=np.int8), (rows, cols)), shape=(n, n)).tocsr()
+        _, labels = connected_components(graph, directed=True, connection='weak')
+    except ImportError:
+        labels = np.empty(n, dtype=np.int64)
+        labels.fill(-1)
+        adjacency = index.adjacency(direction='both')
+        label = 0
+        for start_i in xrange(n):
+            if labels[start_i] != -1:
+                continue
+            labels[start_i] = label
+            stack = [start_i]
+            while stack:
+                node_i = stack.pop()
+                for adj in adjacency:
+                    for neighbor_i in adj.get(node_i, ()):
+                        if labels[neighbor_i] == -1:
+                            labels[neighbor_i] = label
+                            stack.append(neighbor_i)
+            label += 1
+    sizes = np.sort(np.bincount(labels))[::-1] if n else np.array([], dtype=np.int64)
+    return {
+        'components': int(len(sizes)),
+        'largest': [int(s) for s in sizes[:10]],
+        'singletons': int((sizes == 1).sum()),
+    }
@@ -0,0 +1,59 @@
+# coding: utf-8
+"""Extract domain subsets of a wordnet.
+
+A subset is the closure of a set of seed synsets over chosen relation types, e.g. all
+hyponyms of food.n.01 and food.n.02:
+
+    >>> food = extract_subset(wn, lemmas=['food'], types=['~', '~i'])
+    >>> food.write('data/wordnets/wn30_food')
+
+The result is a wordnet of the same class as the original, so it can be written back
+out in the original's native format and loaded by the usual loader.
+"""
+from nlpkit.wordnet.traversal import OUT
+
+__author__ = "anders"
+
+
+def seed_synset_ids(wordnet, synset_ids=(), lemmas=(), pos=None):
+    """Return the given synset ids plus the ids of all synsets of the given lemmas."""
+    seeds = list(synset_ids)
+    for lemma in lemmas:
+        seeds.extend(s.id for s in wordnet.synsets(lemma, pos) or [])
+    return seeds
+
+
+def extract_subset(wordnet, synset_ids=(), lemmas=(), types=None, direction=OUT, pos=None, max_visits=None):
+    """Return a new wordnet holding the closure of the seeds over the relation types.
+
+    Seeds are given as synset ids and/or lemmas (optionally restricted to pos). Only
+    edges between synsets of the subset are kept. Node and edge data are copied, so
+    the subset can be modified without affecting the original.
+    """
+    seeds = seed_synset_ids(wordnet, synset_ids, lemmas, pos)
+    keep = set(wordnet.traversal().closure(seeds, types, direction, max_visits))
+    return copy_subgraph(wordnet, keep)
+
+
+def copy_subgraph(wordnet, keep):
+    """Return a new wordnet of the same class restricted to the synset ids in keep."""
+    G = wordnet.G
+    subset = wordnet.__class__()
+    for n in keep:
+        data = dict(G.node[n])
+        data['lex_units'] = dict((k, dict(v)) for k, v in data['lex_units'].items())
+        subset.add_synset(n, data)
+    for src_n in keep:
+        for target_n, edges in G[src_n].iteritems():
+            if target_n in keep:
+                for key, data in edges.iteritems():
+                    subset.add_relation(src_n, target_n, dict(data), key=key)
+    for lemma, synset_ids in wordnet._synset_map.iteritems():
+        for synset_id in synset_ids:
+            if synset_id in keep:
+                subset.add_synset_lookup(lemma, synset_id)
+    if hasattr(wordnet, 'ili'):
+        for local_id, value, type in wordnet.ili.link_values():
+            if local_id in keep:
+                subset.ili.add(local_id, value, type)
+    return subset
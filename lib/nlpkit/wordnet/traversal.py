@@ -0,0 +1,310 @@
+# coding: utf-8
+"""Traversal primitives over a wordnet graph.
+
+networkx algorithms ignore the edge 'type' attribute and pay for the generality of
+the MultiDiGraph on every step. The classes in this module instead work on an
+integer-indexed copy of the adjacency structure, split by relation type, and keep
+their visited state in flat arrays rather than in Python sets.
+
+    >>> t = wn.traversal()
+    >>> t.shortest_path('02084071-n', '02121620-n', types=['@', '~'])
+    >>> t.closure(['07555863-n'], types=['~', '~i'])
+"""
+from array import array
+from collections import deque, defaultdict
+
+__author__ = "anders"
+
+OUT, IN, BOTH = 'out', 'in', 'both'
+
+
+class TraversalLimit(StandardError):
+    """Raised when a traversal visits more nodes than its max_visits allows."""
+    pass
+
+
+class GraphIndex(object):
+    """Integer-indexed adjacency lists of a wordnet graph, kept per relation type.
+
+    Node ids are sorted before they are numbered, which makes the indices stable
+    between two loads of the same resource.
+    """
+    def __init__(self, G):
+        self.ids = sorted(G.nodes_iter())
+        self.index = dict((node_id, i) for i, node_id in enumerate(self.ids))
+        self._out = defaultdict(dict)
+        self._in = defaultdict(dict)
+        index = self.index
+        for src_n, target_n, data in G.edges_iter(data=True):
+            src_i, target_i = index[src_n], index[target_n]
+            self._out[data['type']].setdefault(src_i, []).append(target_i)
+            self._in[data['type']].setdefault(target_i, []).append(src_i)
+
+    def __len__(self):
+        return len(self.ids)
+
+    def freeze(self):
+        """Turn the adjacency lists into tuples, which take less memory and which the
+        garbage collector does not need to track."""
+        self.ids = tuple(self.ids)
+        for adjacency in (self._out, self._in):
+            for t, targets_by_node in adjacency.items():
+                adjacency[t] = dict((i, tuple(targets)) for i, targets in targets_by_node.iteritems())
+        self._out, self._in = dict(self._out), dict(self._in)
+
+    def types(self):
+        return sorted(self._out.keys())
+
+    def adjacency(self, types=None, direction=OUT):
+        """Return a list of the adjacency dicts to consult for the given types and direction."""
+        if direction not in (OUT, IN, BOTH):
+            raise ValueError("direction must be one of '{}', '{}' or '{}'".format(OUT, IN, BOTH))
+        if types is None:
+            types = self._out.keys()
+        adjacency = []
+        if direction in (OUT, BOTH):
+            adjacency.extend(self._out[t] for t in types if t in self._out)
+        if direction in (IN, BOTH):
+            adjacency.extend(self._in[t] for t in types if t in self._in)
+        return adjacency
+
+    def edges(self, types=None):
+        """Yield (src index, target index, type) for every edge of the given types."""
+        for t in (types if types is not None else self.types()):
+            for src_i, targets in self._out.get(t, {}).iteritems():
+                for target_i in targets:
+                    yield src_i, target_i, t
+
+
+class Traversal(object):
+    """Breadth-first traversals over a GraphIndex.
+
+    Visited marks are kept in an integer array stamped with a per-search generation
+    number, so starting a new search never needs to clear anything. For the same
+    reason an instance must not be shared between threads.
+    """
+    def __init__(self, wordnet, index=None):
+        self._wordnet = wordnet
+        self.index = index or GraphIndex(wordnet.G)
+        n = len(self.index)
+        self._stamp = array('l', [0]) * n
+        self._back_stamp = array('l', [0]) * n
+        self._parent = array('l', [-1]) * n
+        self._back_parent = array('l', [-1]) * n
+        self._generation = 0
+
+    def _next_generation(self):
+        self._generation += 1
+        return self._generation
+
+    def _indices(self, synset_ids):
+        index = self.index.index
+        try:
+            return [index[synset_id] for synset_id in synset_ids]
+        except KeyError as e:
+            raise KeyError("Unknown synset id {}".format(e.args[0]))
+
+    def neighborhood(self, synset_id, k, types=None, direction=OUT, max_visits=None):
+        """Return a dict of the synset ids at most k hops away, mapped to their distance.
+
+        The synset itself is included at distance 0.
+        """
+        adjacency = self.index.adjacency(types, direction)
+        stamp, gen = self._stamp, self._next_generation()
+        start_i, = self._indices([synset_id])
+        stamp[start_i] = gen
+        distances = {start_i: 0}
+        frontier = [start_i]
+        for hops in xrange(1, k + 1):
+            next_frontier = []
+            for node_i in frontier:
+                for adj in adjacency:
+                    for neighbor_i in adj.get(node_i, ()):
+                        if stamp[neighbor_i] != gen:
+                            stamp[neighbor_i] = gen
+                            distances[neighbor_i] = hops
+                            next_frontier.append(neighbor_i)
+            if max_visits is not None and len(distances) > max_visits:
+                raise TraversalLimit("Neighborhood of {} exceeded {} visits".format(synset_id, max_visits))
+            if not next_frontier:
+                break
+            frontier = next_frontier
+        ids = self.index.ids
+        return dict((ids[i], d) for i, d in distances.iteritems())
+
+    def closure(self, synset_ids, types=None, direction=OUT, max_visits=None):
+        """Return the ids of all synsets reachable from synset_ids, in breadth-first order.
+
+        The start synsets are part of the closure. Restricting types to e.g. ['@', '@i']
+        gives the transitive hypernym closure.
+        """
+        adjacency = self.index.adjacency(types, direction)
+        stamp, gen = self._stamp, self._next_generation()
+        order = []
+        for start_i in self._indices(synset_ids):
+            if stamp[start_i] != gen:
+                stamp[start_i] = gen
+                order.append(start_i)
+        pos = 0
+        while pos < len(order):
+            node_i = order[pos]
+            pos += 1
+            for adj in adjacency:
+                for neighbor_i in adj.get(node_i, ()):
+                    if stamp[neighbor_i] != gen:
+                        stamp[neighbor_i] = gen
+                        order.append(neighbor_i)
+            if max_visits is not None and len(order) > max_visits:
+                raise TraversalLimit("Closure exceeded {} visits".format(max_visits))
+        ids = self.index.ids
+        return [ids[i] for i in order]
+
+    def shortest_path(self, src_id, target_id, types=None, direction=OUT, max_visits=None):
+        """Return the shortest path from src_id to target_id as a list of synset ids.
+
+        The search is a bidirectional breadth-first search: the source side follows edges
+        in the given direction, the target side follows them in reverse. Returns None if
+        the synsets are not connected.
+        """
+        forward = self.index.adjacency(types, direction)
+        backward = self.index.adjacency(types, {OUT: IN, IN: OUT, BOTH: BOTH}[direction])
+        src_i, target_i = self._indices([src_id, target_id])
+        if src_i == target_i:
+            return [src_id]
+
+        gen = self._next_generation()
+        stamp, back_stamp = self._stamp, self._back_stamp
+        parent, back_parent = self._parent, self._back_parent
+        stamp[src_i], parent[src_i] = gen, -1
+        back_stamp[target_i], back_parent[target_i] = gen, -1
+        frontier, back_frontier = [src_i], [target_i]
+        visits = 2
+
+        meet_i = None
+        while frontier and back_frontier and meet_i is None:
+            # Expand the smaller of the two frontiers by one level
+            if len(frontier) <= len(back_frontier):
+                adjacency, own_stamp, own_parent, other_stamp = forward, stamp, parent, back_stamp
+                current = frontier
+            else:
+                adjacency, own_stamp, own_parent, other_stamp = backward, back_stamp, back_parent, stamp
+                current = back_frontier
+
+            next_frontier = []
+            for node_i in current:
+                for adj in adjacency:
+                    for neighbor_i in adj.get(node_i, ()):
+                        if own_stamp[neighbor_i] != gen:
+                            own_stamp[neighbor_i] = gen
+                            own_parent[neighbor_i] = node_i
+                            next_frontier.append(neighbor_i)
+                            if other_stamp[neighbor_i] == gen:
+                                meet_i = neighbor_i
+                                break
+                    if meet_i is not None:
+                        break
+                if meet_i is not None:
+                    break
+            visits += len(next_frontier)
+            if max_visits is not None and visits > max_visits:
+                raise TraversalLimit("Path search from {} to {} exceeded {} visits".format(
+                    src_id, target_id, max_visits))
+
+            if current is frontier:
+                frontier = next_frontier
+            else:
+                back_frontier = next_frontier
+
+        if meet_i is None:
+            return None
+        return [self.index.ids[i] for i in self._join_path(meet_i)]
+
+    def _join_path(self, meet_i):
+        path = []
+        node_i = meet_i
+        while node_i != -1:
+            path.append(node_i)
+            node_i = self._parent[node_i]
+        path.reverse()
+        node_i = self._back_parent[meet_i]
+        while node_i != -1:
+            path.append(node_i)
+            node_i = self._back_parent[node_i]
+        return path
+
+    def _single_source_paths(self, src_id, target_ids, types, direction, max_visits):
+        """One breadth-first search from src_id that stops once every target has been reached."""
+        adjacency = self.index.adjacency(types, direction)
+        stamp, parent, gen = self._stamp, self._parent, self._next_generation()
+        src_i, = self._indices([src_id])
+        remaining = set(self._indices(target_ids))
+        stamp[src_i], parent[src_i] = gen, -1
+        remaining.discard(src_i)
+        queue = deque([src_i])
+        visits = 1
+        while queue and remaining:
+            node_i = queue.popleft()
+            for adj in adjacency:
+                for neighbor_i in adj.get(node_i, ()):
+                    if stamp[neighbor_i] != gen:
+                        stamp[neighbor_i] = gen
+                        parent[neighbor_i] = node_i
+                        queue.append(neighbor_i)
+                        remaining.discard(neighbor_i)
+                        visits += 1
+            if max_visits is not None and visits > max_visits:
+                raise TraversalLimit("Path search from {} exceeded {} visits".format(src_id, max_visits))
+
+        ids = self.index.ids
+        paths = {}
+        for target_id, target_i in zip(target_ids, self._indices(target_ids)):
+            if stamp[target_i] != gen:
+                paths[target_id] = None
+                continue
+            path = []
+            node_i = target_i
+            while node_i != -1:
+                path.append(ids[node_i])
+                node_i = parent[node_i]
+            paths[target_id] = path[::-1]
+        return paths
+
+    def shortest_paths(self, pairs, types=None, direction=OUT, max_visits=None):
+        """Return the shortest path for each (src_id, target_id) pair, in the order given.
+
+        Pairs sharing a source are answered with a single breadth-first search from that
+        source; lone pairs use the bidirectional search. A pair that is unconnected or
+        that hits max_visits gets None.
+        """
+        pairs = list(pairs)
+        targets_by_src = defaultdict(list)
+        for src_id, target_id in pairs:
+            targets_by_src[src_id].append(target_id)
+
+        paths = {}
+        for src_id, target_ids in targets_by_src.iteritems():
+            try:
+                if len(target_ids) == 1:
+                    paths[src_id, target_ids[0]] = self.shortest_path(
+                        src_id, target_ids[0], types, direction, max_visits)
+                else:
+                    found = self._single_source_paths(src_id, target_ids, types, direction, max_visits)
+                    for target_id, path in found.iteritems():
+                        paths[src_id, target_id] = path
+            except TraversalLimit:
+                for target_id in target_ids:
+                    paths[src_id, target_id] = None
+        return [paths[pair] for pair in pairs]
+
+    def neighborhoods(self, synset_ids, k, types=None, direction=OUT, max_visits=None):
+        """Return the k-hop neighborhood of each synset id, in the order given.
+
+        A neighborhood that hits max_visits is returned as None.
+        """
+        result = []
+        for synset_id in synset_ids:
+            try:
+                result.append(self.neighborhood(synset_id, k, types, direction, max_visits))
+            except TraversalLimit:
+                result.append(None)
+        return result
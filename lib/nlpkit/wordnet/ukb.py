@@ -5,16 +5,26 @@ from nlpkit.paths import data_path
 
 class Ukb(universal.Wordnet):
     @classmethod
-    def load(cls, dict_filename, rels_filename):
-        return UkbLoader(Ukb(), dict_filename, rels_filename).load()
+    def load(cls, dict_filename, rels_filename, read_types=False):
+        """Load a UKB dictionary and relations file.
+
+        All relations get the type 'unknown', unless read_types is given, in which case
+        the type is read from the 't:' field of a relation where there is one. Files
+        written by UkbWriter need read_types to keep their relation types.
+        """
+        return UkbLoader(Ukb(), dict_filename, rels_filename, read_types).load()
+
+    def write(self, dict_filename, rels_filename):
+        UkbWriter(self, dict_filename, rels_filename).write()
 
 
 class UkbLoader(object):
-    def __init__(self, wordnet, dict_filename, rels_filename):
+    def __init__(self, wordnet, dict_filename, rels_filename, read_types=False):
         self._wordnet = wordnet
         self._G = wordnet.G
         self._dict_filename = data_path(dict_filename)
         self._rels_filename = data_path(rels_filename)
+        self._read_types = read_types
 
     def load(self):
         self._load_dict()
@@ -32,11 +42,12 @@ class UkbLoader(object):
 
 
     def _load_rels(self):
-        rel_re = re.compile(r"u:([^:\s]+)\sv:([^:\s]+)")
+        rel_re = re.compile(r"u:([^:\s]+)\sv:([^:\s]+)(?:.*\st:(\S+))?")
         with codecs.open(self._rels_filename, encoding='utf-8') as rels_file:
             for line in rels_file:
                 m = rel_re.match(line)
-                self._G.add_edge(m.group(1), m.group(2), type='unknown')
+                type = m.group(3) if self._read_types else None
+                self._wordnet.add_relation(m.group(1), m.group(2), {'type': type or 'unknown'})
 
     def _add_lemma(self, synset_id, lemma):
         lex_units = self._G.node[synset_id]['lex_units']
@@ -49,11 +60,42 @@ class UkbLoader(object):
 
     def _add_synset(self, synset_id, pos):
         if not synset_id in self._G:
-            self._G.add_node(synset_id, {
+            self._wordnet.add_synset(synset_id, {
                 'pos': pos,
                 'lex_units': {}
             })
 
+class UkbWriter(object):
+    """Writes any universal.Wordnet as a UKB dictionary and relations file.
+
+    The synset ids are written as they are, so UkbLoader can only read them back if
+    they have the '<id>-<pos>' form. Lemmas are taken from the lex units of the synsets.
+    Relation types are written in the 't:' field, which Ukb.load reads with read_types.
+    """
+    def __init__(self, wordnet, dict_filename, rels_filename):
+        self._wordnet = wordnet
+        self._G = wordnet.G
+        self._dict_filename = dict_filename
+        self._rels_filename = rels_filename
+
+    def write(self):
+        self._write_dict()
+        self._write_rels()
+
+    def _write_dict(self):
+        synsets_by_lemma = {}
+        for synset in self._wordnet.all_synsets():
+            for lemma in synset.lemmas():
+                synsets_by_lemma.setdefault(lemma.replace(" ", "_"), []).append(synset.id)
+        with codecs.open(self._dict_filename, 'w', encoding='utf-8') as dict_file:
+            for lemma in sorted(synsets_by_lemma):
+                dict_file.write(u"{} {}\n".format(lemma, u" ".join(sorted(set(synsets_by_lemma[lemma])))))
+
+    def _write_rels(self):
+        with codecs.open(self._rels_filename, 'w', encoding='utf-8') as rels_file:
+            for src_n, target_n, data in self._G.edges_iter(data=True):
+                rels_file.write(u"u:{} v:{} t:{}\n".format(src_n, target_n, data['type']))
+
 if __name__ == '__main__':
     wn = Ukb.load('wordnets/ukb/dicts/wn30.txt', 'wordnets/ukb/rels/wnet30_and_g_rels.txt')
 #    loader = Wn30Loader(Wn30(), 'wordnets/wn30_food')
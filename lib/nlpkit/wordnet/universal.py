@@ -1,11 +1,16 @@
 from UserDict import IterableUserDict
+import cPickle
+import threading
 
 __author__="anders"
 __date__ ="$01-04-2011 10:46:42$"
 
-from itertools import chain, ifilter, groupby
+from itertools import ifilter
 from collections import defaultdict
 import networkx as nx
+from nlpkit.wordnet.traversal import Traversal, GraphIndex
+from nlpkit.wordnet.stats import GraphStats, degree_distribution, component_summary
+from nlpkit.wordnet.frozen import FrozenGraph, FrozenError, freeze_gc
 
 class Wordnet(object):
     """A wordnet graph structure that allows lookup of synsets by lemma and synset id
@@ -32,14 +37,151 @@ class Wordnet(object):
     {
         'type': 'hyperonym',            # required
     }
+
+    Loaders should add synsets and relations through add_synset and add_relation, which
+    keep the counts reported by stats() up to date and drop the cached traversal index.
+    After changing G or its node data directly, call invalidate_caches().
+
+    Once loaded, a wordnet can be frozen (see freeze()) to share it between threads or
+    forked worker processes.
     """
+    frozen = False
+
     def __init__(self):
         self.G = nx.MultiDiGraph()
-        self._synset_map = defaultdict(lambda: set())
+        self._synset_map = defaultdict(set)
+        self._traversal = None
+        self._stats = GraphStats()
+
+    def _check_mutable(self):
+        if self.frozen:
+            raise FrozenError("the wordnet is frozen")
+
+    def _graph_changed(self):
+        """Drop what is derived from the graph and cheap to drop. Called by every mutator."""
+        self._traversal = None
+
+    def invalidate_caches(self):
+        """Drop everything derived from the graph, e.g. the traversal index, and count the stats again."""
+        self._check_mutable()
+        self._graph_changed()
+        self.recount_stats()
+
+    def add_synset(self, synset_id, data):
+        self._check_mutable()
+        self._graph_changed()
+        if synset_id in self.G:
+            old_pos = self.G.node[synset_id].get('pos', '')
+            self.G.add_node(synset_id, data)
+            self.set_synset_pos(synset_id, data.get('pos', old_pos), old_pos)
+        else:
+            self.G.add_node(synset_id, data)
+            self._stats.synset_added(data.get('pos', ''))
+
+    def set_synset_pos(self, synset_id, pos, old_pos=None):
+        self._check_mutable()
+        self._graph_changed()
+        if old_pos is None:
+            old_pos = self.G.node[synset_id].get('pos', '')
+        self.G.node[synset_id]['pos'] = pos
+        if pos != old_pos:
+            self._stats.pos_changed(old_pos, pos)
+
+    def add_relation(self, src_id, target_id, attr, key=None):
+        self._check_mutable()
+        self._graph_changed()
+        # Like networkx, create missing end points. They get no data and count as pos ''
+        for n in (src_id, target_id):
+            if n not in self.G:
+                self.G.add_node(n)
+                self._stats.synset_added('')
+        self.G.add_edge(src_id, target_id, key=key, attr_dict=attr)
+        self._stats.relation_added(src_id, target_id, attr['type'])
+
+    def remove_relation(self, src_id, target_id, key):
+        self._check_mutable()
+        self._graph_changed()
+        attr = self.G[src_id][target_id][key]
+        self.G.remove_edge(src_id, target_id, key)
+        self._stats.relation_removed(src_id, target_id, attr['type'])
+
+    def remove_synset(self, synset_id):
+        """Remove a synset with all its relations and lemma lookups."""
+        self._check_mutable()
+        self._graph_changed()
+        for src_id, target_id, key in self.G.in_edges(synset_id, keys=True) + self.G.out_edges(synset_id, keys=True):
+            if self.G.has_edge(src_id, target_id, key):
+                self.remove_relation(src_id, target_id, key)
+        pos = self.G.node[synset_id].get('pos', '')
+        for lex_unit in self.G.node[synset_id].get('lex_units', {}).values():
+            for word_form in (lex_unit.get('lemma'), lex_unit.get('word')):
+                self.remove_synset_lookup(word_form, synset_id)
+        self.G.remove_node(synset_id)
+        self._stats.synset_removed(synset_id, pos)
+
+    def save(self, filename):
+        """Save the loaded wordnet, including any indexes built while loading, to a pickle file."""
+        with open(filename, 'wb') as f:
+            cPickle.dump(self, f, cPickle.HIGHEST_PROTOCOL)
+
+    @classmethod
+    def restore(cls, filename):
+        """Load a wordnet saved with save(). Much faster than parsing the original files."""
+        with open(filename, 'rb') as f:
+            wordnet = cPickle.load(f)
+        if not isinstance(wordnet, cls):
+            raise TypeError("{} holds a {}, not a {}".format(filename, wordnet.__class__.__name__, cls.__name__))
+        return wordnet
+
+    def __getstate__(self):
+        state = dict(self.__dict__)
+        state['_traversal'] = None
+        state.pop('_local', None)
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        if self.frozen:
+            self._local = threading.local()
+
+    def freeze(self):
+        """Make the wordnet read-only and compact, for sharing between threads or forked processes.
+
+        The graph is replaced by a FrozenGraph and the lemma lookups by tuples, both
+        made of interned strings, tuples and arrays. The traversal index is built
+        and shared, but traversal() gives each thread a Traversal of its own. Finally
+        the garbage collector is kept from visiting the objects allocated so far
+        (see frozen.freeze_gc), so that collections in forked workers do not write to,
+        and so copy, the pages of the parent's memory.
+
+        The read-only query methods work as before. Methods that change the wordnet
+        raise FrozenError. Returns the wordnet.
+        """
+        if not self.frozen:
+            # Indexed before the graph is replaced, so that traversals visit edges in the same order as before
+            self._shared_index = GraphIndex(self.G)
+            self._shared_index.freeze()
+            self.G = FrozenGraph(self.G)
+            self._synset_map = dict((intern(word_form) if type(word_form) is str else word_form,
+                                     tuple(sorted(intern(n) if type(n) is str else n for n in synset_ids)))
+                                    for word_form, synset_ids in self._synset_map.iteritems())
+            self._traversal = None
+            self._local = threading.local()
+            self.frozen = True
+        freeze_gc()
+        return self
 
     def add_synset_lookup(self, word_form, synset_id):
+        self._check_mutable()
         self._synset_map[word_form].add(synset_id)
 
+    def remove_synset_lookup(self, word_form, synset_id):
+        self._check_mutable()
+        if word_form in self._synset_map:
+            self._synset_map[word_form].discard(synset_id)
+            if not self._synset_map[word_form]:
+                del self._synset_map[word_form]
+
     def synsets(self, lemma, pos=None):
         if lemma not in self._synset_map:
             return None
@@ -54,14 +196,50 @@ class Wordnet(object):
             yield self.Synset(n, self)
 
     def relation_counts(self):
-        edges = chain.from_iterable(self.G[src_n][target_n].values() for src_n, target_n in nx.edges_iter(self.G))
-        types = [e['type'] for e in edges]
-        grouped = groupby(sorted(types))
-        return dict((name, len(list(vals))) for name, vals in grouped)
+        return self._stats.report()['relations_by_type']
+
+    def stats(self, distributions=False, components=False):
+        """Return counts of synsets per pos, relations per type and degree histograms.
+
+        The counts are maintained as the wordnet is built. With distributions=True the
+        degree histograms are also summarized (mean, median, percentiles), and with
+        components=True the weakly connected components are computed, which requires
+        a pass over the graph.
+        """
+        report = self._stats.report()
+        if distributions:
+            report['out_degree_distribution'] = degree_distribution(report['out_degree_histogram'])
+            report['in_degree_distribution'] = degree_distribution(report['in_degree_histogram'])
+        if components:
+            report['components'] = component_summary(self.traversal().index)
+        return report
+
+    def recount_stats(self):
+        self._stats = GraphStats.from_graph(self.G)
+
+    def traversal(self, refresh=False):
+        """Return a Traversal over the graph.
+
+        The traversal indexes the graph as it is when first requested, and again after
+        the graph is changed through the wordnet's methods. Pass refresh=True, or call
+        invalidate_caches(), after modifying G directly.
+        """
+        if self.frozen:
+            # Traversals keep per-search state, so every thread gets its own
+            if not hasattr(self._local, 'traversal'):
+                self._local.traversal = Traversal(self, self._shared_index)
+            return self._local.traversal
+        if self._traversal is None or refresh:
+            self._traversal = Traversal(self)
+        return self._traversal
 
     def top_synsets(self):
         return list(path for s in self.all_synsets() for path in s.hypernym_paths())
 
+    def _node_data(self, synset_id):
+        """Return the data dict of a synset node. Subclasses may override this to create nodes on demand."""
+        return self.G.node[synset_id]
+
     def __getitem__(self, key):
         if key in self.G.node:
             return self.Synset(key, self)
@@ -82,12 +260,14 @@ class LexUnit(IterableUserDict):
         return self['lemma']
 
 class Relation(IterableUserDict):
-    def __init__(self, idx, src_synset, target_synset_id):
+    def __init__(self, idx, src_synset, target_synset_id, data=None):
         self._idx = idx
         self._src_synset = src_synset
         self._target_synset_id = target_synset_id
         self._wordnet = self._src_synset._wordnet
-        self.data = self._wordnet.G[self._src_synset.id][self._target_synset_id][self._idx]
+        if data is None:
+            data = self._wordnet.G[self._src_synset.id][self._target_synset_id][self._idx]
+        self.data = data
 
     def is_lexical(self):
         return all(k in self for k in ['lex_src', 'lex_target'])
@@ -109,7 +289,7 @@ class Synset(IterableUserDict):
     def __init__(self, id, wordnet):
         self.id = id
         self._wordnet = wordnet
-        self.data = self._wordnet.G.node[self.id]
+        self.data = self._wordnet._node_data(self.id)
 
     def related(self, type=None, lex_rel=True):
         return [r.target_synset() for r in self.relations(type, lex_rel)]
@@ -120,9 +300,9 @@ class Synset(IterableUserDict):
                 if lex_rel or not r.is_lexical()]
 
     def _unfiltered_relations(self):
-        return [Relation(idx, self, target_synset_id)
+        return [Relation(idx, self, target_synset_id, data)
                 for target_synset_id, edges in self._wordnet.G[self.id].items()
-                for idx in edges.keys()]
+                for idx, data in edges.items()]
 
     def lex_units(self):
         return [self._wordnet.LexUnit(lex_id, self) for lex_id in self['lex_units'].keys()]
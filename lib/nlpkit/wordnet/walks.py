@@ -0,0 +1,198 @@
+# coding: utf-8
+"""Random walks over a wordnet exported with export.to_csr, e.g. for training graph embeddings.
+
+    >>> matrix, ids = to_csr(wn, types=['@', '~'])
+    >>> walker = RandomWalker(matrix, walk_length=40, p=1.0, q=0.5)
+    >>> with WalkWriter('walks.txt', 'text', ids, walk_length=40) as out:
+    ...     for walks in generate_walks(walker, num_walks=10, processes=8):
+    ...         out.write(walks)
+
+All walkers of a shard take their steps together as numpy operations. Steps follow
+the edge weights. With p or q other than 1 the walks are biased as in node2vec:
+returning to the previous node is weighted by 1/p, moving to a neighbour of the
+previous node by 1, and moving further away by 1/q. Those second order steps are
+drawn by rejection sampling from the first order distribution.
+
+The walks are split into shards of a fixed size, and each shard gets its own random
+seed derived from the seed and the shard number, so the output does not depend on
+the number of worker processes.
+"""
+import struct
+from multiprocessing import Pool
+
+import numpy as np
+
+__author__ = "anders"
+
+BINARY_MAGIC = 'NKWALKS1'
+
+
+class RandomWalker(object):
+    def __init__(self, matrix, walk_length=40, p=1.0, q=1.0):
+        matrix = matrix.tocsr(copy=True)
+        matrix.eliminate_zeros()
+        matrix.sort_indices()
+        self.n = matrix.shape[0]
+        self.walk_length = walk_length
+        self.p, self.q = float(p), float(q)
+        self.indptr = matrix.indptr.astype(np.int64)
+        self.indices = matrix.indices
+        self.degree = np.diff(self.indptr)
+        data = matrix.data.astype(np.float64)
+        self.weighted = not np.all(data == data[0]) if len(data) else False
+        # Cumulative weights over all rows. A row's weights are the difference between
+        # its entries and the cumulative weight before the row.
+        self._cumulative = np.cumsum(data)
+        self._row_base = np.concatenate([[0.0], self._cumulative])[self.indptr[:-1]]
+        self._row_total = np.concatenate([[0.0], self._cumulative])[self.indptr[1:]] - self._row_base
+        # Edges as sorted (row * n + column) keys, for vectorized "is x a neighbour of y" tests
+        rows = np.repeat(np.arange(self.n, dtype=np.int64), self.degree)
+        self._edge_keys = rows * self.n + self.indices
+        self._biased = self.p != 1.0 or self.q != 1.0
+        self._max_alpha = max(1.0 / self.p, 1.0, 1.0 / self.q)
+
+    def _first_order(self, current, rng):
+        """Draw one neighbour of each node in current, by edge weight."""
+        r = rng.random_sample(len(current))
+        if not self.weighted:
+            return self.indices[self.indptr[current] + (r * self.degree[current]).astype(np.int64)]
+        targets = self._row_base[current] + r * self._row_total[current]
+        positions = np.searchsorted(self._cumulative, targets, side='right')
+        # Guard against rounding past the end of the row
+        positions = np.minimum(positions, self.indptr[current + 1] - 1)
+        return self.indices[positions]
+
+    def _is_edge(self, src, target):
+        keys = src.astype(np.int64) * self.n + target
+        positions = np.searchsorted(self._edge_keys, keys)
+        positions = np.minimum(positions, len(self._edge_keys) - 1)
+        return self._edge_keys[positions] == keys if len(self._edge_keys) else np.zeros(len(keys), bool)
+
+    def _second_order(self, previous, current, rng):
+        """Draw one next node for each walker at current that came from previous."""
+        result = self._first_order(current, rng)
+        pending = np.arange(len(current))
+        while len(pending):
+            candidates = result[pending]
+            alpha = np.empty(len(pending))
+            alpha.fill(1.0 / self.q)
+            alpha[self._is_edge(previous[pending], candidates)] = 1.0
+            alpha[candidates == previous[pending]] = 1.0 / self.p
+            rejected = rng.random_sample(len(pending)) * self._max_alpha >= alpha
+            pending = pending[rejected]
+            if len(pending):
+                result[pending] = self._first_order(current[pending], rng)
+        return result
+
+    def walk(self, starts, rng):
+        """Return an array with a walk from each start node per row, padded with -1
+        after walks that reach a node without neighbours."""
+        walks = np.empty((len(starts), self.walk_length), dtype=np.int32)
+        walks.fill(-1)
+        walks[:, 0] = starts
+        active = np.flatnonzero(self.degree[starts] > 0)
+        for step in range(1, self.walk_length):
+            if not len(active):
+                break
+            current = walks[active, step - 1]
+            if self._biased and step > 1:
+                walks[active, step] = self._second_order(walks[active, step - 2], current, rng)
+            else:
+                walks[active, step] = self._first_order(current, rng)
+            active = active[self.degree[walks[active, step]] > 0]
+        return walks
+
+
+def _shards(n_nodes, num_walks, shard_size, nodes=None):
+    """Yield (shard number, start nodes) covering num_walks walks from every node."""
+    starts = np.tile(np.arange(n_nodes, dtype=np.int32) if nodes is None else np.asarray(nodes, np.int32),
+                     num_walks)
+    for shard, i in enumerate(range(0, len(starts), shard_size)):
+        yield shard, starts[i:i + shard_size]
+
+
+_walker = None
+
+
+def _init_worker(walker):
+    global _walker
+    _walker = walker
+
+
+def _walk_shard(args):
+    shard, starts, seed = args
+    return _walker.walk(starts, np.random.RandomState([seed, shard]))
+
+
+def generate_walks(walker, num_walks=10, seed=0, processes=None, shard_size=10000, nodes=None):
+    """Yield arrays of walks, num_walks from each node (or from each of nodes), shard by shard.
+
+    With processes other than 1 the shards are walked by a pool of worker processes.
+    The walker is handed to the workers when they are forked, not pickled.
+    """
+    jobs = ((shard, starts, seed) for shard, starts in _shards(walker.n, num_walks, shard_size, nodes))
+    if processes == 1:
+        _init_worker(walker)
+        for job in jobs:
+            yield _walk_shard(job)
+        return
+    pool = Pool(processes, _init_worker, (walker,))
+    try:
+        for walks in pool.imap(_walk_shard, jobs):
+            yield walks
+    finally:
+        pool.terminate()
+
+
+class WalkWriter(object):
+    """Writes walks as text, one walk of synset ids per line, or in a compact binary format.
+
+    The binary format is a header of the magic string NKWALKS1 and the walk length
+    as a little endian int32, followed by the walks as rows of little endian int32
+    node indices, padded with -1. read_walks() memory maps such a file.
+    """
+    def __init__(self, filename, format='text', ids=None, walk_length=None):
+        if format not in ('text', 'binary'):
+            raise ValueError("format must be 'text' or 'binary'")
+        if format == 'binary' and walk_length is None:
+            raise ValueError("the binary format needs the walk length")
+        self.format = format
+        self.ids = ids
+        self._file = open(filename, 'wb')
+        self.walks_written = 0
+        if format == 'binary':
+            self._file.write(BINARY_MAGIC + struct.pack('<i', walk_length))
+
+    def write(self, walks):
+        if self.format == 'binary':
+            self._file.write(walks.astype('<i4').tobytes())
+        else:
+            ids = self.ids
+            lines = []
+            for walk in walks.tolist():
+                if ids is not None:
+                    lines.append(" ".join(ids[i] for i in walk if i >= 0))
+                else:
+                    lines.append(" ".join(str(i) for i in walk if i >= 0))
+            self._file.write("\n".join(lines) + "\n")
+        self.walks_written += len(walks)
+
+    def close(self):
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+def read_walks(filename):
+    """Return the walks of a binary walk file as a memory mapped array, one walk per row."""
+    with open(filename, 'rb') as f:
+        header = f.read(len(BINARY_MAGIC) + 4)
+    if header[:len(BINARY_MAGIC)] != BINARY_MAGIC:
+        raise ValueError("{} is not a binary walk file".format(filename))
+    walk_length = struct.unpack('<i', header[len(BINARY_MAGIC):])[0]
+    walks = np.memmap(filename, dtype='<i4', mode='r', offset=len(header))
+    return walks.reshape(-1, walk_length)
@@ -2,7 +2,11 @@
 import universal
 import re
 from nlpkit.paths import data_path
+from nlpkit.wordnet.morphy import Morphy, load_exceptions, lemma_sets, POS_LIST
+from nlpkit.wordnet.wnindex import Wn30Index
 from itertools import izip_longest
+from collections import defaultdict, Counter
+import mmap
 import os.path
 from glob import glob
 
@@ -14,22 +18,195 @@ class Wn30Synset(universal.Synset):
         first_lemma = '' if not self.lemmas() else self.lemmas()[0]
         return '{} {} {}'.format(self.id, self['gloss'], first_lemma)
 
+    def senses(self):
+        """Return the Senses (sense keys and tag counts) of the lemmas of the synset.
+
+        Requires the index.sense file.
+        """
+        index = self._wordnet.index
+        if index is None:
+            return []
+        return [sense for lemma in self.lemmas() for sense in index.senses(lemma, self['pos'])
+                if sense.synset_id == self.id]
+
 class Wn30(universal.Wordnet):
     Synset = Wn30Synset
     _hyponym_name = '~'
 
+    def __init__(self):
+        universal.Wordnet.__init__(self)
+        self.exceptions = {}
+        self.index = None
+        self._morphy = None
+        self._data_files = None
+
+    def __getstate__(self):
+        state = universal.Wordnet.__getstate__(self)
+        state['_morphy'] = None
+        return state
+
+    def _graph_changed(self):
+        universal.Wordnet._graph_changed(self)
+        # The lemmatizer of a lazy wordnet reads the index files, which parsing more synsets does not change
+        if self._data_files is None:
+            self._morphy = None
+
+    def invalidate_caches(self):
+        universal.Wordnet.invalidate_caches(self)
+        self._morphy = None
+
+    def lemmatizer(self, refresh=False):
+        """Return the Morphy lemmatizer of the wordnet.
+
+        It is built from the lemmas in the wordnet when first requested, and built again
+        after synsets are added or removed. Pass refresh=True, or call invalidate_caches(),
+        after changing the lex units of synsets directly.
+        """
+        if self._morphy is None or refresh and not self.frozen:
+            if self._data_files is not None and self.index is not None:
+                # A lazy wordnet checks candidates in the index files rather than loading all lemmas
+                lemmas = dict((pos, self.index.lemmas(pos)) for pos in POS_LIST)
+            else:
+                self.load_all()
+                lemma_pos = defaultdict(set)
+                for synset_id, data in self.G.nodes_iter(data=True):
+                    for lex_unit in data.get('lex_units', {}).itervalues():
+                        lemma_pos[lex_unit['lemma']].add(data['pos'])
+                lemmas = lemma_sets(lemma_pos)
+            self._morphy = Morphy(lemmas, self.exceptions)
+        if self.frozen:
+            # Every thread gets a lemmatizer of its own, so threads do not contend for the locks of its caches
+            if not hasattr(self._local, 'morphy'):
+                self._local.morphy = self._morphy.copy()
+            return self._local.morphy
+        return self._morphy
+
+    def morphy(self, form, pos=None):
+        """Return the base form of form, like nltk.corpus.wordnet.morphy, or None."""
+        return self.lemmatizer().morphy(form, pos)
+
+    def lemmatize(self, forms, pos=None):
+        """Return the base form (or None) of each form in a sequence, e.g. the tokens of a text."""
+        return self.lemmatizer().lemmatize(forms, pos)
+
+    def synsets(self, lemma, pos=None):
+        """Return the synsets of lemma and, like NLTK, of its base forms found by morphy.
+
+        With the WordNet index files, the synsets of each part of speech are ordered by
+        sense number, most frequent sense first.
+        """
+        lemmatizer = self.lemmatizer()
+        form, node = lemma.lower(), self.G.node
+        found, seen = [], set()
+        for p in ([pos] if pos else POS_LIST):
+            pos_set = ('a', 's') if p == 'a' else (p,)
+            for base_form in lemmatizer.cached_analyses(form, p):
+                for synset_id in self._sense_ordered(base_form, p):
+                    if synset_id not in seen and node[synset_id]['pos'] in pos_set:
+                        found.append(self.Synset(synset_id, self))
+                        seen.add(synset_id)
+        return found or universal.Wordnet.synsets(self, lemma, pos)
+
+    def _sense_ordered(self, lemma, pos):
+        if self._data_files is not None and self.index is not None:
+            for synset_id in self.index.synset_ids(lemma, pos):
+                self._data_files.materialize(synset_id)
+        synset_ids = self._synset_map.get(lemma, ())
+        if self.index is None or not synset_ids:
+            return synset_ids
+        ordered = [synset_id for synset_id in self.index.synset_ids(lemma, pos) if synset_id in synset_ids]
+        if len(ordered) < len(synset_ids):
+            # Synsets added after loading come last
+            ordered.extend(sorted(set(synset_ids).difference(ordered)))
+        return ordered
+
+    def senses(self, lemma, pos=None):
+        """Return the Senses of lemma, each with its sense key, synset id, sense number and tag count."""
+        return self.index.senses(lemma, pos) if self.index is not None else []
+
+    def tag_count(self, sense_key):
+        return self.index.tag_count(sense_key) if self.index is not None else None
+
     @classmethod
-    def load(cls, path):
-        return Wn30Loader(Wn30(), path).load()
+    def load(cls, path, lazy=False):
+        """Load the WordNet database files in path.
+
+        With lazy=True only the exception lists and index files are read up front, and
+        synsets are parsed from the data files as they are accessed; see Wn30DataFiles.
+        """
+        loader = Wn30Loader(Wn30(), path)
+        return loader.load_lazy() if lazy else loader.load()
+
+    def _node_data(self, synset_id):
+        if self._data_files is not None:
+            self._data_files.materialize(synset_id)
+        return universal.Wordnet._node_data(self, synset_id)
+
+    def __getitem__(self, key):
+        if self._data_files is not None:
+            self._data_files.materialize(key)
+        return universal.Wordnet.__getitem__(self, key)
+
+    def all_synsets(self):
+        self.load_all()
+        return universal.Wordnet.all_synsets(self)
+
+    def traversal(self, refresh=False):
+        self.load_all()
+        return universal.Wordnet.traversal(self, refresh)
+
+    def relation_counts(self):
+        self.load_all()
+        return universal.Wordnet.relation_counts(self)
+
+    def stats(self, distributions=False, components=False):
+        self.load_all()
+        return universal.Wordnet.stats(self, distributions, components)
+
+    def freeze(self):
+        """Freeze the wordnet, see universal.Wordnet.freeze(). A lazy wordnet is loaded first."""
+        if not self.frozen:
+            self.load_all()
+            self.lemmatizer()
+        return universal.Wordnet.freeze(self)
+
+    def load_pos(self, pos):
+        """Parse all synsets of a part of speech that have not been parsed yet (lazy mode only)."""
+        if self._data_files is not None:
+            self._data_files.load_pos(pos)
+
+    def load_all(self):
+        """Parse all synsets that have not been parsed yet, after which the wordnet is no longer lazy."""
+        if self._data_files is not None:
+            for pos in Wn30DataFiles.FILENAMES:
+                self._data_files.load_pos(pos)
+            self._data_files.close()
+            self._data_files = None
+
+    def materialized(self):
+        """Return counts of what a lazy wordnet has parsed so far."""
+        if self._data_files is None:
+            return {'lazy': False, 'synsets': self.G.number_of_nodes()}
+        return self._data_files.report()
+
+    def write(self, path):
+        """Write the wordnet to the directory path as WordNet data.* files."""
+        Wn30Writer(self, path).write()
 
 
 class Wn30Loader(object):
+    # Syntactic markers of adjectives, e.g. 'galore(ip)'
+    MARKER_RE = re.compile(r"\((a|p|ip)\)$")
+
     def __init__(self, wordnet, path):
         self._wordnet = wordnet
         self._G = wordnet.G
         self._path = data_path(path)
 
     def load(self):
+        self._wordnet.exceptions = load_exceptions(self._path)
+        if Wn30Index.exists(self._path):
+            self._wordnet.index = Wn30Index(self._path)
         for filename in glob(os.path.join(self._path, "data*")):
             with open(filename) as file:
                 for line in file:
@@ -44,6 +221,16 @@ class Wn30Loader(object):
                         raise e
         return self._wordnet
 
+    def load_lazy(self):
+        self._wordnet.exceptions = load_exceptions(self._path)
+        if Wn30Index.exists(self._path):
+            self._wordnet.index = Wn30Index(self._path)
+        self._wordnet._data_files = Wn30DataFiles(self, self._path)
+        return self._wordnet
+
+    def load_line(self, line):
+        self._handle_fields(self._parse_line(line.strip()))
+
     def format_synset_id(self, offset, pos):
         return "{}-{}".format(offset, pos)
 
@@ -60,7 +247,7 @@ class Wn30Loader(object):
             'semantic_file': fields['lex_filenum'][0],
             'lex_units': {}
         }
-        self._G.add_node(synset_id, synset_data)
+        self._wordnet.add_synset(synset_id, synset_data)
 
         self._handle_words(synset_id, fields.get('words', []))
         self._handle_pointers(synset_id, fields.get('pointers', []))
@@ -79,8 +266,13 @@ class Wn30Loader(object):
         # although there is no requirement that the numbers be consecutive or begin with 0 .
         # Note that a value of 0 is the default, and therefore is not present in lexicographer files.
         for i, word in enumerate(words[::2]):
-            self._G.node[synset_id]['lex_units'][i+1] = {'lemma': word.lower()}
-            # FIXME strip out parenthesis
+            lex_unit = {}
+            m = self.MARKER_RE.search(word)
+            if m:
+                word = word[:m.start()]
+                lex_unit['marker'] = m.group(1)
+            lex_unit['lemma'] = word.lower()
+            self._G.node[synset_id]['lex_units'][i+1] = lex_unit
             self._wordnet.add_synset_lookup(word.lower(), synset_id)
 
     def _handle_pointers(self, synset_id, pointers):
@@ -99,12 +291,12 @@ class Wn30Loader(object):
         for ptr_sym, offset, pos, src_target in self._grouper(pointers, 4):
             target_synset_id = self.format_synset_id(offset, pos)
             if src_target == '0000':
-                self._G.add_edge(synset_id, target_synset_id, type=ptr_sym)
+                self._wordnet.add_relation(synset_id, target_synset_id, {'type': ptr_sym})
             elif len(src_target) == 4:
-                self._G.add_edge(synset_id, target_synset_id,
-                                 type=ptr_sym,
-                                 lex_src=int(src_target[0:2], 16),
-                                 lex_target=int(src_target[2:4], 16))
+                self._wordnet.add_relation(synset_id, target_synset_id,
+                                           {'type': ptr_sym,
+                                            'lex_src': int(src_target[0:2], 16),
+                                            'lex_target': int(src_target[2:4], 16)})
             else:
                 raise StandardError("An error")
 
@@ -135,6 +327,179 @@ class Wn30Loader(object):
         unpack(data.split(), line_spec)
         return d
 
+class Wn30DataFiles(object):
+    """The data.<pos> files of a lazily loaded Wn30.
+
+    In the WordNet database the synset offset is the byte offset of the synset's line
+    in its data file, so a synset is parsed on first access by seeking to its line.
+    Files whose offsets are not byte offsets (e.g. those written by Wn30Writer) are
+    indexed by one scan the first time a lookup misses. Synsets are parsed with their
+    outgoing relations; the targets of those relations are parsed when accessed.
+    """
+    FILENAMES = {'n': 'data.noun', 'v': 'data.verb', 'a': 'data.adj', 'r': 'data.adv'}
+
+    def __init__(self, loader, path):
+        self._loader = loader
+        self._G = loader._G
+        self._path = path
+        self._files = {}
+        self._offset_index = {}
+        self._loaded_pos = set()
+        self._parsed = set()
+        self.counters = Counter()
+
+    def close(self):
+        for mm in self._files.values():
+            mm.close()
+        self._files = {}
+
+    def _file(self, pos):
+        if pos not in self._files:
+            filename = os.path.join(self._path, self.FILENAMES[pos])
+            if not os.path.exists(filename):
+                return None
+            with open(filename, 'rb') as f:
+                self._files[pos] = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        return self._files[pos]
+
+    def _line_start(self, mm, pos, offset):
+        start = int(offset)
+        if pos not in self._offset_index:
+            if mm[start:start + len(offset) + 1] == offset + ' ' and (start == 0 or mm[start - 1] == '\n'):
+                return start
+            self._build_offset_index(mm, pos)
+        return self._offset_index[pos].get(offset)
+
+    def _build_offset_index(self, mm, pos):
+        index = self._offset_index[pos] = {}
+        start = 0
+        while start < len(mm):
+            end = mm.find('\n', start)
+            if end < 0:
+                end = len(mm)
+            if end > start and mm[start] != ' ':
+                index[mm[start:mm.find(' ', start, end)]] = start
+            start = end + 1
+        self.counters['offset_indexes_built'] += 1
+
+    def materialize(self, synset_id):
+        """Parse the synset with the given id, unless it has been parsed. Returns whether it exists."""
+        if synset_id in self._parsed:
+            return True
+        if not isinstance(synset_id, basestring):
+            return False
+        offset, _, pos = synset_id.rpartition('-')
+        file_pos = 'a' if pos == 's' else pos
+        if not offset.isdigit() or file_pos not in self.FILENAMES or file_pos in self._loaded_pos:
+            return False
+        mm = self._file(file_pos)
+        start = self._line_start(mm, file_pos, offset) if mm is not None else None
+        if start is None:
+            return False
+        end = mm.find('\n', start)
+        line = mm[start:end if end >= 0 else len(mm)]
+        self._parse(line)
+        # Pointers to satellite adjectives have pos 'a', so the requested id may differ from the parsed one
+        self._parsed.add(synset_id)
+        return True
+
+    def _parse(self, line):
+        self._loader.load_line(line)
+        fields = line.split(' ', 3)
+        self._parsed.add("{}-{}".format(fields[0], fields[2]))
+        self.counters['synsets_parsed'] += 1
+        self.counters['synsets_parsed_' + fields[2]] += 1
+        self.counters['bytes_parsed'] += len(line) + 1
+
+    def load_pos(self, pos):
+        if pos == 's':
+            pos = 'a'
+        if pos in self._loaded_pos:
+            return
+        mm = self._file(pos)
+        start = 0
+        while mm is not None and start < len(mm):
+            end = mm.find('\n', start)
+            if end < 0:
+                end = len(mm)
+            if end > start and mm[start] != ' ':
+                fields = mm[start:start + 32].split(' ', 3)
+                if "{}-{}".format(fields[0], fields[2]) not in self._parsed:
+                    self._parse(mm[start:end])
+            start = end + 1
+        self._loaded_pos.add(pos)
+        self.counters['pos_loaded'] += 1
+
+    def report(self):
+        file_sizes = dict((pos, os.path.getsize(os.path.join(self._path, filename)))
+                          for pos, filename in self.FILENAMES.items()
+                          if os.path.exists(os.path.join(self._path, filename)))
+        return {
+            'lazy': True,
+            'synsets': self._G.number_of_nodes(),
+            'synsets_parsed': self.counters['synsets_parsed'],
+            'synsets_parsed_by_pos': dict((key[len('synsets_parsed_'):], n) for key, n in self.counters.items()
+                                          if key.startswith('synsets_parsed_')),
+            'bytes_parsed': self.counters['bytes_parsed'],
+            'bytes_total': sum(file_sizes.values()),
+            'pos_loaded': sorted(self._loaded_pos),
+            'offset_indexes_built': self.counters['offset_indexes_built'],
+        }
+
+    # The memory maps cannot be pickled; they are opened again as needed
+    def __getstate__(self):
+        state = dict(self.__dict__)
+        state['_files'] = {}
+        return state
+
+
+class Wn30Writer(object):
+    """Writes a Wn30 as data.noun, data.verb, data.adj and data.adv files.
+
+    Synset ids are kept, so the synset_offset fields are the original offsets rather than
+    byte offsets into the new files. Information the loader does not keep (lex_id, the
+    case of words and verb frames) is written as its default value. Exception lists are
+    not written.
+    """
+    FILENAMES = {'n': 'data.noun', 'v': 'data.verb', 'a': 'data.adj', 's': 'data.adj', 'r': 'data.adv'}
+
+    def __init__(self, wordnet, path):
+        self._wordnet = wordnet
+        self._G = wordnet.G
+        self._path = path
+
+    def write(self):
+        if not os.path.isdir(self._path):
+            os.makedirs(self._path)
+        lines = dict((filename, []) for filename in self.FILENAMES.values())
+        for synset_id in sorted(self._G.nodes_iter()):
+            offset, pos = synset_id.split("-")
+            lines[self.FILENAMES[pos]].append(self._format_line(synset_id, offset, pos))
+        for filename, file_lines in lines.items():
+            if file_lines:
+                with open(os.path.join(self._path, filename), 'w') as file:
+                    file.writelines(file_lines)
+
+    def _format_line(self, synset_id, offset, pos):
+        data = self._G.node[synset_id]
+        words = [lex_unit['lemma'] + ("(%s)" % lex_unit['marker'] if 'marker' in lex_unit else '')
+                 for lex_unit in (data['lex_units'][k] for k in sorted(data['lex_units']))]
+        fields = [offset, data['semantic_file'], data['pos'], "%02x" % len(words)]
+        for word in words:
+            fields.extend([word, '0'])
+
+        pointers = []
+        for target_synset_id, edges in sorted(self._G[synset_id].items()):
+            target_offset, target_pos = target_synset_id.split("-")
+            for edge in edges.values():
+                src_target = "%02x%02x" % (edge.get('lex_src', 0), edge.get('lex_target', 0))
+                pointers.extend([edge['type'], target_offset, target_pos, src_target])
+        fields.append("%03d" % (len(pointers) / 4))
+        fields.extend(pointers)
+        if pos == 'v':
+            fields.append('00')
+        return "{} |{}\n".format(" ".join(fields), data['gloss'])
+
 # FIXME fold this into the universal.framework
 class WN30Matcher(object):
     def __init__(self):
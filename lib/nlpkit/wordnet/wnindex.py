@@ -0,0 +1,192 @@
+# coding: utf-8
+"""Lookups in the WordNet index.noun/verb/adj/adv and index.sense files.
+
+The files are sorted by their first field, so like WordNet's own bin_search the
+lookups binary search the memory mapped files instead of loading them. Only the
+pages touched by the search are read from disk, which makes Wn30Index usable on its
+own as a lookup-only wordnet:
+
+    >>> index = Wn30Index(data_path('wordnets/wn30'))
+    >>> index.synset_ids('dog', 'n')            # most frequent sense first
+    ['02084071-n', '10114209-n', ...]
+    >>> index.senses('dog', 'n')[0]
+    Sense(sense_key='dog%1:05:00::', synset_id='02084071-n', sense_number=1, tag_count=42)
+
+Lemmas are looked up in the form used by the index files: lower case, with
+underscores for spaces.
+"""
+import mmap
+import os.path
+from collections import namedtuple
+
+__author__ = "anders"
+
+INDEX_FILES = {'n': 'index.noun', 'v': 'index.verb', 'a': 'index.adj', 'r': 'index.adv'}
+POS_LIST = ['n', 'v', 'a', 'r']
+# The ss_type digit of sense keys
+SS_TYPES = {'1': 'n', '2': 'v', '3': 'a', '4': 'r', '5': 's'}
+
+IndexEntry = namedtuple('IndexEntry', 'lemma pos synset_cnt pointers sense_cnt tagsense_cnt offsets')
+Sense = namedtuple('Sense', 'sense_key synset_id sense_number tag_count')
+
+
+class SortedFile(object):
+    """A memory mapped text file whose lines are sorted by their first field."""
+    def __init__(self, filename):
+        self.filename = filename
+        with open(filename, 'rb') as f:
+            self._mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        self.size = len(self._mm)
+
+    def close(self):
+        self._mm.close()
+
+    def _key(self, start, end):
+        space = self._mm.find(' ', start, end)
+        return self._mm[start:space if space >= 0 else end]
+
+    def lower_bound(self, key):
+        """Return the position of the first line whose key is not less than key."""
+        mm = self._mm
+        lo, hi = 0, self.size
+        while lo < hi:
+            # Look at the line holding the middle position
+            mid = (lo + hi) // 2
+            start = mm.rfind('\n', 0, mid) + 1
+            end = mm.find('\n', mid)
+            if end < 0:
+                end = self.size
+            if start < lo:
+                # mid is inside the line starting at lo
+                start = lo
+            if self._key(start, end) < key:
+                lo = end + 1
+            else:
+                hi = start
+        return lo
+
+    def _lines_from(self, position):
+        mm = self._mm
+        while position < self.size:
+            end = mm.find('\n', position)
+            if end < 0:
+                end = self.size
+            yield mm[position:end]
+            position = end + 1
+
+    def find(self, key):
+        """Return the line with the given key, or None."""
+        for line in self._lines_from(self.lower_bound(key)):
+            return line if line.split(' ', 1)[0] == key else None
+        return None
+
+    def __contains__(self, key):
+        return self.find(key) is not None
+
+    def prefixed(self, prefix):
+        """Yield the lines whose keys start with prefix, in order."""
+        for line in self._lines_from(self.lower_bound(prefix)):
+            if not line.startswith(prefix):
+                break
+            yield line
+
+
+class Wn30Index(object):
+    def __init__(self, path):
+        self.path = path
+        self._open()
+
+    def _open(self):
+        self._files = dict((pos, SortedFile(os.path.join(self.path, filename)))
+                           for pos, filename in INDEX_FILES.items()
+                           if os.path.exists(os.path.join(self.path, filename)))
+        sense_filename = os.path.join(self.path, 'index.sense')
+        self._sense_file = SortedFile(sense_filename) if os.path.exists(sense_filename) else None
+
+    @classmethod
+    def exists(cls, path):
+        return os.path.exists(os.path.join(path, 'index.sense'))
+
+    def close(self):
+        for f in self._files.values() + filter(None, [self._sense_file]):
+            f.close()
+
+    # The memory maps cannot be pickled, so a pickled index only holds its path
+    def __getstate__(self):
+        return {'path': self.path}
+
+    def __setstate__(self, state):
+        self.path = state['path']
+        self._open()
+
+    @staticmethod
+    def normalize(lemma):
+        return lemma.lower().replace(' ', '_')
+
+    def lemmas(self, pos):
+        """Return the lemmas of index.<pos>, as a container that supports only the in operator.
+
+        Without an index.<pos> file the part of speech has no lemmas.
+        """
+        return self._files.get('a' if pos == 's' else pos, frozenset())
+
+    def entry(self, lemma, pos):
+        """Return the IndexEntry of lemma in index.<pos>, or None."""
+        if pos == 's':
+            pos = 'a'
+        if pos not in self._files:
+            return None
+        line = self._files[pos].find(self.normalize(lemma))
+        if line is None:
+            return None
+        fields = line.split()
+        p_cnt = int(fields[3])
+        pointers = fields[4:4 + p_cnt]
+        rest = fields[4 + p_cnt:]
+        return IndexEntry(fields[0], fields[1], int(fields[2]), pointers, int(rest[0]), int(rest[1]), rest[2:])
+
+    def senses(self, lemma, pos=None):
+        """Return the Senses of lemma, by part of speech (n, v, a, r) and then sense number."""
+        if self._sense_file is None:
+            return []
+        senses = []
+        for line in self._sense_file.prefixed(self.normalize(lemma) + '%'):
+            sense_key, offset, sense_number, tag_count = line.split()
+            ss_type = SS_TYPES[sense_key.split('%', 1)[1][0]]
+            senses.append(Sense(sense_key, "{}-{}".format(offset, ss_type), int(sense_number), int(tag_count)))
+        if pos is not None:
+            pos_set = ('a', 's') if pos in ('a', 's') else (pos,)
+            senses = [s for s in senses if s.synset_id[-1] in pos_set]
+        rank = dict((p, i) for i, p in enumerate(POS_LIST + ['s']))
+        senses.sort(key=lambda s: (rank['a' if s.synset_id[-1] == 's' else s.synset_id[-1]], s.sense_number))
+        return senses
+
+    def sense(self, sense_key):
+        """Return the Sense with the given sense key, or None."""
+        if self._sense_file is None:
+            return None
+        line = self._sense_file.find(sense_key)
+        if line is None:
+            return None
+        sense_key, offset, sense_number, tag_count = line.split()
+        ss_type = SS_TYPES[sense_key.split('%', 1)[1][0]]
+        return Sense(sense_key, "{}-{}".format(offset, ss_type), int(sense_number), int(tag_count))
+
+    def tag_count(self, sense_key):
+        sense = self.sense(sense_key)
+        return sense.tag_count if sense else None
+
+    def synset_ids(self, lemma, pos=None):
+        """Return the ids of the synsets of lemma, most frequent sense first."""
+        ids = []
+        for p in ([pos] if pos else POS_LIST):
+            entry = self.entry(lemma, p)
+            if entry is None:
+                continue
+            if p in ('a', 's'):
+                # index.adj does not tell head adjectives from satellites; index.sense does
+                ss_types = dict((s.synset_id[:-2], s.synset_id[-1]) for s in self.senses(lemma, 'a'))
+                ids.extend("{}-{}".format(offset, ss_types.get(offset, 'a')) for offset in entry.offsets)
+            else:
+                ids.extend("{}-{}".format(offset, p) for offset in entry.offsets)
+        return ids
@@ -0,0 +1,89 @@
+# coding: utf-8
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'lib'))
+
+from nlpkit.wordnet.dannet import Dannet
+from nlpkit.wordnet.delta import Delta, diff
+from nlpkit.wordnet.wn30 import Wn30
+
+__author__ = "anders"
+
+
+def small_dannet(extra_sense=False):
+    wn = Dannet()
+    for n in ['1', '2', '3', '4']:
+        wn.add_synset(n, {'id': n, 'label': 'label' + n, 'gloss': '', 'ontological_type': '',
+                          'pos': 'n', 'lex_units': {}})
+    senses = [('d1', 'w1', '1'), ('d2', 'w2', '2'), ('d3', 'w3', '3'), ('d4', 'w4', '4')]
+    if extra_sense:
+        senses.insert(0, ('d5', 'w5', '3'))
+    for ddo_id, word_id, synset_id in senses:
+        word = 'word' + word_id[1:]
+        wn.G.node[synset_id]['lex_units'][word_id] = {'word': word, 'pos': 'n', 'ddo_id': ddo_id,
+                                                      'word_id': word_id, 'synset_id': synset_id, 'register': ''}
+        wn.add_synset_lookup(word, synset_id)
+    wn.add_relation('2', '1', {'type': u'has_hyperonym', 'name': u'hyponymOf', 'taxonomic': u'taxonomic',
+                               'inheritance_comment': u''})
+    wn.add_relation('1', '2', {'type': u'has_hyponym', 'taxonomic': u'taxonomic', 'inheritance_comment': u''})
+    wn.ili.add('1', 'ENG20-03574555-n', 'eq_synonym')
+    return wn
+
+
+def small_wn30(lemmas):
+    wn = Wn30()
+    for i, lemma in enumerate(lemmas):
+        wn.add_synset('{:08d}-n'.format(i), {'pos': 'n', 'lex_units': {1: {'lemma': lemma}}})
+        wn.add_synset_lookup(lemma, '{:08d}-n'.format(i))
+    return wn
+
+
+class DeltaTest(unittest.TestCase):
+    def setUp(self):
+        self.dir = tempfile.mkdtemp(prefix='nlpkit-test-')
+
+    def tearDown(self):
+        shutil.rmtree(self.dir)
+
+    def test_identical(self):
+        self.assertEqual(len(diff(small_dannet(), small_dannet())), 0)
+
+    def test_save_load_apply(self):
+        old, new = small_dannet(), small_dannet(extra_sense=True)
+        new.add_relation('3', '4', {'type': u'has_mero_part'})
+        new.remove_synset('2')
+        new.ili.add('4', 'ENG20-00001740-n', 'eq_synonym')
+        filename = os.path.join(self.dir, 'delta.gz')
+        diff(old, new).save(filename)
+        delta = Delta.load(filename)
+        delta.apply(old)
+        self.assertEqual(len(diff(old, new)), 0)
+        self.assertEqual(old.stats(), new.stats())
+
+    def test_inserted_word_sense(self):
+        # Lex units are keyed by word id, so one new word sense is one added lex unit
+        delta = diff(small_dannet(), small_dannet(extra_sense=True))
+        self.assertEqual(len(delta.added_lex_units), 1)
+        self.assertEqual(len(delta.changed_lex_units) + len(delta.removed_lex_units), 0)
+
+    def test_frozen(self):
+        old, new = small_dannet(), small_dannet(extra_sense=True).freeze()
+        delta = diff(old, new)
+        delta.save(os.path.join(self.dir, 'delta.gz'))
+        self.assertEqual(len(delta.added_lex_units), 1)
+
+    def test_apply_updates_lemmatizer(self):
+        # Only a lex unit changes, which Delta.apply does to the node data directly
+        old, new = small_wn30(['dog', 'mouse']), small_wn30(['dog', 'cat'])
+        self.assertEqual(old.morphy('cats'), None)
+        diff(old, new).apply(old)
+        self.assertEqual(old.morphy('cats'), 'cat')
+        self.assertEqual(old.morphy('mouses'), None)
+
+
+if __name__ == '__main__':
+    unittest.main()
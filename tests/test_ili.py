@@ -0,0 +1,58 @@
+# coding: utf-8
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'lib'))
+
+from nlpkit.wordnet.dannet import Dannet
+from nlpkit.wordnet.ili import InterlingualIndex
+
+__author__ = "anders"
+
+
+class InterlingualIndexTest(unittest.TestCase):
+    def setUp(self):
+        self.ili = InterlingualIndex()
+        self.ili.add('1', 'ENG20-03574555-n', 'eq_synonym')
+        self.ili.add('1', 'ENG30-03574555-n', 'eq_near_synonym')
+        self.ili.add('2', 'ENG20-00001740-n', 'eq_has_hyponym')
+
+    def test_versions_are_kept_apart(self):
+        self.assertEqual(sorted(self.ili.links('1')), [('03574555-n', 'eq_near_synonym'),
+                                                       ('ENG20-03574555-n', 'eq_synonym')])
+        self.assertEqual(self.ili.links('1', version='20'), [('ENG20-03574555-n', 'eq_synonym')])
+        self.assertEqual(self.ili.links('1', version='30'), [('03574555-n', 'eq_near_synonym')])
+        self.assertEqual(self.ili.reverse_links('03574555-n'), [('1', 'eq_near_synonym')])
+
+    def test_link_values_round_trip(self):
+        copy = InterlingualIndex()
+        for link in self.ili.link_values():
+            copy.add(*link)
+        self.assertEqual(sorted(copy.link_values()), sorted(self.ili.link_values()))
+        self.assertIn(('1', 'ENG30-03574555-n', 'eq_near_synonym'), list(copy.link_values()))
+
+    def test_remove(self):
+        self.ili.remove('1', 'ENG20-03574555-n', 'eq_synonym')
+        self.assertEqual(self.ili.links('1'), [('03574555-n', 'eq_near_synonym')])
+        self.assertEqual(self.ili.reverse_links('ENG20-03574555-n'), [])
+
+
+class WnSynsetIdsTest(unittest.TestCase):
+    def test_all_versions_by_default(self):
+        wn = Dannet()
+        wn.add_synset('1', {'id': '1', 'label': 'label1', 'gloss': '', 'ontological_type': '',
+                            'pos': 'n', 'lex_units': {}})
+        wn.ili.add('1', 'ENG20-03574555-n', 'eq_synonym')
+        synset = wn['1']
+        self.assertEqual(synset.wn_synset_ids(), ['ENG20-03574555-n'])
+        self.assertEqual(synset.wn_synset_ids(version='30'), [])
+
+        wn.ili.add('1', 'ENG30-03574555-n', 'eq_synonym')
+        self.assertEqual(sorted(synset.wn_synset_ids()), ['03574555-n', 'ENG20-03574555-n'])
+        self.assertEqual(synset.wn_synset_ids(version='30'), ['03574555-n'])
+        self.assertEqual(synset.wn_synset_ids(types=['eq_has_hyponym']), [])
+
+
+if __name__ == '__main__':
+    unittest.main()
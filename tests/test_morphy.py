@@ -0,0 +1,160 @@
+# coding: utf-8
+"""Morphy against results worked out by hand from NLTK's nltk.corpus.reader.wordnet._morphy,
+and against the examples of NLTK's wordnet doctest when WordNet 3.0 is in a data path."""
+import os
+import sys
+import threading
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'lib'))
+
+from nlpkit.paths import data_path
+from nlpkit.wordnet.morphy import LRUCache, Morphy
+
+__author__ = "anders"
+
+LEMMAS = {
+    'n': set(['dog', 'church', 'glass', 'glasse', 'wolf', 'box', 'woman', 'fly', 'ax', 'axis', 'book', 'ring']),
+    'v': set(['be', 'fly', 'hope', 'hop', 'ring', 'book', 'glass']),
+    'a': set(['happy', 'hard', 'large', 'red']),
+    'r': set(['hard', 'well']),
+}
+EXCEPTIONS = {
+    'n': {'axes': ['ax', 'axis'], 'geese': ['goose']},
+    'v': {'were': ['be'], 'rang': ['ring']},
+    'a': {'happier': ['happy'], 'better': ['good', 'well']},
+    'r': {'better': ['well']},
+}
+
+
+class MorphyTest(unittest.TestCase):
+    def setUp(self):
+        self.morphy = Morphy(LEMMAS, EXCEPTIONS)
+
+    def test_analyses(self):
+        cases = [
+            ('dogs', 'n', ['dog']),
+            ('churches', 'n', ['church']),
+            ('wolves', 'n', ['wolf']),
+            ('boxes', 'n', ['box']),
+            ('women', 'n', ['woman']),
+            ('flies', 'n', ['fly']),
+            # Candidates come in the order of the rules that make them
+            ('glasses', 'n', ['glasse', 'glass']),
+            # A lemma is its own analysis
+            ('book', 'n', ['book']),
+            ('book', 'a', []),
+            # Exceptions are checked against the lemmas, and no rules are tried for them
+            ('axes', 'n', ['ax', 'axis']),
+            ('geese', 'n', []),
+            ('were', 'v', ['be']),
+            ('better', 'a', []),
+            ('better', 'r', ['well']),
+            ('hoped', 'v', ['hope', 'hop']),
+            ('hoping', 'v', ['hope', 'hop']),
+            ('happier', 'a', ['happy']),
+            ('harder', 'a', ['hard']),
+            ('largest', 'a', ['large']),
+            ('happier', 's', ['happy']),
+            # The rules are applied again to the candidates that are not lemmas
+            ('ringings', 'v', ['ring']),
+            ('hardrock', 'r', []),
+        ]
+        for form, pos, expected in cases:
+            self.assertEqual(self.morphy.analyses(form, pos), expected, (form, pos))
+
+    def test_morphy(self):
+        cases = [
+            (('dogs',), 'dog'),
+            (('hoped', 'v'), 'hope'),
+            (('glasses', 'n'), 'glasse'),
+            # Without a pos, the first pos in the order n, v, a, r that has an analysis wins
+            (('flies',), 'fly'),
+            (('rang',), 'ring'),
+            (('better',), 'well'),
+            (('harder',), 'hard'),
+            (('glasses', 'v'), 'glass'),
+            (('geese',), None),
+            (('qwerty',), None),
+        ]
+        for args, expected in cases:
+            self.assertEqual(self.morphy.morphy(*args), expected, args)
+            # Again, from the cache
+            self.assertEqual(self.morphy.morphy(*args), expected, args)
+
+    def test_lemmatize(self):
+        forms = ['dogs', 'were', 'happier', 'dogs', 'qwerty']
+        self.assertEqual(self.morphy.lemmatize(forms), ['dog', 'be', 'happy', 'dog', None])
+        self.assertEqual(self.morphy.lemmatize(forms), [self.morphy.morphy(form) for form in forms])
+
+    def test_copy(self):
+        copy = self.morphy.copy()
+        self.assertEqual(copy.morphy('churches'), 'church')
+        self.assertEqual(len(self.morphy.cache), 0)
+
+
+class LRUCacheTest(unittest.TestCase):
+    def test_drops_least_recently_used(self):
+        cache = LRUCache(2)
+        cache.put('a', 1)
+        cache.put('b', 2)
+        self.assertEqual(cache.get('a'), 1)
+        cache.put('c', 3)
+        self.assertEqual(cache.get('b'), None)
+        self.assertEqual((cache.get('a'), cache.get('c')), (1, 3))
+        cache.put('a', 4)
+        cache.put('d', 5)
+        self.assertEqual((cache.get('a'), cache.get('c'), cache.get('d')), (4, None, 5))
+        self.assertEqual(len(cache), 2)
+
+    def test_threads(self):
+        cache = LRUCache(50)
+
+        def work(offset):
+            for i in xrange(20000):
+                key = (i * 7 + offset) % 200
+                value = cache.get(key)
+                if value is None:
+                    cache.put(key, key)
+                else:
+                    assert value == key
+
+        threads = [threading.Thread(target=work, args=(offset,)) for offset in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(len(cache), 50)
+        self.assertEqual(cache.hits + cache.misses, 80000)
+
+
+def wn30_path():
+    try:
+        return data_path('wordnets/wn30')
+    except IOError:
+        return None
+
+
+@unittest.skipIf(wn30_path() is None, "WordNet 3.0 is not in a data path as wordnets/wn30")
+class Wn30MorphyTest(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        from nlpkit.wordnet.wn30 import Wn30
+        cls.wn = Wn30.load(wn30_path(), lazy=True)
+
+    def test_nltk_doctest(self):
+        # The morphy examples of NLTK's wordnet.doctest
+        self.assertEqual(self.wn.morphy('dogs'), 'dog')
+        self.assertEqual(self.wn.morphy('churches'), 'church')
+        self.assertEqual(self.wn.morphy('aardwolves'), 'aardwolf')
+        self.assertEqual(self.wn.morphy('abaci'), 'abacus')
+        self.assertEqual(self.wn.morphy('hardrock', 'r'), None)
+        self.assertEqual(self.wn.morphy('book', 'n'), 'book')
+        self.assertEqual(self.wn.morphy('book', 'a'), None)
+
+    def test_lemmatize(self):
+        self.assertEqual(self.wn.lemmatize(['dogs', 'were', 'happier']), ['dog', 'be', 'happy'])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,108 @@
+# coding: utf-8
+import os
+import shutil
+import sys
+import tempfile
+import threading
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'lib'))
+
+from nlpkit.pipeline import ToolPool, ToolError
+
+__author__ = "anders"
+
+# A tool that echoes its input, and exits on the line 'crash' after removing itself,
+# so that it cannot be restarted
+SELF_REMOVING_TOOL = """#!/bin/sh
+while IFS= read -r line; do
+    if [ "$line" = crash ]; then
+        rm -f "$0"
+        exit 1
+    fi
+    printf '%s\\n' "$line"
+done
+"""
+
+# A tool that exits on the first 'crash' line it sees, which it records in a file,
+# and echoes its input otherwise
+CRASH_ONCE_TOOL = """#!/bin/sh
+while IFS= read -r line; do
+    if [ "$line" = crash ] && [ ! -e "$0.crashed" ]; then
+        touch "$0.crashed"
+        exit 1
+    fi
+    printf '%s\\n' "$line"
+done
+"""
+
+
+def run_with_timeout(function, timeout=30):
+    """Return what function returns or raises, failing if it takes more than timeout seconds."""
+    outcome = {}
+
+    def target():
+        try:
+            outcome['result'] = function()
+        except Exception as e:
+            outcome['error'] = e
+    thread = threading.Thread(target=target)
+    thread.daemon = True
+    thread.start()
+    thread.join(timeout)
+    if thread.is_alive():
+        raise AssertionError("no result within {} seconds".format(timeout))
+    return outcome
+
+
+class ToolPoolTest(unittest.TestCase):
+    def setUp(self):
+        self.dir = tempfile.mkdtemp(prefix='nlpkit-test-')
+
+    def tearDown(self):
+        shutil.rmtree(self.dir)
+
+    def tool(self, source):
+        path = os.path.join(self.dir, 'tool.sh')
+        with open(path, 'w') as f:
+            f.write(source)
+        os.chmod(path, 0o755)
+        return path
+
+    def test_cat(self):
+        lines = ["line {}".format(i) for i in range(1000)]
+        with ToolPool(['cat'], processes=3, batch_size=7) as pool:
+            self.assertEqual(list(pool.imap(lines)), lines)
+        self.assertEqual(sum(w['lines_in'] for w in pool.stats()['workers']), 1000)
+
+    def test_sed(self):
+        lines = ["colour {}".format(i) for i in range(500)]
+        with ToolPool(['sed', '-u', 's/colour/color/'], processes=2, batch_size=50) as pool:
+            self.assertEqual(list(pool.imap(lines)), ["color {}".format(i) for i in range(500)])
+
+    def test_delimiter(self):
+        # Each batch's output is all lines up to the delimiter, however many there are
+        with ToolPool(['sed', '-u', '/^drop/d'], processes=2, batch_size=3, delimiter='EOB') as pool:
+            output = list(pool.imap_batches(['a', 'drop', 'b', 'c', 'drop', 'drop', 'd']))
+        self.assertEqual(output, [['a', 'b'], ['c'], ['d']])
+
+    def test_crashed_tool_is_restarted(self):
+        lines = ['a', 'b', 'crash', 'c', 'd']
+        with ToolPool([self.tool(CRASH_ONCE_TOOL)], processes=2, batch_size=2) as pool:
+            self.assertEqual(list(pool.imap(lines)), lines)
+        self.assertEqual(sum(w['restarts'] for w in pool.stats()['workers']), 1)
+
+    def test_batch_that_always_crashes(self):
+        with ToolPool(['sh', '-c', 'exit 1'], processes=2, batch_size=2, retries=1) as pool:
+            outcome = run_with_timeout(lambda: list(pool.imap(['a', 'b', 'c'])))
+        self.assertIsInstance(outcome.get('error'), ToolError)
+
+    def test_tool_that_cannot_be_restarted(self):
+        lines = ['a'] * 10 + ['crash'] + ['b'] * 10
+        with ToolPool([self.tool(SELF_REMOVING_TOOL)], processes=2, batch_size=3) as pool:
+            outcome = run_with_timeout(lambda: list(pool.imap(lines)))
+        self.assertIsInstance(outcome.get('error'), OSError)
+
+
+if __name__ == '__main__':
+    unittest.main()
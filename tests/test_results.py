@@ -0,0 +1,52 @@
+# coding: utf-8
+from StringIO import StringIO
+import json
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'lib'))
+
+from nlpkit.results import read_results, load_columns
+
+__author__ = "anders"
+
+
+class ReadResultsTest(unittest.TestCase):
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.stdin = sys.stdin
+
+    def tearDown(self):
+        sys.stdin = self.stdin
+        shutil.rmtree(self.dir)
+
+    def write(self, name, contents):
+        path = os.path.join(self.dir, name)
+        with open(path, 'w') as f:
+            f.write(contents)
+        return path
+
+    def test_list_and_stream(self):
+        as_list = self.write('list.json', json.dumps([{'a': 1}, {'a': 2}]))
+        as_stream = self.write('stream.json', '{"a": 1}\n{"a": 2} [{"a": 3}]')
+        self.assertEqual(read_results(as_list), [{'a': 1}, {'a': 2}])
+        self.assertEqual(read_results(as_stream), [{'a': 1}, {'a': 2}, {'a': 3}])
+
+    def test_stdin(self):
+        sys.stdin = StringIO('{"a": 1, "b": "x"}\n{"a": 2, "b": "y"}\n')
+        self.assertEqual(read_results('-'), [{'a': 1, 'b': 'x'}, {'a': 2, 'b': 'y'}])
+
+    def test_load_columns_with_stdin(self):
+        first = self.write('first.json', '{"a": 1}')
+        last = self.write('last.json', '{"a": 4}')
+        for processes in (1, 2):
+            sys.stdin = StringIO('{"a": 2} {"a": 3}')
+            columns = load_columns([first, '-', last], ['a'], processes)
+            self.assertEqual(list(columns['a']), [1, 2, 3, 4])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,76 @@
+# coding: utf-8
+import json
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'lib'))
+
+from nlpkit.results import load_columns, result_columns
+from nlpkit.resultstore import ResultStore
+
+__author__ = "anders"
+
+RESULTS = [{'model': 'a', 'seed': 1, 'precision': 0.5},
+           {'model': 'a', 'seed': 2, 'precision': 0.7},
+           {'model': 'b', 'seed': 1, 'precision': 0.6, 'layers': 2},
+           {'model': 'b', 'seed': 2, 'precision': None, 'layers': 2},
+           {'model': 'c', 'seed': 1}]
+
+
+def as_lists(columns):
+    return dict((key, sorted(column)) for key, column in columns.iteritems())
+
+
+class ResultStoreTest(unittest.TestCase):
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.results_file = os.path.join(self.dir, 'results.json')
+        with open(self.results_file, 'w') as f:
+            for result in RESULTS:
+                f.write(json.dumps(result) + '\n')
+        self.store = ResultStore(os.path.join(self.dir, 'results.db'))
+        self.store.append_file(self.results_file)
+
+    def tearDown(self):
+        self.store.close()
+        shutil.rmtree(self.dir)
+
+    def columns_of_file(self, keys):
+        return load_columns([self.results_file], keys, processes=1)
+
+    def test_same_columns_as_file(self):
+        for keys in [['model', 'precision'], ['model', 'layers'], ['seed'], ['model', 'precision', 'layers']]:
+            self.assertEqual(as_lists(self.store.columns(keys)), as_lists(self.columns_of_file(keys)), keys)
+        self.assertEqual(as_lists(self.store.columns(['model', 'precision'])),
+                         {'model': ['a', 'a', 'b'], 'precision': [0.5, 0.6, 0.7]})
+
+    def test_unknown_key(self):
+        keys = self.store.keys()
+        self.assertEqual(as_lists(self.store.columns(['model', 'dropout'])), {'model': [], 'dropout': []})
+        self.assertEqual(as_lists(self.columns_of_file(['model', 'dropout'])), {'model': [], 'dropout': []})
+        self.assertEqual(as_lists(self.store.columns(['model'], {'dropout': 0.1})), {'model': []})
+        self.assertFalse(self.store.ensure_index(['model', 'dropout']))
+        self.assertEqual(self.store.keys(), keys)
+        self.assertEqual(ResultStore(self.store.filename).keys(), keys)
+
+    def test_where(self):
+        self.assertEqual(as_lists(self.store.columns(['precision'], {'model': 'a', 'seed': 2})),
+                         {'precision': [0.7]})
+        self.assertTrue(self.store.ensure_index(['model', 'seed']))
+        self.assertEqual(as_lists(self.store.columns(['seed'], {'model': 'b'})), {'seed': [1, 2]})
+
+    def test_key_added_later(self):
+        self.store.append([{'model': 'd', 'precision': 0.9, 'dropout': 0.1}])
+        self.assertEqual(as_lists(self.store.columns(['model', 'dropout'])), {'model': ['d'], 'dropout': [0.1]})
+        self.assertEqual(as_lists(ResultStore(self.store.filename).columns(['dropout'])), {'dropout': [0.1]})
+
+    def test_result_columns(self):
+        self.assertEqual(as_lists(result_columns(RESULTS, ['model', 'layers'])), {'model': ['b', 'b'], 'layers': [2, 2]})
+        self.assertEqual(as_lists(result_columns(RESULTS, [])), {})
+
+
+if __name__ == '__main__':
+    unittest.main()
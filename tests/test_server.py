@@ -0,0 +1,93 @@
+# coding: utf-8
+import json
+import os
+import socket
+import sys
+import tempfile
+import threading
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'lib'))
+
+from nlpkit.wordnet.dannet import Dannet
+from nlpkit.wordnet.server import WordnetService, make_server, PendingReply, WordnetClient
+
+__author__ = "anders"
+
+
+def small_wordnet():
+    """Return a Dannet with the chain a -> b -> c of hypernyms, and d on its own."""
+    wn = Dannet()
+    for n in 'abcd':
+        wn.add_synset(n, {'label': n, 'pos': 'n', 'lex_units': {'w' + n: {'word': 'word_' + n}}})
+        wn.add_synset_lookup('word_' + n, n)
+    wn.add_relation('a', 'b', {'type': u'has_hyperonym'})
+    wn.add_relation('b', 'c', {'type': u'has_hyperonym'})
+    return wn
+
+
+class WordnetServiceTest(unittest.TestCase):
+    def setUp(self):
+        self.service = WordnetService(small_wordnet())
+
+    def test_call_batch(self):
+        answers = self.service.call_batch([('hypernyms', ['a']), ('shortest_path', ['a', 'c']),
+                                           ('path_similarity', ['a', 'c']), ('synsets', ['word_d'])])
+        self.assertEqual(answers, [(['b'], None), (['a', 'b', 'c'], None), (1.0 / 3, None), (['d'], None)])
+
+    def test_follows_changes(self):
+        self.assertEqual(self.service.call_batch([('shortest_path', ['a', 'd'])]), [(None, None)])
+        self.service._wordnet.add_relation('c', 'd', {'type': u'has_hyperonym'})
+        self.assertEqual(self.service.call_batch([('shortest_path', ['a', 'd'])]), [(['a', 'b', 'c', 'd'], None)])
+        self.assertEqual(self.service.hypernym_paths('a'), [['a', 'b', 'c', 'd']])
+
+    def test_bad_request_fails_alone(self):
+        answers = self.service.call_batch([('hypernyms', ['a']), ('shortest_path', ['a', 'c', None, ['x']]),
+                                           ('shortest_path', [['a'], 'c']), ('shortest_path', ['a', 'c']),
+                                           ('nope', [])])
+        self.assertEqual(answers[0], (['b'], None))
+        self.assertTrue(answers[1][1].startswith('TypeError'))
+        self.assertTrue(answers[2][1].startswith('TypeError'))
+        self.assertEqual(answers[3], (['a', 'b', 'c'], None))
+        self.assertTrue(answers[4][1].startswith('ValueError'))
+
+
+class ServerTest(unittest.TestCase):
+    def setUp(self):
+        self.path = tempfile.mktemp(prefix='nlpkit-test-')
+        self.server = make_server(small_wordnet(), socket_path=self.path)
+        thread = threading.Thread(target=self.server.serve_forever)
+        thread.daemon = True
+        thread.start()
+        self.client = WordnetClient(socket_path=self.path)
+
+    def tearDown(self):
+        self.client.close()
+        self.server.shutdown()
+        self.server.server_close()
+        os.remove(self.path)
+
+    def test_queries(self):
+        self.assertEqual(self.client.hypernym_paths('a'), [['a', 'b', 'c']])
+        self.assertEqual(self.client['d']['lex_units'], {'wd': {'word': 'word_d'}})
+        self.assertEqual(self.client.path_similarity('a', 'd'), None)
+
+    def test_malformed_requests(self):
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        sock.connect(self.path)
+        f = sock.makefile()
+        replies = []
+        for line in ['[1]', 'garbage', '{"id": 5, "method": "hypernyms", "params": 1}', '{"id": 6}']:
+            sock.sendall(line + "\n")
+            replies.append(json.loads(f.readline()))
+        sock.close()
+        self.assertTrue(all(reply['error'].startswith('Malformed request') for reply in replies))
+        self.assertEqual([reply['id'] for reply in replies], [None, None, 5, 6])
+
+    def test_timeout(self):
+        pending = PendingReply()
+        self.assertRaises(RuntimeError, pending.result, 0.01)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,100 @@
+# coding: utf-8
+import os
+import random
+import sys
+import unittest
+
+import networkx as nx
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'lib'))
+
+from nlpkit.wordnet import universal
+
+__author__ = "anders"
+
+TYPES = ['@', '~', '%p']
+
+
+def random_wordnet(n=300, edges=900, seed=1):
+    rng = random.Random(seed)
+    wn = universal.Wordnet()
+    for i in range(n):
+        wn.add_synset('s{:04d}'.format(i), {'pos': 'n', 'lex_units': {}})
+    for _ in range(edges):
+        wn.add_relation('s{:04d}'.format(rng.randrange(n)), 's{:04d}'.format(rng.randrange(n)),
+                        {'type': rng.choice(TYPES)})
+    return wn
+
+
+def typed_graph(wn, types, direction='out'):
+    """The graph of the edges of the given types as a networkx DiGraph, reversed or undirected as asked."""
+    G = nx.DiGraph()
+    G.add_nodes_from(wn.G.nodes_iter())
+    G.add_edges_from((src, target) for src, target, data in wn.G.edges_iter(data=True) if data['type'] in types)
+    if direction == 'in':
+        return G.reverse()
+    elif direction == 'both':
+        return G.to_undirected()
+    return G
+
+
+class TraversalTest(unittest.TestCase):
+    """Compares the traversals with the networkx algorithms on the same graph."""
+    def setUp(self):
+        self.wn = random_wordnet()
+        self.t = self.wn.traversal()
+        self.sources = sorted(self.wn.G.nodes())[::30]
+
+    def test_shortest_path(self):
+        for types in (None, ['@'], ['@', '~']):
+            for direction in ('out', 'in', 'both'):
+                G = typed_graph(self.wn, types or TYPES, direction)
+                for src in self.sources:
+                    lengths = nx.single_source_shortest_path_length(G, src)
+                    for target in self.sources:
+                        path = self.t.shortest_path(src, target, types, direction)
+                        if target not in lengths:
+                            self.assertIsNone(path)
+                            continue
+                        self.assertEqual(len(path) - 1, lengths[target])
+                        self.assertEqual((path[0], path[-1]), (src, target))
+                        self.assertTrue(all(G.has_edge(a, b) for a, b in zip(path, path[1:])))
+
+    def test_shortest_paths_as_single_searches(self):
+        pairs = [(src, target) for src in self.sources for target in self.sources]
+        self.assertEqual([None if p is None else len(p) for p in self.t.shortest_paths(pairs, ['@', '~'])],
+                         [None if p is None else len(p)
+                          for p in (self.t.shortest_path(src, target, ['@', '~']) for src, target in pairs)])
+
+    def test_neighborhood(self):
+        G = typed_graph(self.wn, ['@'])
+        for src in self.sources:
+            self.assertEqual(self.t.neighborhood(src, 3, ['@']), nx.single_source_shortest_path_length(G, src, 3))
+
+    def test_closure(self):
+        G = typed_graph(self.wn, ['~'], 'in')
+        for src in self.sources:
+            self.assertEqual(set(self.t.closure([src], ['~'], 'in')), nx.descendants(G, src) | set([src]))
+
+    def test_traversal_follows_changes(self):
+        self.wn.add_synset('new', {'pos': 'n', 'lex_units': {}})
+        self.wn.add_relation(self.sources[0], 'new', {'type': '@'})
+        self.assertEqual(self.wn.traversal().shortest_path(self.sources[0], 'new', ['@']), [self.sources[0], 'new'])
+        self.wn.remove_synset('new')
+        self.assertRaises(KeyError, self.wn.traversal().shortest_path, self.sources[0], 'new')
+
+    def test_component_stats_follow_changes(self):
+        components = self.wn.stats(components=True)['components']['components']
+        self.wn.add_synset('lonely', {'pos': 'n', 'lex_units': {}})
+        self.assertEqual(self.wn.stats(components=True)['components']['components'], components + 1)
+
+    def test_invalidate_caches(self):
+        self.wn.traversal()
+        self.wn.G.add_edge('x', 'y', type='@')
+        self.wn.invalidate_caches()
+        self.assertEqual(self.wn.traversal().shortest_path('x', 'y'), ['x', 'y'])
+        self.assertEqual(self.wn.stats()['synsets'], 302)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,50 @@
+# coding: utf-8
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'lib'))
+
+from nlpkit.wordnet.wn30 import Wn30
+
+__author__ = "anders"
+
+DATA_NOUN = ("00000000 05 n 01 dog 0 001 @ 00000053 n 0000 | a dog\n"
+             "00000053 05 n 01 animal 0 000 | an animal\n")
+
+
+class LazyLoadTest(unittest.TestCase):
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        with open(os.path.join(self.dir, 'data.noun'), 'w') as f:
+            f.write(DATA_NOUN)
+        self.environ = os.environ.get('NLPKIT_DATA')
+        os.environ['NLPKIT_DATA'] = self.dir
+
+    def tearDown(self):
+        if self.environ is None:
+            del os.environ['NLPKIT_DATA']
+        else:
+            os.environ['NLPKIT_DATA'] = self.environ
+        shutil.rmtree(self.dir)
+
+    def test_lookups_match_eager(self):
+        eager, lazy = Wn30.load(self.dir), Wn30.load(self.dir, lazy=True)
+        for key in ['00000000-n', '00000053-n', '99999999-n', 'abc-n', '-n', 'n', '00000000-x', 12, None]:
+            expected = eager[key]
+            found = lazy[key]
+            if expected is None:
+                self.assertIsNone(found, key)
+            else:
+                self.assertEqual(found.id, expected.id)
+                self.assertEqual(dict(found), dict(expected))
+
+    def test_relations(self):
+        lazy = Wn30.load(self.dir, lazy=True)
+        self.assertEqual([s.id for s in lazy['00000000-n'].hypernyms()], ['00000053-n'])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,121 @@
+# coding: utf-8
+import codecs
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'lib'))
+
+from nlpkit.wordnet.dannet import Dannet
+from nlpkit.wordnet.ukb import Ukb
+
+__author__ = "anders"
+
+
+def edges(wordnet):
+    return sorted((src_n, target_n, sorted(data.items())) for src_n, target_n, data in wordnet.G.edges_iter(data=True))
+
+
+def nodes(wordnet):
+    return sorted((n, data) for n, data in wordnet.G.nodes_iter(data=True))
+
+
+class WriterTest(unittest.TestCase):
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.environ = os.environ.get('NLPKIT_DATA')
+        os.environ['NLPKIT_DATA'] = self.dir
+
+    def tearDown(self):
+        if self.environ is None:
+            del os.environ['NLPKIT_DATA']
+        else:
+            os.environ['NLPKIT_DATA'] = self.environ
+        shutil.rmtree(self.dir)
+
+    def path(self, name):
+        return os.path.join(self.dir, name)
+
+
+class DannetWriterTest(WriterTest):
+    def dannet(self):
+        wn = Dannet()
+        for n, pos in [('1', 'n'), ('2', 'n'), ('3', 'n'), ('4', 'v')]:
+            wn.add_synset(n, {'id': n, 'label': u'label' + n, 'gloss': u'gloss ' + n, 'ontological_type': u'',
+                              'pos': pos, 'lex_units': {}})
+        wn.G.node['3']['domain'] = u'zoologi'
+        senses = [('d1', 'w1', '1'), ('d2', 'w2', '2'), ('d3', 'w3', '3'), ('d5', 'w3', '2'), ('d4', 'w4', '4')]
+        for ddo_id, word_id, synset_id in senses:
+            word = u'ord' + word_id[1:]
+            pos = wn.G.node[synset_id]['pos']
+            lex_units = wn.G.node[synset_id]['lex_units']
+            key = word_id if word_id not in lex_units else u'{}/{}'.format(word_id, ddo_id)
+            lex_units[key] = {'word': word, 'pos': pos, 'ddo_id': ddo_id, 'word_id': word_id,
+                              'synset_id': synset_id, 'register': u''}
+            wn.add_synset_lookup(word, synset_id)
+        for src_n, target_n, name, type, reverse in [('2', '1', u'hyponymOf', u'has_hyperonym', u'has_hyponym'),
+                                                     ('3', '1', u'hyponymOf', u'has_hyperonym', u'has_hyponym'),
+                                                     ('1', '2', u'partHolonymOf', u'has_holo_part', u'has_mero_part')]:
+            wn.add_relation(src_n, target_n, {'type': type, 'name': name, 'taxonomic': u'taxonomic',
+                                              'inheritance_comment': u''})
+            wn.add_relation(target_n, src_n, {'type': reverse, 'taxonomic': u'taxonomic',
+                                              'inheritance_comment': u''})
+        wn.add_relation('4', '3', {'type': u'involved_agent', 'name': u'involvedAgent', 'taxonomic': u'',
+                                   'inheritance_comment': u'inherited from 1'})
+        wn.ili.add('1', 'ENG20-03574555-n', 'eq_synonym')
+        wn.ili.add('3', 'ENG30-01234567-n', 'eq_near_synonym')
+        return wn
+
+    def test_round_trip(self):
+        wn = self.dannet()
+        wn.write(self.path('dannet'))
+        copy = Dannet.load(self.path('dannet'))
+        self.assertEqual(edges(copy), edges(wn))
+        self.assertEqual(sorted(copy.ili.link_values()), sorted(wn.ili.link_values()))
+        self.assertEqual(sorted(copy.G.node['2']['lex_units']), ['w2', 'w3'])
+        self.assertEqual(copy.G.node['3']['domain'], u'zoologi')
+        self.assertEqual(copy.stats(), wn.stats())
+
+        copy.write(self.path('again'))
+        for filename in sorted(os.listdir(self.path('dannet'))):
+            with open(os.path.join(self.path('dannet'), filename)) as f, \
+                    open(os.path.join(self.path('again'), filename)) as g:
+                self.assertEqual(f.read(), g.read(), filename)
+
+
+class UkbWriterTest(WriterTest):
+    def ukb(self):
+        wn = Ukb()
+        for n, lemmas in [('00000001-n', ['dog', 'domestic_dog']), ('00000002-n', ['animal']),
+                          ('00000003-v', ['bark'])]:
+            wn.add_synset(n, {'pos': n[-1], 'lex_units': dict((i, {'lemma': lemma}) for i, lemma in enumerate(lemmas))})
+        wn.add_relation('00000001-n', '00000002-n', {'type': 'hypernym'})
+        wn.add_relation('00000002-n', '00000001-n', {'type': 'hyponym'})
+        wn.add_relation('00000003-v', '00000001-n', {'type': 'unknown'})
+        return wn
+
+    def test_round_trip(self):
+        wn = self.ukb()
+        wn.write(self.path('dict.txt'), self.path('rels.txt'))
+        copy = Ukb.load(self.path('dict.txt'), self.path('rels.txt'), read_types=True)
+        self.assertEqual(nodes(copy), nodes(wn))
+        self.assertEqual(edges(copy), edges(wn))
+
+    def test_types_are_only_read_when_asked(self):
+        with codecs.open(self.path('dict.txt'), 'w', encoding='utf-8') as f:
+            f.write(u"dog 00000001-n\nanimal 00000002-n\n")
+        with codecs.open(self.path('rels.txt'), 'w', encoding='utf-8') as f:
+            f.write(u"u:00000001-n v:00000002-n t:hypernym s:wn30\n"
+                    u"u:00000002-n v:00000001-n d:1 s:wn30g\n")
+        untyped = Ukb.load(self.path('dict.txt'), self.path('rels.txt'))
+        self.assertEqual([data['type'] for _, _, data in sorted(untyped.G.edges_iter(data=True))],
+                         ['unknown', 'unknown'])
+        typed = Ukb.load(self.path('dict.txt'), self.path('rels.txt'), read_types=True)
+        self.assertEqual([data['type'] for _, _, data in sorted(typed.G.edges_iter(data=True))],
+                         ['hypernym', 'unknown'])
+
+
+if __name__ == '__main__':
+    unittest.main()